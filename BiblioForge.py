@@ -34,31 +34,429 @@ import re
 import sys
 import logging
 import argparse
-from typing import Optional, List, Dict, Any, Union, Tuple, Callable
+from typing import Optional, List, Dict, Any, Union, Tuple, Callable, Iterable, Iterator
 import textwrap
 import pkg_resources
 import traceback
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 import shutil
+import errno
+import gzip
+import io
 import platform
 import subprocess
 import tempfile
 from pathlib import Path
+from urllib.parse import urlsplit
 from importlib.metadata import version, PackageNotFoundError
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from tqdm import tqdm
 import signal
 import threading
+import asyncio
+import queue
+import functools
+import collections
+import hashlib
+import json
+import sqlite3
+import zlib
 from datetime import datetime
 from types import MappingProxyType
 import time
+import uuid
 
 # Thread-local storage for LLM clients
 thread_local = threading.local()
 
-# Limit concurrent connections to Ollama - prevents overwhelming the server
-ollama_semaphore = threading.Semaphore(2)  # Allow only 2 concurrent connections
-llm_semaphore = threading.Semaphore(2)
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one LLM endpoint
+    
+    Requests hold a slot while in flight; slot() / slot_async() serve threads and
+    the LLM event loop alike. While latencies stay near the recent median and the
+    limit is actually used, it grows: by one per successful request at first
+    (slow start), and by one per limit successful requests once the endpoint
+    has pushed back (additive increase). A rate-limit answer or timeout halves
+    it (multiplicative decrease), at most once per burst: overloads from
+    requests started before the last decrease are not counted again.
+    """
+    
+    LATENCY_WINDOW = 200       # Recent latencies kept for percentiles
+    LATENCY_TOLERANCE = 2.0    # Latency above this times the median stops growth
+    MIN_SAMPLES = 5            # Latencies needed before they are judged
+    
+    def __init__(self, name: str, initial: int = 2, max_limit: int = 64, min_limit: int = 1):
+        """
+        Args:
+            name: Endpoint the limiter guards, for logging
+            initial: Starting concurrency
+            max_limit: Concurrency never grows beyond this
+            min_limit: Concurrency never shrinks below this
+        """
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._async_waiters = []
+        self._latencies = collections.deque(maxlen=self.LATENCY_WINDOW)
+        self._last_decrease = 0.0
+        self._slow_start = True
+        self.successes = 0
+        self.overloads = 0
+        self.errors = 0
+    
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit"""
+        return int(self._limit)
+    
+    def set_max_limit(self, max_limit: int):
+        with self._cond:
+            self.max_limit = max(self.min_limit, max_limit)
+            self._limit = min(self._limit, self.max_limit)
+            self._wake()
+    
+    def acquire(self):
+        """Block until a slot is free"""
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+    
+    async def acquire_async(self):
+        """Wait on the running event loop until a slot is free"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._in_flight < self.limit:
+                    self._in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            except BaseException:
+                with self._cond:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+                    else:
+                        # Already woken: hand the wakeup on to the next waiter
+                        self._wake()
+                raise
+    
+    def release(self, started: float, outcome: str = 'ok'):
+        """
+        Free a slot and adapt the limit
+        
+        Args:
+            started: time.monotonic() when the request was sent
+            outcome: 'ok', 'overload' (rate limited or timed out) or 'error'
+        """
+        now = time.monotonic()
+        with self._cond:
+            used = self._in_flight >= self.limit
+            self._in_flight -= 1
+            if outcome == 'ok':
+                latency = now - started
+                self.successes += 1
+                if used and self._latency_stable(latency):
+                    step = 1.0 if self._slow_start else 1.0 / self._limit
+                    self._limit = min(self.max_limit, self._limit + step)
+                elif used:
+                    self._slow_start = False
+                self._latencies.append(latency)
+            elif outcome == 'overload':
+                self.overloads += 1
+                self._slow_start = False
+                if started >= self._last_decrease:
+                    self._limit = max(self.min_limit, self._limit / 2)
+                    self._last_decrease = now
+                    logging.info(f"LLM endpoint {self.name} overloaded, concurrency limit now {self.limit}")
+            else:
+                self.errors += 1
+            self._wake()
+    
+    def _latency_stable(self, latency: float) -> bool:
+        if len(self._latencies) < self.MIN_SAMPLES:
+            return True
+        return latency <= self.LATENCY_TOLERANCE * self._percentile(50)
+    
+    def _wake(self):
+        """Wake as many waiters as there are free slots; they re-check under the lock"""
+        free = self.limit - self._in_flight
+        if free <= 0:
+            return
+        self._cond.notify(free)
+        while free > 0 and self._async_waiters:
+            loop, waiter = self._async_waiters.pop(0)
+            if waiter.done():
+                # Cancelled, it will not take the slot
+                continue
+            loop.call_soon_threadsafe(lambda w=waiter: w.done() or w.set_result(None))
+            free -= 1
+    
+    def _percentile(self, percent: float) -> float:
+        ordered = sorted(self._latencies)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+    
+    def percentile(self, percent: float) -> float:
+        """Observed request latency in seconds at the given percentile"""
+        with self._cond:
+            return self._percentile(percent)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Current limit, requests in flight, outcome counts and latency percentiles"""
+        with self._cond:
+            return {
+                'endpoint': self.name,
+                'limit': self.limit,
+                'in_flight': self._in_flight,
+                'successes': self.successes,
+                'overloads': self.overloads,
+                'errors': self.errors,
+                'p50': self._percentile(50),
+                'p90': self._percentile(90),
+                'p99': self._percentile(99)
+            }
+    
+    @staticmethod
+    def _outcome(error: Exception) -> str:
+        return 'overload' if is_transient_llm_error(error) else 'error'
+    
+    @contextmanager
+    def slot(self):
+        """Hold a slot around a blocking request"""
+        self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.release(started, self._outcome(e))
+            raise
+        except BaseException:
+            # Interrupted: the endpoint told us nothing
+            self.release(started, 'error')
+            raise
+        self.release(started)
+    
+    @asynccontextmanager
+    async def slot_async(self):
+        """Hold a slot around a request awaited on the event loop"""
+        await self.acquire_async()
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.release(started, self._outcome(e))
+            raise
+        except BaseException:
+            # Cancelled: the endpoint told us nothing
+            self.release(started, 'error')
+            raise
+        self.release(started)
+
+# Adaptive limiters per LLM endpoint, created on first use by get_llm_limiter
+llm_limiters = {}
+llm_limiters_lock = threading.Lock()
+llm_concurrency_max = 2
+
+# Raw OpenAI clients from get_openai_client talk to the local Ollama server
+OLLAMA_ENDPOINT = "http://localhost:11434"
+
+def configure_llm_concurrency(limit: int):
+    """Cap the adaptive per-endpoint LLM concurrency, e.g. at the LLM stage worker count"""
+    global llm_concurrency_max
+    llm_concurrency_max = max(1, int(limit))
+    with llm_limiters_lock:
+        for limiter in llm_limiters.values():
+            limiter.set_max_limit(llm_concurrency_max)
+
+def get_llm_limiter(endpoint: str) -> AdaptiveLimiter:
+    """Adaptive limiter shared by all requests to endpoint"""
+    with llm_limiters_lock:
+        limiter = llm_limiters.get(endpoint)
+        if limiter is None:
+            limiter = llm_limiters[endpoint] = AdaptiveLimiter(
+                endpoint, initial=2, max_limit=llm_concurrency_max
+            )
+        return limiter
+
+def endpoint_of(url: str) -> str:
+    """scheme://host:port of url, the unit connections and limits are shared by"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an LLM endpoint whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Process-wide circuit breaker for one LLM endpoint
+    
+    After failure_threshold consecutive failures the breaker opens and every
+    request fails fast with CircuitOpenError. Once cool_down seconds have
+    passed, a single probe request is let through: its success closes the
+    breaker, its failure opens it for another cool-down.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+    
+    def __init__(self, name: str, failure_threshold: int = 5, cool_down: float = 30.0):
+        """
+        Args:
+            name: Endpoint the breaker guards, for logging
+            failure_threshold: Consecutive failures that open it (0 disables the breaker)
+            cool_down: Seconds to fail fast before probing the endpoint again
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cool_down = cool_down
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+    
+    def before_request(self):
+        """Admit a request, or raise CircuitOpenError while the breaker is open"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cool_down:
+                # This request is the probe; others keep failing fast until it is back
+                self.state = self.HALF_OPEN
+                logging.info(f"Probing LLM endpoint {self.name}")
+                return
+            raise CircuitOpenError(f"LLM endpoint {self.name} is unavailable (circuit breaker {self.state})")
+    
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logging.info(f"LLM endpoint {self.name} is back, resuming requests")
+            self.state = self.CLOSED
+            self._failures = 0
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.failure_threshold
+                    and self._failures >= self.failure_threshold):
+                if self.state == self.CLOSED:
+                    logging.warning(f"LLM endpoint {self.name} failed {self._failures} times in a row, "
+                                    f"pausing requests for {self.cool_down:g}s")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+    
+    def record_abandoned(self):
+        """The request ended without an answer either way (e.g. cancelled); free the probe"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+# Circuit breakers per LLM endpoint, created on first use by get_llm_breaker
+llm_breakers = {}
+llm_breaker_settings = {'failure_threshold': 5, 'cool_down': 30.0}
+
+# Files whose sorting was skipped while their LLM endpoint was down, for --sort-deferred
+DEFERRED_SORT_LIST = "deferred_sort.lst"
+
+def take_deferred_sorts() -> List[str]:
+    """
+    Read the files deferred by earlier runs, for a sorting-only pass
+    
+    The list is moved aside to DEFERRED_SORT_LIST + '.bak', so files that are
+    deferred again start a fresh list.
+    """
+    if not os.path.exists(DEFERRED_SORT_LIST):
+        return []
+    with file_lock:
+        with open(DEFERRED_SORT_LIST, encoding="utf-8") as deferred_file:
+            files = list(dict.fromkeys(line.strip() for line in deferred_file if line.strip()))
+        os.replace(DEFERRED_SORT_LIST, DEFERRED_SORT_LIST + '.bak')
+    return files
+
+def configure_llm_breakers(failure_threshold: int = 5, cool_down: float = 30.0):
+    """Set the circuit breaker parameters for all LLM endpoints"""
+    with llm_limiters_lock:
+        llm_breaker_settings.update(failure_threshold=max(0, failure_threshold), cool_down=cool_down)
+        for breaker in llm_breakers.values():
+            breaker.failure_threshold = llm_breaker_settings['failure_threshold']
+            breaker.cool_down = cool_down
+
+def get_llm_breaker(endpoint: str) -> CircuitBreaker:
+    """Circuit breaker shared by all requests to endpoint"""
+    with llm_limiters_lock:
+        breaker = llm_breakers.get(endpoint)
+        if breaker is None:
+            breaker = llm_breakers[endpoint] = CircuitBreaker(endpoint, **llm_breaker_settings)
+        return breaker
+
+# Connection and timeout errors of the optional HTTP clients, matched by name so
+# that none of them has to be imported (openai, httpx, requests)
+LLM_CONNECTION_ERROR_NAMES = frozenset({
+    'APIConnectionError', 'APITimeoutError',                 # openai, groq
+    'TransportError', 'TimeoutException',                    # httpx (connect, read, network errors)
+    'ConnectionError', 'Timeout',                            # requests
+})
+
+def is_llm_outage_error(error: Exception) -> bool:
+    """Whether a failed request says the endpoint is unusable rather than the request invalid"""
+    status = getattr(error, 'status_code', None) or \
+        getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is not None:
+        # Other 4xx answers come from a working server
+        return status >= 500 or status in (408, 429)
+    # Without a status only failures to reach the server count; parse errors
+    # and bugs while handling an answer say nothing about the endpoint
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    return any(cls.__name__ in LLM_CONNECTION_ERROR_NAMES for cls in type(error).__mro__)
+
+@contextmanager
+def llm_endpoint_slot(endpoint: str):
+    """Circuit breaker check and adaptive limiter slot around one blocking request"""
+    breaker = get_llm_breaker(endpoint)
+    breaker.before_request()
+    try:
+        with get_llm_limiter(endpoint).slot():
+            yield
+    except Exception as e:
+        if is_llm_outage_error(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    except BaseException:
+        breaker.record_abandoned()
+        raise
+    breaker.record_success()
+
+@asynccontextmanager
+async def llm_endpoint_slot_async(endpoint: str):
+    """llm_endpoint_slot for requests awaited on the event loop"""
+    breaker = get_llm_breaker(endpoint)
+    breaker.before_request()
+    try:
+        async with get_llm_limiter(endpoint).slot_async():
+            yield
+    except Exception as e:
+        if is_llm_outage_error(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    except BaseException:
+        breaker.record_abandoned()
+        raise
+    breaker.record_success()
 
 # Global lock for thread-safe file operations
 file_lock = threading.Lock()
@@ -114,7 +512,14 @@ class ProgressProxy:
 
 class LLMProvider:
     """Base class for LLM providers"""
-    
+
+    # Root URL of an OpenAI-compatible chat API. Providers that set it get a
+    # native chat_completion_async over the shared connection pool
+    api_base: Optional[str] = None
+    # Structured output response_format types the API accepts
+    # ('json_object', 'json_schema'); see metadata_response_format
+    json_modes: Tuple[str, ...] = ()
+
     def __init__(self, model_name: str, api_key: Optional[str] = None):
         self.model_name = model_name
         self.api_key = api_key
@@ -122,7 +527,8 @@ class LLMProvider:
     def chat_completion(self, messages: List[Dict[str, str]], 
                        temperature: float = 0.7, 
                        max_tokens: int = 500,
-                       timeout: int = 120) -> Dict[str, Any]:
+                       timeout: int = 120,
+                       response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Send chat completion request to the LLM provider
         
@@ -131,15 +537,83 @@ class LLMProvider:
             temperature: Temperature for generation
             max_tokens: Maximum tokens to generate
             timeout: Timeout in seconds
+            response_format: OpenAI-style structured output request, only passed
+                to providers listing its type in json_modes
             
         Returns:
             Dict with response content
         """
         raise NotImplementedError("Subclasses must implement this method")
 
+    async def chat_completion_async(self, messages: List[Dict[str, str]],
+                       temperature: float = 0.7,
+                       max_tokens: int = 500,
+                       timeout: int = 120,
+                       response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Async chat completion, awaited on the shared LLM event loop (see AsyncLLMLoop)
+
+        Providers with an api_base POST to its /chat/completions endpoint over the
+        pooled keep-alive connection. The others, and all of them when httpx is not
+        installed, run the blocking chat_completion in a worker thread.
+
+        Returns:
+            Dict with response content, as chat_completion
+        """
+        if self.api_base is None or not ImportCache().is_available('httpx'):
+            # run_in_executor rather than asyncio.to_thread, which needs Python 3.9
+            loop = asyncio.get_running_loop()
+            if response_format:
+                return await loop.run_in_executor(None, functools.partial(
+                    self.chat_completion, messages, temperature, max_tokens, timeout, response_format
+                ))
+            return await loop.run_in_executor(None, functools.partial(
+                self.chat_completion, messages, temperature, max_tokens, timeout
+            ))
+
+        payload = self._chat_payload(messages, temperature, max_tokens)
+        if response_format:
+            payload["response_format"] = response_format
+        response_data = await post_json_async(
+            self._chat_url(),
+            payload,
+            headers=self._request_headers(),
+            timeout=timeout
+        )
+        choice = (response_data.get("choices") or [{}])[0]
+        return {
+            "id": response_data.get("id", "unknown"),
+            "content": ((choice.get("message") or {}).get("content") or "").strip(),
+            "finish_reason": choice.get("finish_reason"),
+            "model": self.model_name
+        }
+
+    @property
+    def endpoint(self) -> str:
+        """Key of the adaptive limiter shared by all requests to this provider's API"""
+        return endpoint_of(self.api_base) if self.api_base else type(self).__name__
+    
+    def _chat_url(self) -> str:
+        return self.api_base.rstrip('/') + '/chat/completions'
+
+    def _chat_payload(self, messages: List[Dict[str, str]], temperature: float,
+                      max_tokens: int) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+
+    def _request_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
 class OpenAIProvider(LLMProvider):
     """OpenAI API provider"""
     
+    api_base = "https://api.openai.com/v1"
+    json_modes = ('json_object', 'json_schema')
+    
     def __init__(self, model_name: str = "gpt-3.5-turbo", api_key: Optional[str] = None):
         super().__init__(model_name, api_key)
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
@@ -160,18 +634,20 @@ class OpenAIProvider(LLMProvider):
     def chat_completion(self, messages: List[Dict[str, str]], 
                        temperature: float = 0.7, 
                        max_tokens: int = 500,
-                       timeout: int = 120) -> Dict[str, Any]:
+                       timeout: int = 120,
+                       response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Send chat completion request to OpenAI"""
         client = self._init_client()
         
-        with llm_semaphore:
+        with llm_endpoint_slot(self.endpoint):
             try:
                 response = client.chat.completions.create(
                     model=self.model_name,
                     messages=messages,
                     temperature=temperature,
                     max_tokens=max_tokens,
-                    timeout=timeout
+                    timeout=timeout,
+                    **({"response_format": response_format} if response_format else {})
                 )
                 
                 # Convert response to a standard format
@@ -207,7 +683,7 @@ class HuggingFaceProvider(LLMProvider):
             # Initialize client with or without token
             client = InferenceClient(token=self.api_key) if self.api_key else InferenceClient()
             
-            with llm_semaphore:
+            with llm_endpoint_slot(self.endpoint):
                 response = client.text_generation(
                     prompt,
                     model=self.model_name,
@@ -269,7 +745,7 @@ class CohereProvider(LLMProvider):
         try:
             import cohere
             
-            with llm_semaphore:
+            with llm_endpoint_slot(self.endpoint):
                 try:
                     # Try ClientV2 first
                     client = cohere.ClientV2(self.api_key)
@@ -335,6 +811,8 @@ class CohereProvider(LLMProvider):
 class GLHFProvider(LLMProvider):
     """GLHF API provider (uses OpenAI-compatible API)"""
     
+    api_base = "https://glhf.chat/api/openai/v1"
+    
     def __init__(self, model_name: str = "mistralai/Mistral-7B-Instruct-v0.3", api_key: Optional[str] = None):
         super().__init__(model_name, api_key)
         self.api_key = api_key or os.environ.get("GLHF_API_KEY")
@@ -349,7 +827,7 @@ class GLHFProvider(LLMProvider):
             if not hasattr(thread_local, "glhf_client"):
                 thread_local.glhf_client = OpenAI(
                     api_key=self.api_key,
-                    base_url="https://glhf.chat/api/openai/v1"
+                    base_url=self.api_base
                 )
             return thread_local.glhf_client
         except ImportError:
@@ -361,11 +839,9 @@ class GLHFProvider(LLMProvider):
                        timeout: int = 120) -> Dict[str, Any]:
         """Send chat completion request to GLHF"""
         client = self._init_client()
+        model_id = self._model_id()
         
-        # Format model id for GLHF
-        model_id = f"hf:{self.model_name}" if not self.model_name.startswith("hf:") else self.model_name
-        
-        with llm_semaphore:
+        with llm_endpoint_slot(self.endpoint):
             try:
                 # GLHF works best with streaming
                 response_chunks = []
@@ -395,14 +871,26 @@ class GLHFProvider(LLMProvider):
             except Exception as e:
                 logging.error(f"GLHF request failed: {str(e)}")
                 raise
+    
+    def _model_id(self) -> str:
+        """Format model id for GLHF"""
+        return f"hf:{self.model_name}" if not self.model_name.startswith("hf:") else self.model_name
+    
+    def _chat_payload(self, messages, temperature, max_tokens):
+        payload = super()._chat_payload(messages, temperature, max_tokens)
+        payload["model"] = self._model_id()
+        return payload
 
 class OllamaProvider(LLMProvider):
     """Ollama LLM provider for local LLMs"""
     
+    json_modes = ('json_object', 'json_schema')
+    
     def __init__(self, model_name: str = "cas/llama-3.2-3b-instruct:latest", 
                 base_url: str = "http://localhost:11434/v1/"):
         super().__init__(model_name)
         self.base_url = base_url
+        self.api_base = base_url
         # Use OpenAI client with Ollama
         self._init_client()
     
@@ -422,18 +910,20 @@ class OllamaProvider(LLMProvider):
     def chat_completion(self, messages: List[Dict[str, str]], 
                        temperature: float = 0.7, 
                        max_tokens: int = 500,
-                       timeout: int = 120) -> Dict[str, Any]:
+                       timeout: int = 120,
+                       response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Send chat completion request to Ollama"""
         client = self._init_client()
         
-        with llm_semaphore:
+        with llm_endpoint_slot(self.endpoint):
             try:
                 response = client.chat.completions.create(
                     model=self.model_name,
                     temperature=temperature,
                     max_tokens=max_tokens,
                     messages=messages,
-                    timeout=timeout
+                    timeout=timeout,
+                    **({"response_format": response_format} if response_format else {})
                 )
                 
                 # Convert response to a standard format
@@ -451,6 +941,9 @@ class OllamaProvider(LLMProvider):
 class GroqProvider(LLMProvider):
     """Groq LLM provider for cloud LLMs"""
     
+    api_base = "https://api.groq.com/openai/v1"
+    json_modes = ('json_object',)
+    
     def __init__(self, model_name: str = "llama3-70b-8192", api_key: Optional[str] = None):
         super().__init__(model_name, api_key)
         self.api_key = api_key or os.environ.get("GROQ_API_KEY")
@@ -471,18 +964,20 @@ class GroqProvider(LLMProvider):
     def chat_completion(self, messages: List[Dict[str, str]], 
                        temperature: float = 0.7, 
                        max_tokens: int = 500,
-                       timeout: int = 120) -> Dict[str, Any]:
+                       timeout: int = 120,
+                       response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Send chat completion request to Groq"""
         client = self._init_client()
         
-        with llm_semaphore:
+        with llm_endpoint_slot(self.endpoint):
             try:
                 response = client.chat.completions.create(
                     model=self.model_name,
                     messages=messages,
                     temperature=temperature,
                     max_tokens=max_tokens,
-                    timeout=timeout
+                    timeout=timeout,
+                    **({"response_format": response_format} if response_format else {})
                 )
                 
                 # Convert response to a standard format
@@ -506,46 +1001,22 @@ class PoeProvider(LLMProvider):
         if not self.api_key:
             raise ValueError("Poe API key required. Either pass as api_key or set POE_API_KEY environment variable")
         self.api_url = "https://api.poe.com/api/chat"
+        self.api_base = self.api_url
     
     def chat_completion(self, messages: List[Dict[str, str]], 
                        temperature: float = 0.7, 
                        max_tokens: int = 500,
                        timeout: int = 120) -> Dict[str, Any]:
         """Send chat completion request to Poe.com"""
-        
-        # Format messages for Poe API
-        formatted_messages = []
-        for msg in messages:
-            if msg['role'] == 'system':
-                # Poe doesn't support system messages directly,
-                # prepend to first user message instead
-                continue
-            formatted_messages.append({
-                "role": msg['role'],
-                "content": msg['content']
-            })
-        
-        # Add system message to the first user message if present
-        system_messages = [msg for msg in messages if msg['role'] == 'system']
-        if system_messages and formatted_messages:
-            for user_msg in formatted_messages:
-                if user_msg['role'] == 'user':
-                    user_msg['content'] = f"[System Instructions: {system_messages[0]['content']}]\n\n{user_msg['content']}"
-                    break
+        import requests
         
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        payload = self._chat_payload(messages, temperature, max_tokens)
         
-        payload = {
-            "model": self.model_name,
-            "messages": formatted_messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens
-        }
-        
-        with llm_semaphore:
+        with llm_endpoint_slot(self.endpoint):
             try:
                 response = requests.post(
                     self.api_url,
@@ -566,6 +1037,32 @@ class PoeProvider(LLMProvider):
             except requests.RequestException as e:
                 logging.error(f"Poe request failed: {str(e)}")
                 raise
+    
+    def _chat_url(self) -> str:
+        return self.api_url
+    
+    def _chat_payload(self, messages, temperature, max_tokens):
+        """Format messages for Poe API"""
+        formatted_messages = []
+        for msg in messages:
+            if msg['role'] == 'system':
+                # Poe doesn't support system messages directly,
+                # prepend to first user message instead
+                continue
+            formatted_messages.append({
+                "role": msg['role'],
+                "content": msg['content']
+            })
+        
+        # Add system message to the first user message if present
+        system_messages = [msg for msg in messages if msg['role'] == 'system']
+        if system_messages and formatted_messages:
+            for user_msg in formatted_messages:
+                if user_msg['role'] == 'user':
+                    user_msg['content'] = f"[System Instructions: {system_messages[0]['content']}]\n\n{user_msg['content']}"
+                    break
+        
+        return super()._chat_payload(formatted_messages, temperature, max_tokens)
 
 
 def get_llm_provider(provider_type: str = "ollama", 
@@ -606,105 +1103,1001 @@ def get_llm_provider(provider_type: str = "ollama",
         raise ValueError(f"Unknown provider type: {provider_type}")
 
 
-def send_to_llm(text: str, filename: str, provider: Union[str, LLMProvider], 
-              model_name: Optional[str] = None,
-              api_key: Optional[str] = None,
-              max_attempts: int = 5,
-              verbose: bool = False) -> str:
+class AsyncLLMLoop:
     """
-    Extract metadata from text using an LLM provider
+    One asyncio event loop in a background thread, shared by all async LLM requests
     
-    Args:
-        text: Text to analyze
-        filename: Filename for context
-        provider: Provider type string ('ollama', 'groq', 'poe') or LLMProvider instance
-        model_name: Optional model name to use
-        api_key: Optional API key for cloud providers
-        max_attempts: Maximum retry attempts
-        verbose: Whether to print debug information
-        
-    Returns:
-        str: The formatted metadata response
+    Any thread hands coroutines to it with submit(). HTTP requests share one
+    httpx.AsyncClient per endpoint (scheme://host:port), so keep-alive
+    connections are reused across documents instead of every worker thread
+    holding its own client, and waiting on a response costs no thread. The
+    endpoint's AdaptiveLimiter decides how many requests are in flight.
     """
-    if isinstance(provider, (int, float)):
-        logging.error(f"Invalid provider parameter: {provider} (type: {type(provider)}). Expected provider string or LLMProvider instance.")
-        return ""
-        
-    # Get or validate provider
-    if isinstance(provider, str):
-        try:
-            llm_provider = get_llm_provider(provider, model_name, api_key)
-        except ImportError as e:
-            logging.error(f"Failed to initialize {provider} provider: {str(e)}")
-            # Fall back to Ollama if available
-            try:
-                llm_provider = get_llm_provider("ollama")
-                logging.info(f"Falling back to Ollama provider")
-            except ImportError:
-                raise ImportError("No LLM providers available. Install at least one client library.")
-    else:
-        llm_provider = provider
     
-    base_retry_wait = 2  # Base wait time in seconds
+    KEEPALIVE_EXPIRY = 30.0  # Seconds an idle pooled connection stays open
     
-    # Prepare different prompt templates to try if earlier ones fail
-    prompt_templates = [
-        # First attempt - simple structured format
-        (
-            f"Extract the author name (lastname surname) of the main author (ignore other authors), "
-            f"year of publication, title, and language from the following text, considering the filename '{os.path.basename(filename)}' "
-            f"which may contain clues. I need the output **only** in the following format with no additional text or explanations: \n"
-            f"<TITLE>The publication title</TITLE>\n<YEAR>2023</YEAR>\n<AUTHOR>Lastname Firstname</AUTHOR>\n<LANGUAGE>en</LANGUAGE>\n\n"
-        ),
-        # Second attempt - emphasize exact format
-        (
-            f"I need to extract metadata from a document. Please give me ONLY these four tags with the information, and nothing else:\n"
-            f"<TITLE>The exact title</TITLE>\n<YEAR>The publication year (4 digits)</YEAR>\n<AUTHOR>The author's name in 'Lastname Firstname' format</AUTHOR>\n<LANGUAGE>The language code</LANGUAGE>\n\n"
-            f"Document filename: {os.path.basename(filename)}\n"
-        ),
-        # Third attempt - even more explicit
-        (
-            f"You are a metadata extraction tool. Extract these fields from the text:\n"
-            f"1. TITLE (the full publication title)\n"
-            f"2. YEAR (the 4-digit publication year, use 'Unknown' if not found)\n"
-            f"3. AUTHOR (format as 'Lastname Firstname', preserve any commas)\n"
-            f"4. LANGUAGE (the 2-letter language code, e.g., 'en', 'de', 'fr')\n\n"
-            f"Format your response EXACTLY like this with no other text:\n"
-            f"<TITLE>The title</TITLE>\n<YEAR>2023</YEAR>\n<AUTHOR>Smith John</AUTHOR>\n<LANGUAGE>en</LANGUAGE>\n\n"
+    def __init__(self, max_in_flight: int = 64):
+        """
+        Args:
+            max_in_flight: Pooled connections per endpoint
+        """
+        self.max_in_flight = max(1, max_in_flight)
+        self._loop = asyncio.new_event_loop()
+        # Providers without an async HTTP path run in these threads (see
+        # LLMProvider.chat_completion_async); the default pool is much smaller
+        self._blocking_executor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight, thread_name_prefix="llm-blocking"
         )
-    ]
+        self._loop.set_default_executor(self._blocking_executor)
+        # Only touched from the loop thread, so no lock is needed
+        self._clients = {}
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="llm-event-loop", daemon=True)
+        self._thread.start()
+    
+    def submit(self, coro) -> 'concurrent.futures.Future':
+        """Schedule a coroutine on the loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+    
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the loop and wait for its result (not from the loop thread)"""
+        return self.submit(coro).result(timeout)
+    
+    def http_client(self, endpoint: str):
+        """Pooled keep-alive client for endpoint; call on the loop"""
+        client = self._clients.get(endpoint)
+        if client is None:
+            import httpx
+            client = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=self.max_in_flight,
+                max_keepalive_connections=self.max_in_flight,
+                keepalive_expiry=self.KEEPALIVE_EXPIRY
+            ))
+            self._clients[endpoint] = client
+        return client
+    
+    async def _close_clients(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+    
+    def close(self):
+        """Close the pooled connections and stop the loop thread"""
+        if self._loop.is_closed():
+            return
+        try:
+            self.run(self._close_clients(), timeout=10)
+        except Exception as e:
+            logging.debug(f"Error closing LLM HTTP clients: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        if not self._thread.is_alive():
+            self._blocking_executor.shutdown(wait=True)
+            self._loop.close()
+
+# Shared LLM event loop, started by start_llm_loop or on first use
+llm_event_loop = None
+llm_event_loop_lock = threading.Lock()
+
+def start_llm_loop(max_in_flight: int = 64) -> AsyncLLMLoop:
+    """Start the shared LLM event loop, replacing a running one"""
+    global llm_event_loop
+    with llm_event_loop_lock:
+        if llm_event_loop is not None:
+            llm_event_loop.close()
+        llm_event_loop = AsyncLLMLoop(max_in_flight)
+        return llm_event_loop
+
+def get_llm_loop() -> AsyncLLMLoop:
+    """Return the shared LLM event loop, starting it with defaults if needed"""
+    global llm_event_loop
+    with llm_event_loop_lock:
+        if llm_event_loop is None:
+            llm_event_loop = AsyncLLMLoop()
+        return llm_event_loop
+
+def stop_llm_loop():
+    """Close the shared LLM event loop and its connection pools"""
+    global llm_event_loop
+    with llm_event_loop_lock:
+        if llm_event_loop is not None:
+            llm_event_loop.close()
+            llm_event_loop = None
+
+async def post_json_async(url: str, payload: Dict[str, Any],
+                          headers: Optional[Dict[str, str]] = None,
+                          timeout: float = 120) -> Dict[str, Any]:
+    """
+    POST a JSON request over the pooled connection of url's endpoint
     
-    # Try different prompt templates if we encounter format issues
-    attempt = 1
-    while attempt <= max_attempts:
-        # Choose prompt template based on attempt number
-        template_index = min(attempt - 1, len(prompt_templates) - 1)
-        prompt_template = prompt_templates[template_index]
-        
-        logging.debug(f"Consulting LLM {provider} on file: {filename} (Attempt: {attempt}, Template: {template_index + 1})")
+    Must be awaited on the shared LLM event loop.
+    
+    Returns:
+        Decoded JSON response
+    """
+    endpoint = endpoint_of(url)
+    async with llm_endpoint_slot_async(endpoint):
+        response = await get_llm_loop().http_client(endpoint).post(
+            url, json=payload, headers=headers, timeout=timeout
+        )
+        # Inside the slot, so a 429 counts as overload
+        response.raise_for_status()
+    return response.json()
 
 
-        # Build the final prompt with text sample
-        prompt = prompt_template + f"Here is the document text:\n{text[:3000]}"  # Limit text to avoid token limits
-        messages = [{"role": "user", "content": prompt}]
-        
-        try:
-            response = llm_provider.chat_completion(
-                messages=messages,
-                temperature=0.5,  # Reduced temperature for more consistent formatting
-                max_tokens=250,
-                timeout=120  # 2 minute timeout
+class SQLiteCache:
+    """
+    Base for the on-disk caches: one SQLite database, shared by threads
+    
+    Worker processes open their own connection to the same file; WAL mode lets
+    them read while another process writes.
+    """
+    
+    FILENAME = 'cache.sqlite3'
+    SCHEMA = ''
+    
+    def __init__(self, cache_dir: str):
+        """
+        Args:
+            cache_dir: Directory holding the cache database (created on first use)
+        """
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.path = os.path.join(self.cache_dir, self.FILENAME)
+        self._lock = threading.Lock()
+        self._conn = None
+    
+    @staticmethod
+    def default_dir() -> str:
+        """Per-user cache directory (XDG_CACHE_HOME or ~/.cache on Unix, LOCALAPPDATA on Windows)"""
+        base = os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA')
+        if not base:
+            base = os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(base, 'biblioforge')
+    
+    def _connect(self):
+        """Open the database on first use; callers hold self._lock"""
+        if self._conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+    
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class LLMResponseCache(SQLiteCache):
+    """
+    Persistent cache of LLM responses
+    
+    Keyed by provider, model, temperature, max_tokens and a hash of the prompt
+    messages, so re-running --sort over the same files is bound by disk reads
+    instead of LLM latency. Entries expire after ttl seconds and the table is
+    trimmed to max_entries, oldest first.
+    """
+    
+    FILENAME = 'llm_cache.sqlite3'
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS responses_created ON responses (created);
+    '''
+    DEFAULT_TTL = 30 * 24 * 3600  # 30 days
+    DEFAULT_MAX_ENTRIES = 100000
+    EVICT_EVERY = 100  # Puts between eviction passes
+    
+    def __init__(self, cache_dir: str, ttl: Optional[float] = DEFAULT_TTL,
+                 max_entries: Optional[int] = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            cache_dir: Directory holding the cache database
+            ttl: Seconds a response stays valid (None or 0: forever)
+            max_entries: Maximum number of stored responses (None or 0: unlimited)
+        """
+        super().__init__(cache_dir)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._puts = 0
+    
+    @staticmethod
+    def make_key(provider_name: str, model: str, temperature: float, max_tokens: int,
+                 messages: List[Dict[str, str]],
+                 response_format: Optional[Dict[str, Any]] = None) -> str:
+        """Cache key for one request; keys of plain requests do not change with response_format"""
+        request = messages if response_format is None else [messages, response_format]
+        prompt_hash = hashlib.sha256(
+            json.dumps(request, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        return f"{provider_name}|{model}|{float(temperature)}|{int(max_tokens)}|{prompt_hash}"
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached, unexpired response or None"""
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT response, created FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+        if not row:
+            return None
+        if self.ttl and time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+    
+    def put(self, key: str, response: str):
+        """Store a response, evicting expired and surplus entries now and then"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)',
+                (key, response, time.time())
             )
-            
-            output = response["content"]
-            if verbose:
-                logging.debug(f"Metadata content received from LLM: {output}")
-            
-            # Validate the response has the expected format
-            metadata = parse_metadata(output, verbose=verbose)
-            if metadata:
-                return output
-            else:
+            self._puts += 1
+            if (self._puts - 1) % self.EVICT_EVERY == 0:
+                self._evict(conn)
+            conn.commit()
+    
+    def _evict(self, conn):
+        if self.ttl:
+            conn.execute('DELETE FROM responses WHERE created < ?', (time.time() - self.ttl,))
+        if self.max_entries:
+            conn.execute(
+                'DELETE FROM responses WHERE key IN ('
+                'SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+
+# Shared LLM response cache, set up by configure_llm_cache (None: disabled)
+llm_response_cache = None
+
+def configure_llm_cache(cache_dir: Optional[str], ttl: Optional[float] = LLMResponseCache.DEFAULT_TTL):
+    """Enable the persistent LLM response cache in cache_dir, or disable it with None"""
+    global llm_response_cache
+    if llm_response_cache is not None:
+        llm_response_cache.close()
+    llm_response_cache = LLMResponseCache(cache_dir, ttl=ttl) if cache_dir else None
+
+class AuthorNameMemo(SQLiteCache):
+    """
+    Memo of raw author strings to their canonical 'Lastname Firstname' form
+    
+    Lookups are served from memory, shared by all threads. Names the LLM had to
+    order are also stored on disk, so later runs over the same library skip the
+    request; rule-based results are cheap to recompute and stay in memory.
+    Without a cache_dir the memo lives for the run only.
+    """
+    
+    FILENAME = 'author_names.sqlite3'
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS authors (
+            raw TEXT PRIMARY KEY,
+            canonical TEXT NOT NULL,
+            created REAL NOT NULL
+        );
+    '''
+    
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Args:
+            cache_dir: Directory holding the memo database, or None to keep it in memory
+        """
+        if cache_dir:
+            super().__init__(cache_dir)
+        else:
+            self.cache_dir = self.path = None
+            self._lock = threading.Lock()
+            self._conn = None
+        self._names = {}
+        self.hits = 0
+    
+    def get(self, raw: str) -> Optional[str]:
+        """Canonical form of raw, or None if it has not been seen"""
+        with self._lock:
+            canonical = self._names.get(raw)
+            if canonical is None and self.path:
+                try:
+                    row = self._connect().execute(
+                        'SELECT canonical FROM authors WHERE raw = ?', (raw,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logging.warning(f"Author name memo unavailable: {e}")
+                    row = None
+                if row:
+                    canonical = self._names[raw] = row[0]
+            if canonical is not None:
+                self.hits += 1
+            return canonical
+    
+    def put(self, raw: str, canonical: str, persist: bool = False):
+        """Remember canonical for raw; persist also stores it on disk"""
+        with self._lock:
+            self._names[raw] = canonical
+            if not (persist and self.path):
+                return
+            try:
+                conn = self._connect()
+                conn.execute(
+                    'INSERT OR REPLACE INTO authors (raw, canonical, created) VALUES (?, ?, ?)',
+                    (raw, canonical, time.time())
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logging.warning(f"Could not store author name: {e}")
+
+
+# Author names memo used by sort_author_names, see configure_author_memo
+author_name_memo = AuthorNameMemo()
+
+def configure_author_memo(cache_dir: Optional[str]):
+    """Persist the author name memo in cache_dir, or keep it in memory with None"""
+    global author_name_memo
+    author_name_memo.close()
+    author_name_memo = AuthorNameMemo(cache_dir)
+
+class ProcessingManifest(SQLiteCache):
+    """
+    Persistent processing state of each input file
+    
+    One row per input (absolute path) with its state: 'extracted', 'sorted'
+    (rename command written), 'renamed', 'failed' or 'deferred', and details
+    such as the rename arguments. The table is read into a dict on first use,
+    so lookups while planning a run are O(1); every update is committed at once
+    (WAL), so a crash loses at most the file in progress.
+    """
+    
+    FILENAME = 'biblioforge_manifest.sqlite3'
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            detail TEXT,
+            updated REAL NOT NULL
+        );
+    '''
+    STATES = ('extracted', 'sorted', 'renamed', 'failed', 'deferred')
+    
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Directory holding the manifest, normally the output directory
+        """
+        super().__init__(directory)
+        self._index = None
+        self._emitted = set()
+    
+    def _load(self) -> Dict[str, Tuple[str, Optional[Dict[str, Any]]]]:
+        """Index of all rows; callers hold self._lock"""
+        if self._index is None:
+            rows = self._connect().execute('SELECT path, state, detail FROM files').fetchall()
+            self._index = {path: (state, json.loads(detail) if detail else None)
+                           for path, state, detail in rows}
+        return self._index
+    
+    def get(self, input_file: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """(state, detail) of input_file, (None, None) if it was never seen"""
+        with self._lock:
+            return self._load().get(os.path.abspath(input_file), (None, None))
+    
+    def state(self, input_file: str) -> Optional[str]:
+        return self.get(input_file)[0]
+    
+    def record(self, input_file: str, state: str, detail: Optional[Dict[str, Any]] = None,
+               emitted: bool = True):
+        """Set the state of input_file; emitted=False for 'sorted' entries not written this run"""
+        if state not in self.STATES:
+            raise ValueError(f"Unknown manifest state: {state}")
+        path = os.path.abspath(input_file)
+        with self._lock:
+            index = self._load()
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO files (path, state, detail, updated) VALUES (?, ?, ?, ?)',
+                (path, state, json.dumps(detail) if detail else None, time.time())
+            )
+            conn.commit()
+            index[path] = (state, detail)
+            if state == 'sorted' and emitted:
+                self._emitted.add(path)
+    
+    def emitted(self, input_file: str) -> bool:
+        """Whether a rename command for input_file was written during this run"""
+        with self._lock:
+            return os.path.abspath(input_file) in self._emitted
+    
+    def entries(self, state: str, emitted_only: bool = False) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+        """(path, detail) of all inputs in state, optionally only those sorted during this run"""
+        with self._lock:
+            return [(path, detail) for path, (entry_state, detail) in self._load().items()
+                    if entry_state == state and (not emitted_only or path in self._emitted)]
+
+
+# Manifest of the current output directory, see configure_manifest (None: disabled)
+processing_manifest = None
+
+def configure_manifest(directory: Optional[str]):
+    """Keep the processing manifest in directory, or disable it with None"""
+    global processing_manifest
+    if processing_manifest is not None:
+        processing_manifest.close()
+    processing_manifest = ProcessingManifest(directory) if directory else None
+
+def manifest_record(input_file: str, state: str, detail: Optional[Dict[str, Any]] = None):
+    """Record a state in the processing manifest, if there is one"""
+    if processing_manifest is None:
+        return
+    try:
+        processing_manifest.record(input_file, state, detail)
+    except sqlite3.Error as e:
+        logging.warning(f"Could not update processing manifest for {input_file}: {e}")
+
+def llm_provider_identity(provider) -> Tuple[str, str]:
+    """(provider name, model) of an LLMProvider instance or the OpenAI client for Ollama"""
+    if hasattr(provider, 'chat') and hasattr(provider.chat, 'completions'):
+        return 'ollama', MODEL_NAME
+    return type(provider).__name__, getattr(provider, 'model_name', '')
+
+def llm_chat_completion(provider, messages: List[Dict[str, str]],
+                        temperature: float = 0.5,
+                        max_tokens: int = 250,
+                        timeout: int = 120,
+                        validate: Optional[Callable[[str], bool]] = None,
+                        use_cache: bool = True,
+                        response_format: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Send one chat request through the LLM response cache
+    
+    Args:
+        provider: LLMProvider instance or OpenAI client pointed at Ollama
+        messages: List of message dictionaries with 'role' and 'content'
+        temperature: Temperature for generation
+        max_tokens: Maximum tokens to generate
+        timeout: Timeout in seconds
+        validate: Optional check on the response; only responses passing it are cached
+        use_cache: Set to False for requests whose callers cache the parts themselves
+        response_format: Structured output request (see metadata_response_format)
+        
+    Returns:
+        str: Response content
+    """
+    is_openai_client = hasattr(provider, 'chat') and hasattr(provider.chat, 'completions')
+    
+    key, cached = _llm_cache_lookup(provider, messages, temperature, max_tokens, use_cache,
+                                    response_format)
+    if cached is not None:
+        return cached
+    
+    # Only structured requests carry the argument, so providers without it keep working
+    extra = {"response_format": response_format} if response_format else {}
+    if is_openai_client:
+        # Provider instances take their endpoint's slot inside chat_completion
+        with llm_endpoint_slot(OLLAMA_ENDPOINT):
+            response = provider.chat.completions.create(
+                model=MODEL_NAME,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                messages=messages,
+                timeout=timeout,
+                **extra
+            )
+        content = response.choices[0].message.content.strip()
+    else:
+        response = provider.chat_completion(
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            **extra
+        )
+        content = response["content"]
+    
+    _llm_cache_store(key, content, validate)
+    return content
+
+async def llm_chat_completion_async(provider: LLMProvider, messages: List[Dict[str, str]],
+                        temperature: float = 0.5,
+                        max_tokens: int = 250,
+                        timeout: int = 120,
+                        validate: Optional[Callable[[str], bool]] = None,
+                        use_cache: bool = True,
+                        response_format: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Async variant of llm_chat_completion, awaited on the shared LLM event loop
+    
+    Args:
+        provider: LLMProvider instance
+        (others as llm_chat_completion)
+        
+    Returns:
+        str: Response content
+    """
+    key, cached = _llm_cache_lookup(provider, messages, temperature, max_tokens, use_cache,
+                                    response_format)
+    if cached is not None:
+        return cached
+    
+    response = await provider.chat_completion_async(
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout,
+        response_format=response_format
+    )
+    content = response["content"]
+    
+    _llm_cache_store(key, content, validate)
+    return content
+
+def _llm_cache_lookup(provider, messages: List[Dict[str, str]], temperature: float,
+                      max_tokens: int, use_cache: bool,
+                      response_format: Optional[Dict[str, Any]] = None
+                      ) -> Tuple[Optional[str], Optional[str]]:
+    """(cache key, cached response); the key is None when the cache is not used"""
+    if not use_cache or llm_response_cache is None:
+        return None, None
+    provider_name, model = llm_provider_identity(provider)
+    key = llm_response_cache.make_key(provider_name, model, temperature, max_tokens, messages,
+                                      response_format)
+    try:
+        cached = llm_response_cache.get(key)
+    except sqlite3.Error as e:
+        logging.warning(f"LLM cache unavailable: {e}")
+        return key, None
+    if cached is not None:
+        logging.debug(f"LLM cache hit for {provider_name}/{model}")
+    return key, cached
+
+def _llm_cache_store(key: Optional[str], content: str,
+                     validate: Optional[Callable[[str], bool]] = None):
+    if key is None or llm_response_cache is None or not content:
+        return
+    if validate is not None and not validate(content):
+        return
+    try:
+        llm_response_cache.put(key, content)
+    except sqlite3.Error as e:
+        logging.warning(f"Could not cache LLM response: {e}")
+
+
+class MetadataBatcher:
+    """
+    Packs metadata requests from several documents into one LLM prompt
+    
+    Output-stage threads call submit() concurrently. Requests are collected
+    until batch_size are waiting or the oldest has waited max_wait seconds;
+    the thread that completes the batch sends it as one prompt with indexed
+    <DOC id=N> sections and splits the answer back per document. Documents
+    whose section is missing or does not parse get None, and the caller falls
+    back to a single request for them.
+    """
+    
+    EXCERPT_TOKENS = 300         # Text per document inside a batch prompt
+    MAX_TOKENS_PER_DOC = 120     # Answer budget per document
+    
+    def __init__(self, provider, batch_size: int, max_wait: float = 2.0,
+                 temperature: float = 0.5):
+        """
+        Args:
+            provider: LLMProvider instance or OpenAI client pointed at Ollama
+            batch_size: Maximum documents per request
+            max_wait: Seconds a request waits for the batch to fill up
+            temperature: Temperature for generation
+        """
+        self.provider = provider
+        self.batch_size = max(2, batch_size)
+        self.max_wait = max_wait
+        self.temperature = temperature
+        self._lock = threading.Lock()
+        self._pending = []
+        self.batches = 0
+        self.fallbacks = 0
+    
+    def _cache_key(self, entry: Dict[str, Any]) -> Optional[str]:
+        """Per-document cache key, so cached answers survive a different batch grouping"""
+        if llm_response_cache is None:
+            return None
+        provider_name, model = llm_provider_identity(self.provider)
+        return llm_response_cache.make_key(
+            f"{provider_name}/batch-doc", model, self.temperature, self.MAX_TOKENS_PER_DOC,
+            [{'role': 'user', 'content': entry['section']}]
+        )
+    
+    def submit(self, text: str, filename: str) -> Optional[str]:
+        """
+        Get metadata for one document as a tag-format response
+        
+        Returns:
+            str with <TITLE>/<YEAR>/<AUTHOR>/<LANGUAGE> tags, or None to fall back
+        """
+        entry = {
+            'section': f"Filename: {os.path.basename(filename)}\nText:\n{sample_metadata_text(text, self.EXCERPT_TOKENS)}",
+            'filename': filename,
+            'done': threading.Event(),
+            'result': None
+        }
+        entry['key'] = self._cache_key(entry)
+        if entry['key']:
+            try:
+                cached = llm_response_cache.get(entry['key'])
+            except sqlite3.Error:
+                cached = None
+            if cached:
+                return cached
+        
+        batch = None
+        with self._lock:
+            self._pending.append(entry)
+            if len(self._pending) >= self.batch_size:
+                batch, self._pending = self._pending, []
+        
+        if batch is None:
+            deadline = time.monotonic() + self.max_wait
+            while not entry['done'].wait(0.1):
+                if shutdown_flag.is_set() or time.monotonic() >= deadline:
+                    with self._lock:
+                        if entry in self._pending:
+                            # Nobody completed the batch in time; send what is waiting
+                            batch, self._pending = self._pending, []
+                    if batch is not None:
+                        break
+                    deadline = float('inf')  # Another thread is sending our batch
+        
+        if batch is not None:
+            self._run(batch)
+        return entry['result']
+    
+    def _run(self, batch: List[Dict[str, Any]]):
+        try:
+            if len(batch) > 1 and not shutdown_flag.is_set():
+                self._send(batch)
+        except Exception as e:
+            logging.warning(f"Batched metadata request for {len(batch)} documents failed: {e}")
+        finally:
+            for entry in batch:
+                if entry['result'] is None:
+                    self.fallbacks += 1
+                entry['done'].set()
+    
+    def _send(self, batch: List[Dict[str, Any]]):
+        sections = "\n\n".join(
+            f"<DOC id={index}>\n{entry['section']}\n</DOC>" for index, entry in enumerate(batch, 1)
+        )
+        prompt = (
+            f"Extract the main author name (Lastname Firstname), year of publication, title and language "
+            f"for each of the following {len(batch)} documents. The filename may contain clues. "
+            f"For every document output exactly one block with the same id, in this format and with "
+            f"no additional text or explanations:\n"
+            f"<DOC id=1>\n<TITLE>The publication title</TITLE>\n<YEAR>2023</YEAR>\n"
+            f"<AUTHOR>Lastname Firstname</AUTHOR>\n<LANGUAGE>en</LANGUAGE>\n</DOC>\n\n"
+            f"{sections}"
+        )
+        response = llm_chat_completion(
+            self.provider,
+            [{"role": "user", "content": prompt}],
+            temperature=self.temperature,
+            max_tokens=self.MAX_TOKENS_PER_DOC * len(batch),
+            timeout=120 + 15 * len(batch),
+            use_cache=False
+        )
+        self.batches += 1
+        
+        answers = {}
+        for doc_id, body in re.findall(r'<DOC\s+id\s*=\s*["\']?(\d+)["\']?\s*>(.*?)</DOC>',
+                                       response or '', re.DOTALL | re.IGNORECASE):
+            answers.setdefault(int(doc_id), body.strip())
+        
+        for index, entry in enumerate(batch, 1):
+            answer = answers.get(index)
+            if answer and parse_metadata(answer):
+                entry['result'] = answer
+                if entry['key']:
+                    try:
+                        llm_response_cache.put(entry['key'], answer)
+                    except sqlite3.Error as e:
+                        logging.warning(f"Could not cache LLM response: {e}")
+            else:
+                logging.debug(f"No usable batch answer for {entry['filename']}, falling back")
+
+
+# Document excerpt sent with metadata prompts, in estimated tokens (about 4 characters each)
+METADATA_SAMPLE_TOKENS = 500
+CHARS_PER_TOKEN = 4
+# Title and imprint pages are looked for in the front matter and, for colophons, at the end
+_FRONT_MATTER_CHARS = 40000
+_BACK_MATTER_CHARS = 6000
+_IMPRINT_PATTERN = re.compile(
+    r'\bISBN\b|©|\(c\)\s*\d{4}|\bcopyright\b|\ball rights reserved\b|\bpublished\b|'
+    r'\bpublisher\b|\bprinted in\b|\blibrary of congress\b|\bedition\b|\bverlag\b|'
+    r'\bauflage\b|\bédition\b|\bDOI\b', re.IGNORECASE)
+_TOC_LINE_PATTERN = re.compile(r'(?:\.{3,}|\s{2,}|\t)\s*[\dxvil]+\s*$', re.IGNORECASE)
+_CONTENTS_PATTERN = re.compile(r'^\s*(?:table of )?contents\b|^\s*inhalt|^\s*sommaire\b|^\s*índice\b',
+                               re.IGNORECASE)
+_AD_PATTERN = re.compile(r'\balso by\b|\balso available\b|\bother (?:books|titles)\b|'
+                         r'www\.|https?://|\border (?:now|online)\b', re.IGNORECASE)
+
+def _text_blocks(text: str, offset: int = 0) -> Iterator[Tuple[int, str]]:
+    """(offset, block) for the blank-line or form-feed separated blocks of text"""
+    position = 0
+    for separator in re.finditer(r'\n\s*\n|\f', text):
+        block = text[position:separator.start()].strip()
+        if block:
+            yield offset + position, block
+        position = separator.end()
+    block = text[position:].strip()
+    if block:
+        yield offset + position, block
+
+def _is_front_matter_noise(block: str) -> bool:
+    """Tables of contents and publisher ads, which say little about the document itself"""
+    if _CONTENTS_PATTERN.search(block) or _AD_PATTERN.search(block):
+        return True
+    lines = [line for line in block.splitlines() if line.strip()]
+    return len(lines) >= 3 and sum(1 for line in lines if _TOC_LINE_PATTERN.search(line)) * 2 >= len(lines)
+
+def sample_metadata_text(text: str, max_tokens: int = METADATA_SAMPLE_TOKENS) -> str:
+    """
+    Pick the metadata-dense parts of a document for the metadata prompt
+    
+    Instead of the first characters, which for many PDFs are a cover caption,
+    an ad or the table of contents, the excerpt is built from the title page
+    (the first short blocks that are neither), the imprint/copyright page (blocks
+    with ISBN, ©, "published", ...) and the first heading after the title
+    page, then filled up with the following text. Parts keep their document
+    order and gaps are marked with [...].
+    
+    Args:
+        text: Extracted document text
+        max_tokens: Budget of the excerpt in estimated tokens
+        
+    Returns:
+        str: Excerpt of at most max_tokens * CHARS_PER_TOKEN characters
+    """
+    budget = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= budget:
+        return text
+    
+    blocks = list(_text_blocks(text[:_FRONT_MATTER_CHARS]))
+    tail_start = max(_FRONT_MATTER_CHARS, len(text) - _BACK_MATTER_CHARS)
+    tail = list(_text_blocks(text[tail_start:], tail_start))
+    content = [(start, block) for start, block in blocks if not _is_front_matter_noise(block)]
+    
+    picks = {}
+    used = 0
+    
+    def take(start, block, limit):
+        """Add up to limit more characters of block"""
+        nonlocal used
+        current = picks.get(start, '')
+        room = min(limit, budget - used)
+        if room < 20 or len(current) >= len(block):
+            return
+        picks[start] = block[:len(current) + room]
+        used += len(picks[start]) - len(current) + (0 if current else 7)  # Room for [...]
+    
+    # Title page: the leading short blocks, up to 40% of the budget
+    title_limit = int(budget * 0.4)
+    title_end = 0
+    for start, block in content:
+        if picks and (len(block) > 400 or len(block) > title_limit - used):
+            break
+        take(start, block, title_limit - used)
+        title_end = start
+    
+    # Imprint: the blocks with the most copyright/publisher signals, up to 35% more
+    imprint_limit = used + int(budget * 0.35)
+    scored = [(len(_IMPRINT_PATTERN.findall(block)), start, block) for start, block in blocks + tail]
+    for score, start, block in sorted(scored, key=lambda item: (-item[0], item[1])):
+        if score == 0 or used >= imprint_limit:
+            break
+        take(start, block, imprint_limit - used)
+    
+    # First heading after the title page: a short single line
+    for start, block in content:
+        if start > title_end and '\n' not in block and 3 <= len(block) <= 120:
+            take(start, block, len(block))
+            break
+    
+    # Fill the rest of the budget in document order
+    for start, block in content:
+        if used >= budget - 20:
+            break
+        take(start, block, budget - used)
+    
+    if not picks:
+        return text[:budget]
+    parts = []
+    previous_end = None
+    for start in sorted(picks):
+        if previous_end is not None and text[previous_end:start].strip():
+            parts.append("[...]")
+        parts.append(picks[start])
+        previous_end = start + len(picks[start])
+    return "\n\n".join(parts)[:budget]
+
+# JSON Schema of metadata answers in structured output mode
+METADATA_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "year": {"type": "string"},
+        "author": {"type": "string"},
+        "language": {"type": "string"}
+    },
+    "required": ["title", "year", "author", "language"],
+    "additionalProperties": False
+}
+
+# Structured output for metadata requests: 'auto' (JSON mode where the provider
+# offers it), 'schema' (JSON Schema where offered, else JSON mode) or 'tags'
+llm_output_mode = 'auto'
+
+def configure_llm_output(mode: str):
+    """Choose how metadata answers are requested, see llm_output_mode"""
+    global llm_output_mode
+    if mode not in ('auto', 'schema', 'tags'):
+        raise ValueError(f"Unknown LLM output mode: {mode}")
+    llm_output_mode = mode
+
+def metadata_response_format(provider) -> Optional[Dict[str, Any]]:
+    """
+    response_format for a metadata request to provider
+    
+    Returns:
+        OpenAI-style response_format dict, or None to use the tag format
+    """
+    if llm_output_mode == 'tags':
+        return None
+    # The raw OpenAI client talks to Ollama
+    modes = OllamaProvider.json_modes if llm_provider_identity(provider)[0] == 'ollama' \
+        else getattr(provider, 'json_modes', ())
+    if llm_output_mode == 'schema' and 'json_schema' in modes:
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "document_metadata", "strict": True, "schema": METADATA_JSON_SCHEMA}
+        }
+    if 'json_object' in modes:
+        return {"type": "json_object"}
+    return None
+
+def metadata_prompt_templates(filename: str, json_output: bool = False) -> List[str]:
+    """
+    Metadata prompt templates for send_to_llm, one per retry; later ones are stricter
+    
+    Args:
+        filename: Document filename, given to the model as a clue
+        json_output: Ask for a JSON object instead of tags (structured output modes)
+    """
+    if json_output:
+        return [
+            (
+                f"Extract the author name (lastname surname) of the main author (ignore other authors), "
+                f"year of publication, title, and language from the following text, considering the filename "
+                f"'{os.path.basename(filename)}' which may contain clues. Answer with a JSON object with the "
+                f"string fields \"title\", \"year\" (4 digits or \"Unknown\"), \"author\" (\"Lastname Firstname\") "
+                f"and \"language\" (2-letter code), for example:\n"
+                f'{{"title": "The publication title", "year": "2023", "author": "Lastname Firstname", "language": "en"}}\n\n'
+            ),
+            (
+                f"Return ONLY a JSON object, no other text, with exactly these keys: title, year, author, language. "
+                f"year is the 4-digit publication year or \"Unknown\", author is the main author as "
+                f"\"Lastname Firstname\", language is a 2-letter code.\n"
+                f"Document filename: {os.path.basename(filename)}\n"
+            )
+        ]
+    return [
+        # First attempt - simple structured format
+        (
+            f"Extract the author name (lastname surname) of the main author (ignore other authors), "
+            f"year of publication, title, and language from the following text, considering the filename '{os.path.basename(filename)}' "
+            f"which may contain clues. I need the output **only** in the following format with no additional text or explanations: \n"
+            f"<TITLE>The publication title</TITLE>\n<YEAR>2023</YEAR>\n<AUTHOR>Lastname Firstname</AUTHOR>\n<LANGUAGE>en</LANGUAGE>\n\n"
+        ),
+        # Second attempt - emphasize exact format
+        (
+            f"I need to extract metadata from a document. Please give me ONLY these four tags with the information, and nothing else:\n"
+            f"<TITLE>The exact title</TITLE>\n<YEAR>The publication year (4 digits)</YEAR>\n<AUTHOR>The author's name in 'Lastname Firstname' format</AUTHOR>\n<LANGUAGE>The language code</LANGUAGE>\n\n"
+            f"Document filename: {os.path.basename(filename)}\n"
+        ),
+        # Third attempt - even more explicit
+        (
+            f"You are a metadata extraction tool. Extract these fields from the text:\n"
+            f"1. TITLE (the full publication title)\n"
+            f"2. YEAR (the 4-digit publication year, use 'Unknown' if not found)\n"
+            f"3. AUTHOR (format as 'Lastname Firstname', preserve any commas)\n"
+            f"4. LANGUAGE (the 2-letter language code, e.g., 'en', 'de', 'fr')\n\n"
+            f"Format your response EXACTLY like this with no other text:\n"
+            f"<TITLE>The title</TITLE>\n<YEAR>2023</YEAR>\n<AUTHOR>Smith John</AUTHOR>\n<LANGUAGE>en</LANGUAGE>\n\n"
+        )
+    ]
+
+def send_to_llm(text: str, filename: str, provider: Union[str, LLMProvider], 
+              model_name: Optional[str] = None,
+              api_key: Optional[str] = None,
+              max_attempts: int = 5,
+              verbose: bool = False) -> str:
+    """
+    Extract metadata from text using an LLM provider
+    
+    Args:
+        text: Text to analyze
+        filename: Filename for context
+        provider: Provider type string ('ollama', 'groq', 'poe') or LLMProvider instance
+        model_name: Optional model name to use
+        api_key: Optional API key for cloud providers
+        max_attempts: Maximum retry attempts
+        verbose: Whether to print debug information
+        
+    Returns:
+        str: The formatted metadata response
+        
+    Raises:
+        CircuitOpenError: The provider's endpoint is down; no retries are made
+    """
+    if isinstance(provider, (int, float)):
+        logging.error(f"Invalid provider parameter: {provider} (type: {type(provider)}). Expected provider string or LLMProvider instance.")
+        return ""
+        
+    # Get or validate provider
+    if isinstance(provider, str):
+        try:
+            llm_provider = get_llm_provider(provider, model_name, api_key)
+        except ImportError as e:
+            logging.error(f"Failed to initialize {provider} provider: {str(e)}")
+            # Fall back to Ollama if available
+            try:
+                llm_provider = get_llm_provider("ollama")
+                logging.info(f"Falling back to Ollama provider")
+            except ImportError:
+                raise ImportError("No LLM providers available. Install at least one client library.")
+    else:
+        llm_provider = provider
+    
+    base_retry_wait = 2  # Base wait time in seconds
+    
+    response_format = metadata_response_format(llm_provider)
+    tag_templates = metadata_prompt_templates(filename)
+    prompt_templates = metadata_prompt_templates(filename, True) if response_format else tag_templates
+    sample = sample_metadata_text(text)
+    
+    # Try different prompt templates if we encounter format issues
+    attempt = 1
+    while attempt <= max_attempts:
+        # Choose prompt template based on attempt number
+        template_index = min(attempt - 1, len(prompt_templates) - 1)
+        prompt_template = prompt_templates[template_index]
+        
+        logging.debug(f"Consulting LLM {provider} on file: {filename} (Attempt: {attempt}, Template: {template_index + 1})")
+
+
+        # Build the final prompt with text sample
+        prompt = prompt_template + f"Here is the document text:\n{sample}"
+        messages = [{"role": "user", "content": prompt}]
+        
+        try:
+            output = llm_chat_completion(
+                llm_provider,
+                messages,
+                temperature=0.5,  # Reduced temperature for more consistent formatting
+                max_tokens=250,
+                timeout=120,  # 2 minute timeout
+                validate=lambda content: bool(parse_metadata(content)),
+                response_format=response_format
+            )
+            if verbose:
+                logging.debug(f"Metadata content received from LLM: {output}")
+            
+            # Validate the response has the expected format
+            metadata = parse_metadata(output, verbose=verbose)
+            if metadata:
+                return output
+            else:
                 logging.warning(f"Unexpected response format from LLM: {output}")
                 # Less aggressive backoff for format issues
                 if attempt < max_attempts:
@@ -715,14 +2108,24 @@ def send_to_llm(text: str, filename: str, provider: Union[str, LLMProvider],
                     continue
                 return output
             
+        except CircuitOpenError:
+            # The endpoint is down; retrying only stalls this file
+            raise
         except Exception as e:
-            if "rate_limit" in str(e).lower() or "timeout" in str(e).lower():
+            if is_transient_llm_error(e):
                 # Use exponential backoff for rate limiting/timeouts
                 wait_time = base_retry_wait * (2 ** (attempt - 1))  # Exponential backoff
                 logging.info(f"Rate limit or timeout encountered. Retrying in {wait_time:.2f} seconds...")
                 time.sleep(wait_time)
                 attempt += 1
                 continue
+            elif response_format is not None:
+                # Model or server without structured output; use the tag format
+                logging.warning(f"Structured output request failed for {filename}, falling back to tags: {e}")
+                response_format = None
+                prompt_templates = tag_templates
+                attempt += 1
+                continue
             else:
                 logging.error(f"Error communicating with LLM for {filename}: {e}")
                 if attempt < max_attempts:
@@ -736,6 +2139,95 @@ def send_to_llm(text: str, filename: str, provider: Union[str, LLMProvider],
     logging.error(f"Maximum retry attempts reached for LLM request.")
     return ""
 
+def is_transient_llm_error(error: Exception) -> bool:
+    """Whether an LLM request failed on rate limiting or a timeout, so a longer backoff helps"""
+    message = str(error).lower()
+    if "rate_limit" in message or "timeout" in message or "timed out" in message:
+        return True
+    # HTTP errors from the async client carry the response status
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status in (429, 503) or isinstance(error, (TimeoutError, asyncio.TimeoutError))
+
+async def send_to_llm_async(text: str, filename: str, provider: LLMProvider,
+              max_attempts: int = 5,
+              verbose: bool = False) -> str:
+    """
+    Async variant of send_to_llm, awaited on the shared LLM event loop
+    
+    Uses the same prompts and retry schedule, and also raises CircuitOpenError;
+    a document waiting for its answer or its next attempt does not hold a thread.
+    
+    Args:
+        text: Text to analyze
+        filename: Filename for context
+        provider: LLMProvider instance
+        max_attempts: Maximum retry attempts
+        verbose: Whether to print debug information
+        
+    Returns:
+        str: The formatted metadata response
+    """
+    base_retry_wait = 2  # Base wait time in seconds
+    response_format = metadata_response_format(provider)
+    tag_templates = metadata_prompt_templates(filename)
+    prompt_templates = metadata_prompt_templates(filename, True) if response_format else tag_templates
+    sample = sample_metadata_text(text)
+    
+    for attempt in range(1, max_attempts + 1):
+        if shutdown_flag.is_set():
+            return ""
+        template_index = min(attempt - 1, len(prompt_templates) - 1)
+        logging.debug(f"Consulting LLM {provider} on file: {filename} (Attempt: {attempt}, Template: {template_index + 1})")
+        
+        prompt = prompt_templates[template_index] + f"Here is the document text:\n{sample}"
+        messages = [{"role": "user", "content": prompt}]
+        
+        try:
+            output = await llm_chat_completion_async(
+                provider,
+                messages,
+                temperature=0.5,
+                max_tokens=250,
+                timeout=120,
+                validate=lambda content: bool(parse_metadata(content)),
+                response_format=response_format
+            )
+            if verbose:
+                logging.debug(f"Metadata content received from LLM: {output}")
+            
+            if parse_metadata(output, verbose=verbose):
+                return output
+            logging.warning(f"Unexpected response format from LLM: {output}")
+            if attempt == max_attempts:
+                return output
+            wait_time = base_retry_wait * (1.5 ** (attempt - 1))
+            logging.info(f"Retrying with different prompt in {wait_time:.2f} seconds...")
+            
+        except CircuitOpenError:
+            # The endpoint is down; retrying only stalls this file
+            raise
+        except Exception as e:
+            if is_transient_llm_error(e):
+                wait_time = base_retry_wait * (2 ** (attempt - 1))
+                logging.info(f"Rate limit or timeout encountered. Retrying in {wait_time:.2f} seconds...")
+            elif response_format is not None:
+                # Model or server without structured output; use the tag format
+                logging.warning(f"Structured output request failed for {filename}, falling back to tags: {e}")
+                response_format = None
+                prompt_templates = tag_templates
+                continue
+            else:
+                logging.error(f"Error communicating with LLM for {filename}: {e}")
+                if attempt == max_attempts:
+                    return ""
+                wait_time = base_retry_wait * (1.5 ** (attempt - 1))
+                logging.info(f"Retrying in {wait_time:.2f} seconds...")
+        
+        await asyncio.sleep(wait_time)
+    
+    logging.error(f"Maximum retry attempts reached for LLM request.")
+    return ""
+
 class ImportCache:
     """Global cache for imports and their availability"""
     _instance = None
@@ -788,6 +2280,66 @@ class ImportCache:
                 raise ImportError(f"Failed to import {cache_key}: {e}")
         return self._modules[cache_key]
 
+class ExtractorPool:
+    """
+    Pool of pre-initialized extractors keyed by extractor type.
+
+    Each worker checks out an idle extractor for the duration of one file and
+    returns it afterwards, so the number of live instances is bounded by the
+    number of concurrent workers rather than the number of input files.
+    Dependency probes run once per type; further instances are spawned from
+    the first one when the extractor supports it.
+    """
+
+    def __init__(self, factory: Callable[[str], Any]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._idle = {}        # extractor_type -> list of idle extractors
+        self._prototypes = {}  # extractor_type -> first extractor created
+        self._created = {}     # extractor_type -> number of instances created
+
+    def acquire(self, extractor_type: str) -> Any:
+        """Check out an idle extractor, creating one if none is available"""
+        with self._lock:
+            idle = self._idle.setdefault(extractor_type, [])
+            if idle:
+                return idle.pop()
+            prototype = self._prototypes.get(extractor_type)
+
+        # Create outside the lock - first-time initialization can be slow
+        if prototype is not None and hasattr(prototype, 'spawn'):
+            extractor = prototype.spawn()
+        else:
+            extractor = self._factory(extractor_type)
+
+        with self._lock:
+            self._prototypes.setdefault(extractor_type, extractor)
+            self._created[extractor_type] = self._created.get(extractor_type, 0) + 1
+            logging.debug(f"Created {extractor_type} extractor #{self._created[extractor_type]}")
+        return extractor
+
+    def release(self, extractor_type: str, extractor: Any):
+        """Return an extractor to the pool, clearing per-document state"""
+        if hasattr(extractor, 'set_password'):
+            extractor.set_password(None)
+        with self._lock:
+            self._idle.setdefault(extractor_type, []).append(extractor)
+
+    @contextmanager
+    def checkout(self, extractor_type: str):
+        """Context manager wrapping acquire/release"""
+        extractor = self.acquire(extractor_type)
+        try:
+            yield extractor
+        finally:
+            self.release(extractor_type, extractor)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Number of instances created per extractor type"""
+        with self._lock:
+            return dict(self._created)
+
 class ExtractionManager:
     """Central manager for text extraction operations"""
     
@@ -823,6 +2375,9 @@ class ExtractionManager:
         '.tcr': 'Text',   # Use Text extractor but with Calibre as method
     }
 
+    # Extraction options only understood by PDFExtractor.extract_text
+    PDF_ONLY_OPTIONS = ('page_parallel_threshold', 'page_workers', 'hybrid_ocr')
+
     def __init__(self, debug: bool = False):
         self._debug = debug
         self._setup_logging(debug)
@@ -830,7 +2385,9 @@ class ExtractionManager:
         self._binary_paths, self._binaries = self._check_system_dependencies()
         
         self._versions = self._check_versions()
-        self._extractors = {}
+        # Pre-initialized extractors are checked out per file and returned afterwards,
+        # so dependency probes and warm OCR models survive across files
+        self._pool = ExtractorPool(self._create_extractor)
 
         # Share binary paths with extractors
         self._shared_binary_paths = self._binary_paths
@@ -1200,59 +2757,55 @@ class ExtractionManager:
         
         return versions
 
-    def _get_extractor(self, file_path: str) -> Union['PDFExtractor', 'EPUBExtractor', 'DJVUExtractor', 'MOBIExtractor', 'TextExtractor', 'HTMLExtractor']:
-        """Get or create appropriate extractor for file type"""
-        file_ext = os.path.splitext(file_path)[1].lower()
-        cache_key = f"{file_ext}:{file_path}"
+    def _create_extractor(self, extractor_type: str) -> Union['PDFExtractor', 'EPUBExtractor', 'DJVUExtractor', 'MOBIExtractor', 'TextExtractor', 'HTMLExtractor']:
+        """Create a fresh extractor for an extractor type (pool factory)"""
+        import_cache = ImportCache()  # Shared singleton import cache for all extractors
         
-        if cache_key not in self._extractors:
-            import_cache = ImportCache()  # Create an import cache instance for all extractors
-            
-            # Get the extractor type from supported extensions
-            extractor_type = self.SUPPORTED_EXTENSIONS.get(file_ext)
-            
-            if not extractor_type:
-                raise ValueError(f"Unsupported file type: {file_path} (extension: {file_ext})")
-                
-            # Create appropriate extractor
-            if extractor_type == 'PDF':
-                # Pass the binary paths to the PDF extractor
-                self._extractors[cache_key] = PDFExtractor(
-                    debug=self._debug, 
-                    binary_paths=self._binary_paths  # Pass binary paths to avoid duplication
-                )
-            elif extractor_type == 'EPUB':
-                self._extractors[cache_key] = EPUBExtractor(
-                    import_cache=import_cache, 
-                    debug=self._debug,
-                    binary_paths=self._binary_paths
-                )
-            elif extractor_type == 'DJVU':
-                self._extractors[cache_key] = DJVUExtractor(
-                    import_cache=import_cache, 
-                    debug=self._debug,
-                    binary_paths=self._binary_paths
-                )
-            elif extractor_type == 'MOBI':
-                self._extractors[cache_key] = MOBIExtractor(
-                    import_cache=import_cache, 
-                    debug=self._debug,
-                    binary_paths=self._binary_paths
-                )
-            elif extractor_type == 'Text':
-                self._extractors[cache_key] = TextExtractor(
-                    import_cache=import_cache, 
-                    debug=self._debug,
-                    binary_paths=self._binary_paths
-                )
-            elif extractor_type == 'HTML':
-                self._extractors[cache_key] = HTMLExtractor(
-                    import_cache=import_cache, 
-                    debug=self._debug,
-                    binary_paths=self._binary_paths
-                )
-        
-        return self._extractors[cache_key]
+        if extractor_type == 'PDF':
+            # Pass the binary paths to the PDF extractor
+            return PDFExtractor(
+                debug=self._debug, 
+                binary_paths=self._binary_paths  # Pass binary paths to avoid duplication
+            )
+        elif extractor_type == 'EPUB':
+            return EPUBExtractor(
+                import_cache=import_cache, 
+                debug=self._debug,
+                binary_paths=self._binary_paths
+            )
+        elif extractor_type == 'DJVU':
+            return DJVUExtractor(
+                import_cache=import_cache, 
+                debug=self._debug,
+                binary_paths=self._binary_paths
+            )
+        elif extractor_type == 'MOBI':
+            return MOBIExtractor(
+                import_cache=import_cache, 
+                debug=self._debug,
+                binary_paths=self._binary_paths
+            )
+        elif extractor_type == 'Text':
+            return TextExtractor(
+                import_cache=import_cache, 
+                debug=self._debug,
+                binary_paths=self._binary_paths
+            )
+        elif extractor_type == 'HTML':
+            return HTMLExtractor(
+                import_cache=import_cache, 
+                debug=self._debug,
+                binary_paths=self._binary_paths
+            )
+        raise ValueError(f"Unknown extractor type: {extractor_type}")
+
+    def _get_extractor_type(self, file_path: str) -> str:
+        """Map a file path to its extractor type"""
+        file_ext = os.path.splitext(file_path)[1].lower()
+        extractor_type = self.SUPPORTED_EXTENSIONS.get(file_ext)
+        if not extractor_type:
+            raise ValueError(f"Unsupported file type: {file_path} (extension: {file_ext})")
+        return extractor_type
     
     def extract(self, input_path: str, 
         output_path: Optional[str] = None,
@@ -1284,14 +2837,14 @@ class ExtractionManager:
         Returns:
             Extracted text if output_path is None, else success boolean
         """
+        extractor = None
+        extractor_type = None
         try:
             # Check if file type is supported
-            file_ext = os.path.splitext(input_path)[1].lower()
-            if file_ext not in self.SUPPORTED_EXTENSIONS:
-                raise ValueError(f"Unsupported file type: {input_path} (extension: {file_ext})")
+            extractor_type = self._get_extractor_type(input_path)
                 
-            # Get appropriate extractor
-            extractor = self._get_extractor(input_path)
+            # Check out an idle extractor of this type from the pool
+            extractor = self._pool.acquire(extractor_type)
             
             # Configure extraction
             if password and hasattr(extractor, 'set_password'):
@@ -1336,6 +2889,9 @@ class ExtractionManager:
                 extraction_kwargs = kwargs.copy()
                 
                 # Only pass specific parameters to PDF extractors
+                if not isinstance(extractor, PDFExtractor):
+                    for option in self.PDF_ONLY_OPTIONS:
+                        extraction_kwargs.pop(option, None)
                 if isinstance(extractor, PDFExtractor):
                     if ocr_method:
                         extraction_kwargs['ocr_method'] = ocr_method
@@ -1429,11 +2985,8 @@ class ExtractionManager:
                         
             # Write output file if path provided
             if output_path:
-                # Make sure the directory exists
-                os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
                 logging.info(f"Writing text file: {output_path}")
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(text)
+                atomic_write_bytes(output_path, text.encode('utf-8'))
                 return True
             return text
             
@@ -1446,6 +2999,10 @@ class ExtractionManager:
                 if self._debug:
                     traceback.print_exc()
             return False if output_path else ""
+        finally:
+            # Return the extractor to the pool for the next file
+            if extractor is not None:
+                self._pool.release(extractor_type, extractor)
 
     @contextmanager
     def _progress_context(self, message: str):
@@ -2034,6 +3591,8 @@ class DJVUExtractor:
         djvu_type, djvu_path = self.find_djvu_lib()
         self._djvu_type = djvu_type
         self._djvu_path = djvu_path
+        # 0-based pages to extract in metadata mode, None for all; set per extract_text call
+        self._pages = None
         
         if self._debug and djvu_type:
             logging.debug(f"Found djvu as {djvu_type} at: {djvu_path}")
@@ -2113,11 +3672,18 @@ class DJVUExtractor:
             djvu_path: Path to DJVU file
             preferred_method: Optional preferred extraction method
             progress_callback: Optional callback for progress updates
-            **kwargs: Additional options (ignored)
+            **kwargs: Additional options
+                metadata_pages: Only extract (or OCR) this many leading pages
+                metadata_last_page: With metadata_pages, also extract the last page
             
         Returns:
             Extracted text
         """
+        self._pages = None
+        if kwargs.get('metadata_pages'):
+            self._pages = self._metadata_pages(djvu_path, kwargs['metadata_pages'],
+                                               kwargs.get('metadata_last_page', False))
+        
         methods = ['djvulibre', 'pdf_conversion', 'ocr']
         
         # Reorder methods if preferred method is specified
@@ -2152,6 +3718,28 @@ class DJVUExtractor:
 
         return text.strip()
 
+    def _metadata_pages(self, djvu_path: str, first_pages: int,
+                        last_page: bool = False) -> Optional[List[int]]:
+        """0-based pages for metadata mode, or None if the document is short enough to extract whole"""
+        page_count = None
+        try:
+            process = subprocess.run(['djvused', '-e', 'n', djvu_path],
+                                     capture_output=True, text=True, timeout=30)
+            if process.returncode == 0:
+                page_count = int(process.stdout.strip())
+        except (OSError, ValueError, subprocess.SubprocessError) as e:
+            logging.debug(f"DJVU page count failed: {e}")
+        if page_count is None:
+            # Without a count the last page is unknown, the leading ones are still safe
+            return list(range(first_pages))
+        if page_count <= first_pages + (1 if last_page else 0):
+            return None
+        return list(range(first_pages)) + ([page_count - 1] if last_page else [])
+
+    def _page_spec(self) -> Optional[str]:
+        """DjVuLibre page specification (1-based, comma separated) of the selected pages"""
+        return ','.join(str(page + 1) for page in self._pages) if self._pages else None
+
     def extract_with_djvulibre(self, djvu_path: str, progress_callback=None) -> str:
         """Extract text using djvulibre library or command-line tools"""
         # Try python-djvulibre first if available
@@ -2164,9 +3752,10 @@ class DJVUExtractor:
                 
                 with djvu.DjVuDocument.create_by_filename(djvu_path) as doc:
                     total_pages = doc.pages_number
+                    pages = [i for i in self._pages if i < total_pages] if self._pages else range(total_pages)
                     
-                    with tqdm(total=total_pages, desc="DjVuLibre extraction", unit="pages") as pbar:
-                        for i in range(total_pages):
+                    with tqdm(total=len(pages), desc="DjVuLibre extraction", unit="pages") as pbar:
+                        for i in pages:
                             try:
                                 page = doc.pages[i]
                                 page_text = page.text.decode('utf-8', errors='replace')
@@ -2196,6 +3785,8 @@ class DJVUExtractor:
             
             # Run djvutxt to extract text
             cmd = ['djvutxt', djvu_path, temp_path]
+            if self._pages:
+                cmd.insert(1, f'-page={self._page_spec()}')
             process = subprocess.run(cmd, capture_output=True, text=True)
             
             if process.returncode != 0:
@@ -2231,6 +3822,8 @@ class DJVUExtractor:
             
             # Convert DJVU to PDF
             cmd = ['ddjvu', '-format=pdf', djvu_path, pdf_path]
+            if self._pages:
+                cmd.insert(1, f'-page={self._page_spec()}')
             process = subprocess.run(cmd, capture_output=True, text=True)
             
             if process.returncode != 0:
@@ -2277,6 +3870,8 @@ class DJVUExtractor:
                 # Convert DJVU to images
                 output_pattern = os.path.join(temp_dir, 'page_%d.tif')
                 cmd = ['ddjvu', '-format=tiff', djvu_path, output_pattern]
+                if self._pages:
+                    cmd.insert(1, f'-page={self._page_spec()}')
                 process = subprocess.run(cmd, capture_output=True, text=True)
                 
                 if process.returncode != 0:
@@ -3085,35 +4680,323 @@ class TableExtractor:
         
         for method, params in methods:
             try:
-                current_tables = self._camelot.read_pdf(
-                    pdf_path,
-                    flavor=method,
-                    pages='all',
-                    **params
-                )
-                
-                if len(current_tables) > 0:
-                    tables.extend(current_tables)
-                    
-            except Exception as e:
-                logging.debug(f"Table extraction failed with {method}: {e}")
-                continue
-                
-        return tables
+                current_tables = self._camelot.read_pdf(
+                    pdf_path,
+                    flavor=method,
+                    pages='all',
+                    **params
+                )
+                
+                if len(current_tables) > 0:
+                    tables.extend(current_tables)
+                    
+            except Exception as e:
+                logging.debug(f"Table extraction failed with {method}: {e}")
+                continue
+                
+        return tables
+        
+    def _init_camelot(self) -> bool:
+        """Initialize Camelot library only when needed."""
+        if self._camelot is None:
+            try:
+                # Lazy import for Camelot (which may in turn import pydot)
+                self._camelot = self._import_cache.import_module('camelot')
+                return True
+            except Exception as e:
+                logging.error(f"Failed to initialize Camelot: {e}")
+                return False
+        return True
+
+    
+class PageRaster:
+    """
+    One rendered page, shared by every OCR engine without re-encoding or copying.
+    
+    The pixels live in a single buffer (PyMuPDF pixmap samples, or a PIL image
+    from pdftoppm). array() returns a NumPy view of that buffer and image()
+    a PIL image over the same memory. A conversion to the other mode ('L' or
+    'RGB') is made at most once per page and cached.
+    """
+    
+    MODES = ('L', 'RGB')
+    
+    def __init__(self, page_num: int, mode: str, size: Tuple[int, int],
+                 samples=None, image=None, owner=None):
+        """
+        Args:
+            page_num: Zero-based page number
+            mode: Pixel layout of the buffer, 'L' or 'RGB'
+            size: (width, height) in pixels
+            samples: Raw interleaved 8-bit samples (e.g. Pixmap.samples_mv)
+            image: PIL image holding the pixels when no raw buffer is available
+            owner: Object that must stay alive while `samples` is referenced
+        """
+        self.page_num = page_num
+        self.mode = mode
+        self.size = size
+        self._samples = samples
+        self._owner = owner
+        self._images = {mode: image} if image is not None else {}
+        self._arrays = {}
+    
+    @classmethod
+    def from_pixmap(cls, page_num: int, pix) -> 'PageRaster':
+        """Wrap a PyMuPDF pixmap (alpha=False, gray or RGB) without copying"""
+        samples = pix.samples_mv if hasattr(pix, 'samples_mv') else pix.samples
+        mode = 'L' if pix.n == 1 else 'RGB'
+        return cls(page_num, mode, (pix.width, pix.height), samples=samples, owner=pix)
+    
+    def array(self, mode: Optional[str] = None):
+        """
+        Get the page as a read-only uint8 NumPy array, (h, w) for 'L' or (h, w, 3) for 'RGB'.
+        
+        In the native mode this is a view of the render buffer.
+        """
+        mode = mode or self.mode
+        if mode not in self._arrays:
+            import numpy as np
+            width, height = self.size
+            if mode == self.mode and self._samples is not None:
+                array = np.frombuffer(self._samples, dtype=np.uint8)
+                if mode == 'RGB':
+                    array = array.reshape(height, width, 3)
+                else:
+                    array = array.reshape(height, width)
+            else:
+                array = np.asarray(self.image(mode))
+            array.flags.writeable = False
+            self._arrays[mode] = array
+        return self._arrays[mode]
+    
+    def image(self, mode: Optional[str] = None) -> 'PIL.Image':
+        """Get the page as a PIL image; in the native mode it shares the render buffer"""
+        mode = mode or self.mode
+        if mode not in self._images:
+            from PIL import Image
+            if mode == self.mode:
+                self._images[mode] = Image.frombuffer(mode, self.size, self._samples, 'raw', mode, 0, 1)
+            else:
+                self._images[mode] = self.image().convert(mode)
+        return self._images[mode]
+    
+    def close(self):
+        """Release the buffer and every cached conversion"""
+        for image in self._images.values():
+            try:
+                image.close()
+            except Exception:
+                pass
+        self._images.clear()
+        self._arrays.clear()
+        self._samples = None
+        self._owner = None
+
+class PageRasterizer:
+    """
+    Lazy page-image iterator for OCR with a bounded prefetch buffer.
+    
+    Pages are rendered one at a time on a background thread, at most `prefetch`
+    pages ahead of the consumer, so peak memory is proportional to the prefetch
+    depth instead of the page count. Renders in-process with PyMuPDF's
+    get_pixmap when available, otherwise runs pdftoppm (via pdf2image) per page.
+    
+    Pages are yielded as PageRaster objects, which the caller closes when done.
+    
+    Usage:
+        with PageRasterizer(pdf_path, dpi=300, grayscale=True) as pages:
+            for raster in pages:
+                text = ocr(raster.image())
+    """
+    
+    _END = object()  # Marks the end of the page stream
+    
+    def __init__(self, pdf_path: str, dpi: int = 300, grayscale: bool = False,
+                 pages: Optional[List[int]] = None, password: Optional[str] = None,
+                 prefetch: int = 2, max_height: Optional[int] = None,
+                 poppler_path: Optional[str] = None):
+        """
+        Args:
+            pdf_path: Path to PDF file
+            dpi: Render resolution
+            grayscale: Render single-channel images instead of RGB
+            pages: Zero-based page numbers to render (default: all pages)
+            password: Password for encrypted PDFs
+            prefetch: Maximum number of rendered pages waiting for the consumer
+            max_height: Optional pixel height limit, lowers the resolution for tall pages
+            poppler_path: Directory of the poppler binaries for the pdftoppm backend
+            
+        Raises:
+            Exception: If the document cannot be opened
+        """
+        self.pdf_path = pdf_path
+        self.dpi = dpi
+        self.grayscale = grayscale
+        self.password = password
+        self.prefetch = max(1, prefetch)
+        self.max_height = max_height
+        self.poppler_path = poppler_path
+        self._import_cache = ImportCache()
+        self.backend = 'pymupdf' if self._import_cache.is_available('fitz') else 'pdftoppm'
+        
+        # Open the document once up front so unreadable files fail before iteration
+        page_count = self._count_pages()
+        self.page_numbers = list(pages) if pages is not None else list(range(page_count))
+        
+        self._stop = threading.Event()
+        self._queue = None
+        self._thread = None
+    
+    def __len__(self) -> int:
+        return len(self.page_numbers)
+    
+    def __iter__(self):
+        for _, raster in self.iter_pages():
+            yield raster
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _open_document(self):
+        """Open and authenticate the document with PyMuPDF"""
+        fitz = self._import_cache.import_module('fitz')
+        doc = fitz.open(self.pdf_path)
+        if doc.needs_pass and not (self.password and doc.authenticate(self.password)):
+            doc.close()
+            raise ValueError("Invalid PDF password")
+        return doc
+    
+    def _count_pages(self) -> int:
+        if self.backend == 'pymupdf':
+            doc = self._open_document()
+            try:
+                return len(doc)
+            finally:
+                doc.close()
         
-    def _init_camelot(self) -> bool:
-        """Initialize Camelot library only when needed."""
-        if self._camelot is None:
+        pdf2image = self._import_cache.import_module('pdf2image')
+        info = pdf2image.pdfinfo_from_path(self.pdf_path, userpw=self.password,
+                                           poppler_path=self.poppler_path)
+        return int(info['Pages'])
+    
+    def _render(self, doc, page_num: int) -> Optional[PageRaster]:
+        """Render one page"""
+        if self.backend == 'pymupdf':
+            fitz = self._import_cache.import_module('fitz')
+            
+            page = doc[page_num]
+            zoom = self.dpi / 72
+            if self.max_height and page.rect.height:
+                zoom = min(zoom, self.max_height / page.rect.height)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom),
+                                  colorspace=fitz.csGRAY if self.grayscale else fitz.csRGB,
+                                  alpha=False)
+            return PageRaster.from_pixmap(page_num, pix)
+        
+        pdf2image = self._import_cache.import_module('pdf2image')
+        conversion_args = {
+            'dpi': self.dpi,
+            'first_page': page_num + 1,
+            'last_page': page_num + 1,
+            'grayscale': self.grayscale,
+            'thread_count': 1,
+            'use_cropbox': True,
+            'strict': False
+        }
+        if self.max_height:
+            conversion_args['size'] = (None, self.max_height)
+        if self.password:
+            conversion_args['userpw'] = self.password
+        if self.poppler_path:
+            conversion_args['poppler_path'] = self.poppler_path
+        images = pdf2image.convert_from_path(self.pdf_path, **conversion_args)
+        if not images:
+            return None
+        image = images[0]
+        return PageRaster(page_num, image.mode, image.size, image=image)
+    
+    def _put(self, item) -> bool:
+        """Queue an item, giving up if the consumer has stopped"""
+        while not self._stop.is_set():
             try:
-                # Lazy import for Camelot (which may in turn import pydot)
-                self._camelot = self._import_cache.import_module('camelot')
+                self._queue.put(item, timeout=0.1)
                 return True
-            except Exception as e:
-                logging.error(f"Failed to initialize Camelot: {e}")
-                return False
-        return True
-
+            except queue.Full:
+                continue
+        return False
+    
+    def _produce(self):
+        """Background renderer feeding the prefetch queue"""
+        doc = None
+        try:
+            if self.backend == 'pymupdf':
+                doc = self._open_document()
+            for page_num in self.page_numbers:
+                if self._stop.is_set() or shutdown_flag.is_set():
+                    break
+                try:
+                    raster = self._render(doc, page_num)
+                except Exception as e:
+                    logging.error(f"Rendering page {page_num + 1} of {self.pdf_path} failed: {e}")
+                    continue
+                if raster is None:
+                    continue
+                if not self._put((page_num, raster)):
+                    raster.close()
+                    break
+        except Exception as e:
+            self._put(e)
+        finally:
+            if doc is not None:
+                doc.close()
+            self._put(self._END)
     
+    def iter_pages(self):
+        """
+        Yield (page_num, raster) in page order; pages that fail to render are skipped.
+        
+        Each PageRaster belongs to the caller, who should close it when done.
+        """
+        self.close()
+        self._stop.clear()
+        self._queue = queue.Queue(maxsize=self.prefetch)
+        self._thread = threading.Thread(target=self._produce, name="page-rasterizer", daemon=True)
+        self._thread.start()
+        
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.close()
+    
+    def close(self):
+        """Stop rendering and release any prefetched pages"""
+        self._stop.set()
+        # The producer notices the stop flag within one put timeout; join it
+        # first so no page can be queued after the drain below
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._queue is not None:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, tuple):
+                    try:
+                        item[1].close()
+                    except Exception:
+                        pass
+
 class PDFExtractor:
     """Enhanced PDF text extraction with lazy loading and multiple fallback methods"""
 
@@ -3136,7 +5019,35 @@ class PDFExtractor:
     OCR_METHODS = ['tesseract', 'easyocr', 'paddleocr', 'doctr', 'kraken', 'kraken_cli']
     
     TABLE_METHODS = ['camelot']
-    
+
+    # Page-wise text-layer methods that can shard one document across processes
+    PAGE_PARALLEL_METHODS = ['pymupdf', 'pdfplumber', 'pypdf']
+    PAGE_PARALLEL_THRESHOLD = 500  # Pages; 0 disables sharding
+
+    # Page triage thresholds
+    TRIAGE_MIN_TEXT_CHARS = 20       # Fewer characters means no usable text layer
+    TRIAGE_IMAGE_COVERAGE = 0.5      # Image area share above which a page counts as scanned
+    TRIAGE_GARBLED_RATIO = 0.1       # Share of junk characters above which text is garbled
+    # Text-layer methods that read the same font tables, so they cannot do better than
+    # PyMuPDF on image-only or garbled pages
+    TEXT_LAYER_METHODS = ['pymupdf', 'pdfplumber', 'pypdf', 'pdfminer']
+
+    # OCR engines that can recognize single page images, usable for hybrid extraction,
+    # with the (dpi, grayscale) each one is rendered at
+    PAGE_OCR_METHODS = ['tesseract', 'easyocr', 'paddleocr']
+    PAGE_OCR_RENDER = {
+        'tesseract': (300, True),
+        'easyocr': (300, False),
+        'paddleocr': (200, False)
+    }
+
+    # Rendered pages buffered ahead of the OCR engine
+    RASTER_PREFETCH = 2
+
+    # Loaded OCR models are not safe to share between threads, so spawned
+    # siblings start without them and load their own on first use
+    _OCR_MODEL_ATTRS = ('_paddleocr', '_paddleocr_german', '_doctr_predictor', '_reader')
+
     def __init__(self, debug=False, binary_paths=None):
         """
         Initialize PDF extractor with optional binary paths
@@ -3153,6 +5064,7 @@ class PDFExtractor:
         self._ocr_initialized = {}
         self._available_methods = None
         self._ocr_failed_methods = set()
+        self._triage_cache = None  # (key, page map) of the last triaged document
         
         # Setup Windows paths first
         self._setup_windows_paths()
@@ -3184,6 +5096,29 @@ class PDFExtractor:
         available = sorted(list(self._initialized_methods))
         logging.debug(f"Available extraction methods: {', '.join(available)}")
 
+    def spawn(self) -> 'PDFExtractor':
+        """
+        Create a sibling extractor that reuses this instance's dependency probes.
+
+        Skips PATH setup, binary detection and the core/OCR import checks. The set
+        of failed OCR methods is shared, so an engine found broken in one worker
+        is not retried by the others.
+
+        Returns:
+            PDFExtractor: New extractor ready for use in another worker
+        """
+        sibling = PDFExtractor.__new__(PDFExtractor)
+        sibling.__dict__.update(self.__dict__)
+        for attr in self._OCR_MODEL_ATTRS:
+            sibling.__dict__.pop(attr, None)
+        sibling._password = None
+        sibling._current_doc = None
+        sibling._initialized_methods = set(self._initialized_methods)
+        sibling._ocr_initialized = {}
+        sibling._available_methods = None
+        sibling._triage_cache = None
+        return sibling
+
     def _setup_windows_paths(self):
         """Add binary paths to system PATH for Windows"""
         if platform.system() == 'Windows':
@@ -3833,6 +5768,16 @@ class PDFExtractor:
             force_ocr: Whether to force OCR even if text layer exists
             progress_callback: Optional callback for progress updates
             **kwargs: Additional extraction options
+                page_parallel_threshold: Shard documents with more pages than this
+                    across processes (default: PAGE_PARALLEL_THRESHOLD, 0 disables)
+                page_workers: Size of the shared page pool when not set by process_files
+                    (default: CPU count)
+                hybrid_ocr: For documents mixing text-layer and scanned pages, OCR only
+                    the scanned pages (default: True)
+                metadata_pages: Only extract (or OCR) this many leading pages, for
+                    sorting without a full extraction
+                metadata_last_page: With metadata_pages, also extract the last page
+                    (colophon)
             
         Returns:
             str: Extracted text
@@ -3840,6 +5785,29 @@ class PDFExtractor:
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"File not found: {pdf_path}")
         
+        metadata_pages = kwargs.pop('metadata_pages', None)
+        metadata_last_page = kwargs.pop('metadata_last_page', False)
+        if metadata_pages:
+            subset_path = self._metadata_subset(pdf_path, metadata_pages, metadata_last_page)
+            if subset_path:
+                try:
+                    return self.extract_text(subset_path, preferred_method, ocr_method, force_ocr,
+                                             progress_callback, **kwargs)
+                finally:
+                    try:
+                        os.remove(subset_path)
+                    except OSError:
+                        pass
+        
+        page_parallel_threshold = kwargs.get('page_parallel_threshold')
+        if page_parallel_threshold is None:
+            page_parallel_threshold = self.PAGE_PARALLEL_THRESHOLD
+        page_workers = kwargs.get('page_workers')
+        if page_workers and _page_pool_workers is None:
+            # Used on its own, outside process_files, which sizes the pool itself
+            configure_page_pool(page_workers)
+        hybrid_ocr = kwargs.get('hybrid_ocr', True)
+        
         # Log clearly which method we're prioritizing
         if preferred_method:
             if self._debug:
@@ -3936,8 +5904,39 @@ class PDFExtractor:
             print(f"EXTRACT: Will try these core methods: {', '.join(methods)}")
             print(f"EXTRACT: Will try these OCR methods if needed: {', '.join(ocr_methods)}")
         
+        # Classify all pages in one pass; the page map decides which methods are worth trying
+        triage = self._triage_pdf(pdf_path)
+        if triage is not None and methods and (triage['image_only'] or triage['mostly_garbled']):
+            skipped = [m for m in methods if m in self.TEXT_LAYER_METHODS]
+            methods = [m for m in methods if m not in self.TEXT_LAYER_METHODS]
+            if self._debug:
+                reason = 'has no text layer' if triage['image_only'] else 'has a garbled text layer'
+                print(f"EXTRACT: Triage: document {reason}, skipping {', '.join(skipped)}")
+        
+        # Only count pages when sharding could apply to one of the methods we will try
+        page_count = triage['page_count'] if triage is not None else None
+        if (page_count is None and page_parallel_threshold
+                and any(m in self.PAGE_PARALLEL_METHODS for m in methods)):
+            page_count = self._count_pages(pdf_path)
+            if self._debug and page_count and page_count > page_parallel_threshold:
+                print(f"EXTRACT: {page_count} pages - sharding page-wise methods across processes")
+        
         text_parts = []
         current_method = None
+        
+        # Mixed documents: take text-layer pages as they are and OCR only the rest
+        if (hybrid_ocr and not force_ocr and triage is not None and triage['text_pages']
+                and (triage['image_pages'] or triage['garbled_pages'])
+                and not triage['mostly_garbled'] and preferred_method in (None, 'pymupdf')):
+            try:
+                text = self._extract_hybrid(pdf_path, triage, ocr_methods, progress_callback)
+                if text and text.strip():
+                    return text.strip()
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                if self._debug:
+                    print(f"EXTRACT: Hybrid extraction failed ({e}), using whole-document methods")
 
         try:
             # Try core methods first
@@ -3974,6 +5973,10 @@ class PDFExtractor:
                                 print(f"EXTRACT: Progress callback error: {e}")
                     
                     extraction_func = getattr(self, f'extract_with_{method}')
+                    if self._splits_pages(method, page_count, page_parallel_threshold):
+                        extraction_func = functools.partial(
+                            self._extract_pages_parallel, method, page_count=page_count
+                        )
                     
                     # Extract text with thorough error handling
                     try:
@@ -4022,11 +6025,17 @@ class PDFExtractor:
                         except Exception as e:
                             print(f"EXTRACT: Progress callback completion error: {e}")
 
-            # Only try OCR if we didn't get good quality text or force_ocr is enabled
-            if force_ocr or (not text_parts and self._might_need_ocr(pdf_path)):
+            # Only try OCR if we didn't get good quality text or force_ocr is enabled.
+            # A garbled text layer is no substitute for OCR even if a method returned
+            # it; that is read from the triage already done, not from a new pass.
+            garbled = triage is not None and triage['mostly_garbled']
+            if force_ocr or garbled or (not text_parts and self._might_need_ocr(pdf_path)):
                 if self._debug:
                     print(f"EXTRACT: {'Forcing OCR' if force_ocr else 'No good text extracted, trying OCR methods'}...")
                 
+                # Keep whatever the text layer gave as a fallback if OCR finds nothing
+                text_layer_parts, text_parts = text_parts, []
+                
                 for method in ocr_methods:
                     # Skip methods that are in the failed methods set
                     if method in self._ocr_failed_methods:
@@ -4116,6 +6125,9 @@ class PDFExtractor:
                                 progress_callback(1, None)
                             except Exception as e:
                                 print(f"EXTRACT: Progress callback completion error: {e}")
+                
+                if not text_parts:
+                    text_parts = text_layer_parts
 
         except Exception as e:
             print(f"EXTRACT: Unexpected error in extraction: {str(e)}")
@@ -4133,8 +6145,365 @@ class PDFExtractor:
 
         return "\n\n".join(text_parts).strip()
 
+    def _triage_pdf(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Classify every page of a PDF in a single PyMuPDF pass.
+        
+        For each page records whether it has a usable text layer, the share of the
+        page covered by images, the number of fonts and whether the text looks
+        garbled (e.g. '(cid:NN)' glyph references or replacement characters).
+        The result is cached for the file, so repeated checks for the same
+        document do not reopen it.
+        
+        Args:
+            pdf_path: Path to PDF file
+            
+        Returns:
+            Page map dict, or None if PyMuPDF is unavailable or cannot open the file:
+                page_count: Number of pages
+                pages: List of per-page dicts (page, kind, has_text, chars,
+                    image_coverage, font_count, garbled); kind is one of
+                    'text', 'garbled', 'image' or 'empty'
+                text_pages / garbled_pages / image_pages / empty_pages: Page indexes
+                image_only: No page has a usable text layer
+                mostly_garbled: Most pages with text have garbled text
+                needs_ocr: Some page would benefit from OCR
+        """
+        if 'pymupdf' not in self._initialized_methods:
+            return None
+        
+        try:
+            stat = os.stat(pdf_path)
+            cache_key = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns, self._password)
+        except OSError:
+            return None
+        if self._triage_cache and self._triage_cache[0] == cache_key:
+            return self._triage_cache[1]
+        
+        try:
+            fitz = self._import_cache.import_module('fitz')
+            doc = fitz.open(pdf_path)
+        except Exception as e:
+            logging.debug(f"Triage could not open {pdf_path}: {e}")
+            return None
+        
+        pages = []
+        try:
+            if doc.needs_pass and not (self._password and doc.authenticate(self._password)):
+                return None
+            
+            for page_num in range(len(doc)):
+                try:
+                    page = doc[page_num]
+                    text = page.get_text("text").strip()
+                    
+                    page_area = abs(page.rect) or 1.0
+                    image_area = 0.0
+                    for info in page.get_image_info():
+                        bbox = fitz.Rect(info['bbox']) & page.rect
+                        image_area += abs(bbox)
+                    image_coverage = min(image_area / page_area, 1.0)
+                    
+                    font_count = len(page.get_fonts())
+                    garbled = self._is_garbled_text(text)
+                    has_text = len(text) >= self.TRIAGE_MIN_TEXT_CHARS
+                    
+                    if has_text:
+                        kind = 'garbled' if garbled else 'text'
+                    elif image_coverage >= self.TRIAGE_IMAGE_COVERAGE:
+                        kind = 'image'
+                    else:
+                        kind = 'empty'
+                except Exception as e:
+                    logging.debug(f"Triage failed for page {page_num + 1}: {e}")
+                    has_text, garbled, kind = False, False, 'image'
+                    image_coverage, font_count, text = 0.0, 0, ''
+                
+                pages.append({
+                    'page': page_num,
+                    'kind': kind,
+                    'has_text': has_text,
+                    'chars': len(text),
+                    'image_coverage': round(image_coverage, 3),
+                    'font_count': font_count,
+                    'garbled': garbled
+                })
+        finally:
+            doc.close()
+        
+        text_pages = [p['page'] for p in pages if p['kind'] == 'text']
+        garbled_pages = [p['page'] for p in pages if p['kind'] == 'garbled']
+        image_pages = [p['page'] for p in pages if p['kind'] == 'image']
+        empty_pages = [p['page'] for p in pages if p['kind'] == 'empty']
+        
+        triage = {
+            'page_count': len(pages),
+            'pages': pages,
+            'text_pages': text_pages,
+            'garbled_pages': garbled_pages,
+            'image_pages': image_pages,
+            'empty_pages': empty_pages,
+            'image_only': bool(pages) and not text_pages and not garbled_pages,
+            'mostly_garbled': len(garbled_pages) > len(text_pages),
+            'needs_ocr': bool(image_pages or garbled_pages) or not text_pages
+        }
+        self._triage_cache = (cache_key, triage)
+        
+        if self._debug:
+            print(f"TRIAGE: {len(pages)} pages - {len(text_pages)} text, {len(garbled_pages)} garbled, "
+                  f"{len(image_pages)} image-only, {len(empty_pages)} empty")
+        return triage
+
+    def _is_garbled_text(self, text: str) -> bool:
+        """Check whether a text layer is unusable (unmapped glyphs, replacement characters)"""
+        if not text:
+            return False
+        cid_refs = len(re.findall(r'\(cid:\d+\)', text))
+        junk = sum(1 for c in text if c == '\ufffd' or (ord(c) < 32 and c not in '\n\r\t')
+                   or 0xE000 <= ord(c) <= 0xF8FF)
+        # Each '(cid:NN)' reference stands in for one glyph but takes ~8 characters
+        return (cid_refs * 8 + junk) / len(text) > self.TRIAGE_GARBLED_RATIO
+
+    def _extract_hybrid(self, pdf_path: str, triage: Dict[str, Any], ocr_methods: List[str],
+                        progress_callback=None) -> str:
+        """
+        Extract a mixed PDF page by page: text layer where usable, OCR elsewhere.
+        
+        Pages triage classified as 'text' are read with PyMuPDF; only 'image' and
+        'garbled' pages are rendered and sent to the first usable engine from
+        PAGE_OCR_METHODS. Pages are merged in document order.
+        
+        Args:
+            pdf_path: Path to PDF file
+            triage: Page map from _triage_pdf
+            ocr_methods: OCR methods in order of preference
+            progress_callback: Optional callback for progress updates
+            
+        Returns:
+            str: Extracted text, or "" if no per-page OCR engine is available
+        """
+        engine = None
+        for method in ocr_methods:
+            if method not in self.PAGE_OCR_METHODS or method in self._ocr_failed_methods:
+                continue
+            if not self._init_ocr(method):
+                continue
+            if method == 'tesseract' and getattr(self, '_pytesseract', None) is None:
+                continue
+            engine = method
+            break
+        
+        if engine is None:
+            if self._debug:
+                print("EXTRACT: No per-page OCR engine available for hybrid extraction")
+            return ""
+        
+        deficient = set(triage['image_pages']) | set(triage['garbled_pages'])
+        dpi, grayscale = self.PAGE_OCR_RENDER[engine]
+        fitz = self._import_cache.import_module('fitz')
+        page_texts = []
+        ocr_pages = 0
+        
+        if self._debug:
+            print(f"EXTRACT: Hybrid extraction - {len(triage['text_pages'])} text-layer pages, "
+                  f"{len(deficient)} pages for {engine}")
+        
+        doc = fitz.open(pdf_path)
+        self._current_doc = doc
+        rasterizer = None
+        try:
+            if doc.needs_pass and not (self._password and doc.authenticate(self._password)):
+                raise ValueError("Invalid PDF password")
+            
+            # Deficient pages are rendered ahead on the rasterizer thread while
+            # text-layer pages are read here; pages that fail to render are skipped
+            rasterizer = self._rasterize(pdf_path, dpi=dpi, grayscale=grayscale, pages=sorted(deficient))
+            rendered = rasterizer.iter_pages()
+            pending = None
+            
+            with tqdm(total=triage['page_count'], desc=f"Hybrid extraction [{engine}]", unit="pages") as pbar:
+                for page_info in triage['pages']:
+                    page_num = page_info['page']
+                    text = ""
+                    try:
+                        if page_num in deficient:
+                            while pending is None or pending[0] < page_num:
+                                pending = next(rendered, None)
+                                if pending is None:
+                                    break
+                            if pending is not None and pending[0] == page_num:
+                                raster = pending[1]
+                                pending = None
+                                try:
+                                    text = self._ocr_page_image(engine, raster)
+                                    ocr_pages += 1
+                                finally:
+                                    raster.close()
+                        elif page_info['kind'] == 'text':
+                            text = doc[page_num].get_text("text", sort=True)
+                    except KeyboardInterrupt:
+                        raise
+                    except Exception as e:
+                        logging.error(f"Hybrid extraction failed on page {page_num + 1}: {e}")
+                    
+                    if text and text.strip():
+                        page_texts.append(text.strip())
+                    
+                    pbar.update(1)
+                    if progress_callback:
+                        progress_callback(1)
+        finally:
+            if rasterizer is not None:
+                rasterizer.close()
+            self._current_doc = None
+            doc.close()
+            self._clear_gpu_memory()
+        
+        if self._debug:
+            print(f"EXTRACT: Hybrid extraction used OCR on {ocr_pages} of {triage['page_count']} pages")
+        return "\n\n".join(page_texts)
+
+    def _count_pages(self, pdf_path: str) -> Optional[int]:
+        """Get the page count cheaply, or None if no library can open the file"""
+        try:
+            if 'pymupdf' in self._initialized_methods:
+                fitz = self._import_cache.import_module('fitz')
+                with fitz.open(pdf_path) as doc:
+                    return len(doc)
+            if 'pypdf' in self._initialized_methods:
+                pypdf = self._import_cache.import_module('pypdf')
+                with open(pdf_path, 'rb') as file:
+                    reader = pypdf.PdfReader(file)
+                    if reader.is_encrypted:
+                        reader.decrypt(self._password or "")
+                    return len(reader.pages)
+        except Exception as e:
+            logging.debug(f"Page count failed for {pdf_path}: {e}")
+        return None
+
+    def _metadata_subset(self, pdf_path: str, first_pages: int,
+                         last_page: bool = False) -> Optional[str]:
+        """
+        Copy the pages needed for metadata into a temporary, unencrypted PDF
+        
+        Every method, OCR included, then only sees those pages.
+        
+        Returns:
+            Path of the temporary PDF (the caller removes it), or None if the
+            document is short enough to extract as is or cannot be copied
+        """
+        page_count = self._count_pages(pdf_path)
+        if not page_count or page_count <= first_pages + (1 if last_page else 0):
+            return None
+        pages = list(range(first_pages)) + ([page_count - 1] if last_page else [])
+        
+        fd, subset_path = tempfile.mkstemp(suffix='.pdf', prefix='biblioforge-pages-')
+        os.close(fd)
+        try:
+            if 'pymupdf' in self._initialized_methods:
+                fitz = self._import_cache.import_module('fitz')
+                with fitz.open(pdf_path) as doc:
+                    if doc.needs_pass:
+                        doc.authenticate(self._password or "")
+                    with fitz.open() as subset:
+                        for page in pages:
+                            subset.insert_pdf(doc, from_page=page, to_page=page)
+                        subset.save(subset_path)
+            else:
+                pypdf = self._import_cache.import_module('pypdf')
+                reader = pypdf.PdfReader(pdf_path)
+                if reader.is_encrypted:
+                    reader.decrypt(self._password or "")
+                writer = pypdf.PdfWriter()
+                for page in pages:
+                    writer.add_page(reader.pages[page])
+                with open(subset_path, 'wb') as file:
+                    writer.write(file)
+        except Exception as e:
+            logging.debug(f"Could not copy metadata pages of {pdf_path}: {e}")
+            os.remove(subset_path)
+            return None
+        
+        if self._debug:
+            print(f"EXTRACT: Metadata mode - extracting pages {', '.join(str(p + 1) for p in pages)} "
+                  f"of {page_count}")
+        return subset_path
+
+    @classmethod
+    def _splits_pages(cls, method: str, page_count: Optional[int], threshold: int) -> bool:
+        """Whether a document of page_count pages is sharded across the page pool"""
+        return bool(method in cls.PAGE_PARALLEL_METHODS and page_count and threshold
+                    and page_count > threshold and page_pool_size() > 1)
+
+    def _extract_pages_parallel(self, method: str, pdf_path: str, progress_callback=None,
+                                page_count: int = 0) -> str:
+        """
+        Extract one large PDF with a page-wise method, sharded across processes.
+        
+        Each worker process opens the document itself (fitz/pypdf handles cannot be
+        shared) and extracts a contiguous page range. Shards run in the shared page
+        pool (see configure_page_pool), so several large PDFs at once share its
+        processes. Shards are joined in page order, so the result matches a
+        sequential run. Falls back to the sequential method if the pool cannot be used.
+        
+        Args:
+            method: One of PAGE_PARALLEL_METHODS
+            pdf_path: Path to PDF file
+            progress_callback: Optional callback, called with the pages done per shard
+            page_count: Number of pages in the document
+            
+        Returns:
+            str: Extracted text
+        """
+        from concurrent.futures.process import BrokenProcessPool
+        
+        max_workers = max(1, min(page_pool_size(), page_count))
+        # A few shards per worker so one slow range does not hold up the end of the run
+        shard_count = min(page_count, max_workers * 4)
+        shard_size = -(-page_count // shard_count)
+        ranges = [(start, min(start + shard_size, page_count))
+                  for start in range(0, page_count, shard_size)]
+        
+        shards = [""] * len(ranges)
+        futures = {}
+        try:
+            executor = get_page_pool(self._debug, self._binary_paths)
+            futures = {
+                executor.submit(_extract_pdf_page_range, method, pdf_path,
+                                self._password, start, end): index
+                for index, (start, end) in enumerate(ranges)
+            }
+            with tqdm(total=page_count, desc=f"{method} extraction ({max_workers} processes)",
+                      unit="pages") as pbar:
+                for future in as_completed(futures):
+                    index = futures[future]
+                    shards[index] = future.result()
+                    start, end = ranges[index]
+                    pbar.update(end - start)
+                    if progress_callback:
+                        progress_callback(end - start)
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in futures:
+                future.cancel()
+            if isinstance(e, BrokenProcessPool):
+                # Let the next large PDF start a fresh pool
+                shutdown_page_pool(wait=False)
+            if self._debug:
+                print(f"EXTRACT: Page-parallel {method} failed ({e}), extracting sequentially")
+            return getattr(self, f'extract_with_{method}')(pdf_path, progress_callback)
+        
+        return "\n\n".join(shard for shard in shards if shard)
+
     def _might_need_ocr(self, pdf_path: str) -> bool:
         """Quick check if PDF might need OCR"""
+        triage = self._triage_pdf(pdf_path)
+        if triage is not None:
+            return triage['needs_ocr']
+        
         try:
             if 'pymupdf' in self._initialized_methods:
                 import fitz
@@ -4199,6 +6568,10 @@ class PDFExtractor:
 
     def _is_scanned_pdf(self, pdf_path: str) -> bool:
         """Quick check if PDF appears to be scanned"""
+        triage = self._triage_pdf(pdf_path)
+        if triage is not None:
+            return triage['image_only']
+        
         try:
             # Try quick text extraction with pymupdf
             import fitz
@@ -4267,7 +6640,9 @@ class PDFExtractor:
         except:
             pass
         
-    def extract_with_pymupdf(self, pdf_path: str, progress_callback=None) -> str:
+    def extract_with_pymupdf(self, pdf_path: str, progress_callback=None,
+                             page_range: Optional[Tuple[int, int]] = None) -> str:
+        """Extract text using PyMuPDF, optionally only pages [start, end) of page_range"""
         try:
             fitz = self._import_cache.import_module('fitz')  # Use ImportCache
             text_parts = []
@@ -4279,9 +6654,11 @@ class PDFExtractor:
                 if not self._password or not doc.authenticate(self._password):
                     raise ValueError("Invalid PDF password")
             
-            total_pages = len(doc)
-            with tqdm(total=total_pages, desc="PyMuPDF extraction", unit="pages") as pbar:
-                for page_num in range(total_pages):
+            start, end = page_range or (0, len(doc))
+            end = min(end, len(doc))
+            with tqdm(total=end - start, desc="PyMuPDF extraction", unit="pages",
+                      disable=page_range is not None) as pbar:
+                for page_num in range(start, end):
                     try:
                         page = doc[page_num]
                         # Try different extraction strategies
@@ -4415,7 +6792,8 @@ class PDFExtractor:
             logging.debug(f"Text dict processing failed: {e}")
         return '\n'.join(text_parts)
 
-    def extract_with_pdfplumber(self, pdf_path: str, progress_callback=None) -> str:
+    def extract_with_pdfplumber(self, pdf_path: str, progress_callback=None,
+                                page_range: Optional[Tuple[int, int]] = None) -> str:
         """Extract text using pdfplumber with layout preservation and progress bar"""
         pdfplumber = self._import_cache.import_module('pdfplumber')
         text_parts = []
@@ -4423,10 +6801,12 @@ class PDFExtractor:
         try:
             with pdfplumber.open(pdf_path, password=self._password) as pdf:
                 self._current_doc = pdf
-                total_pages = len(pdf.pages)
+                start, end = page_range or (0, len(pdf.pages))
+                pages = pdf.pages[start:end]
                 
-                with tqdm(total=total_pages, desc="pdfplumber extraction", unit="pages") as pbar:
-                    for page in pdf.pages:
+                with tqdm(total=len(pages), desc="pdfplumber extraction", unit="pages",
+                          disable=page_range is not None) as pbar:
+                    for page in pages:
                         try:
                             # Extract with layout settings
                             words = page.extract_words(
@@ -4484,7 +6864,8 @@ class PDFExtractor:
         
         return lines
 
-    def extract_with_pypdf(self, pdf_path: str, progress_callback=None) -> str:
+    def extract_with_pypdf(self, pdf_path: str, progress_callback=None,
+                           page_range: Optional[Tuple[int, int]] = None) -> str:
         """Extract text using pypdf with encryption support and progress bar"""
         pypdf = self._import_cache.import_module('pypdf')
         
@@ -4502,11 +6883,13 @@ class PDFExtractor:
                     if not reader.decrypt(self._password or ""):
                         raise ValueError("PDF is encrypted and requires a valid password")
                 
-                total_pages = len(reader.pages)
-                with tqdm(total=total_pages, desc="pypdf extraction", unit="pages") as pbar:
-                    for page in reader.pages:
+                start, end = page_range or (0, len(reader.pages))
+                end = min(end, len(reader.pages))
+                with tqdm(total=end - start, desc="pypdf extraction", unit="pages",
+                          disable=page_range is not None) as pbar:
+                    for page_num in range(start, end):
                         try:
-                            text = page.extract_text()
+                            text = reader.pages[page_num].extract_text()
                             if text.strip():
                                 text_parts.append(text.strip())
                             
@@ -4594,7 +6977,6 @@ class PDFExtractor:
         try:
             # Import required packages with better error handling
             try:
-                pdf2image = self._import_cache.import_module('pdf2image')
                 import numpy as np
                 import io
                 from PIL import Image
@@ -4608,15 +6990,7 @@ class PDFExtractor:
             
             text_parts = []
             
-            # Configure PDF conversion settings for better OCR results
-            conversion_settings = {
-                'dpi': 300,              # Default DPI
-                'thread_count': 1,       # Single thread for stability
-                'grayscale': False,      # DocTR works better with color images
-                'size': (None, None),    # Default to original size
-                'use_cropbox': True,     # Use cropbox for better results
-                'strict': False          # Continue even with errors
-            }
+            images = None
             
             logging.info(f"Starting DocTR extraction for {pdf_path}")
             
@@ -4627,25 +7001,18 @@ class PDFExtractor:
                 if dpi_attempt > 0:
                     logging.info(f"Trying PDF conversion with increased DPI: {dpi}")
                     
-                # Update DPI for this attempt
-                conversion_settings['dpi'] = dpi
-                
-                # Convert PDF to images first
-                with tqdm(desc=f"Converting PDF to images for DocTR (DPI: {dpi})", unit="page") as pbar:
-                    try:
-                        # Convert PDF pages to PIL images
-                        images = pdf2image.convert_from_path(
-                            pdf_path,
-                            **conversion_settings
-                        )
-                        pbar.update(len(images))
-                        logging.info(f"Successfully converted {len(images)} pages from PDF (DPI: {dpi})")
-                    except Exception as e:
-                        logging.error(f"PDF to image conversion failed at DPI {dpi}: {e}")
-                        if dpi_attempt < len(dpi_options) - 1:
-                            continue  # Try next DPI
-                        else:
-                            return ""  # All DPI options failed
+                # Pages are rendered lazily; each model configuration re-renders them
+                # (DocTR works better with color images)
+                try:
+                    if images is not None:
+                        images.close()
+                    images = self._rasterize(pdf_path, dpi=dpi, grayscale=False)
+                except Exception as e:
+                    logging.error(f"PDF rasterization failed at DPI {dpi}: {e}")
+                    if dpi_attempt < len(dpi_options) - 1:
+                        continue  # Try next DPI
+                    else:
+                        return ""  # All DPI options failed
                 
                 # Optimize model configurations - fastest first
                 model_configs = [
@@ -4704,20 +7071,16 @@ class PDFExtractor:
                         logging.error(f"Failed to initialize DocTR predictor with custom config: {e}")
                         continue  # Try next configuration
                     
-                    # Make fresh copy of images for this model
-                    model_images = []
-                    for img in images:
-                        img_copy = img.copy()
-                        model_images.append(img_copy)
+                    model_images = images
                     
                     # Process each image with extensive error handling
                     with tqdm(total=len(model_images), desc="DocTR processing", unit="page") as pbar:
                         page_success_count = 0
                         
-                        for i, image in enumerate(model_images):
+                        for i, raster in enumerate(model_images):
                             try:
-                                # Convert PIL image to numpy array
-                                img_np = np.array(image)
+                                # Every variant starts from the shared page buffer
+                                img_np = raster.array('RGB')
                                 
                                 # Try different preprocessing techniques
                                 processed_images = [
@@ -4760,7 +7123,7 @@ class PDFExtractor:
                                                     break  # Success with this preprocessing technique
                                             else:
                                                 # Normal extraction if blocks are detected
-                                                current_page_text = self._extract_doctr_text_from_image(img_variant, i)
+                                                current_page_text = self._extract_doctr_text_from_image(page, i)
                                                 
                                                 if current_page_text and current_page_text.strip():
                                                     page_text = current_page_text
@@ -4783,10 +7146,7 @@ class PDFExtractor:
                                 logging.error(f"DocTR failed on page {i}: {e}")
                                 logging.debug(f"Traceback: {traceback.format_exc()}")
                             finally:
-                                try:
-                                    image.close()
-                                except:
-                                    pass
+                                raster.close()
                     
                     logging.info(f"DocTR successful pages with {model_config['name']}: {page_success_count}/{len(model_images)}")
                     
@@ -4815,12 +7175,8 @@ class PDFExtractor:
             return ""
         finally:
             # Clean up resources
-            if 'images' in locals() and images:
-                for img in images:
-                    try:
-                        img.close()
-                    except:
-                        pass
+            if 'images' in locals() and images is not None:
+                images.close()
             
             # Clear GPU memory
             self._clear_gpu_memory()
@@ -4843,7 +7199,6 @@ class PDFExtractor:
         try:
             # Import required packages with better error handling
             try:
-                pdf2image = self._import_cache.import_module('pdf2image')
                 import numpy as np
                 import io
                 from PIL import Image
@@ -4858,15 +7213,7 @@ class PDFExtractor:
             text_parts = []
             all_extracted_text = []  # Store text from all model configurations
             
-            # Configure PDF conversion settings for better OCR results
-            conversion_settings = {
-                'dpi': 300,              # Default DPI
-                'thread_count': 1,       # Single thread for stability
-                'grayscale': False,      # DocTR works better with color images
-                'size': (None, None),    # Default to original size
-                'use_cropbox': True,     # Use cropbox for better results
-                'strict': False          # Continue even with errors
-            }
+            images = None
             
             logging.info(f"Starting DocTR extraction for {pdf_path}")
             
@@ -4877,32 +7224,19 @@ class PDFExtractor:
                 if dpi_attempt > 0:
                     logging.info(f"Trying PDF conversion with increased DPI: {dpi}")
                     
-                # Update DPI for this attempt
-                conversion_settings['dpi'] = dpi
-                
-                # Convert PDF to images first
-                with tqdm(desc=f"Converting PDF to images for DocTR (DPI: {dpi})", unit="page") as pbar:
-                    try:
-                        # Convert PDF pages to PIL images
-                        images = pdf2image.convert_from_path(
-                            pdf_path,
-                            **conversion_settings
-                        )
-                        pbar.update(len(images))
-                        logging.info(f"Successfully converted {len(images)} pages from PDF (DPI: {dpi})")
-                    except Exception as e:
-                        logging.error(f"PDF to image conversion failed at DPI {dpi}: {e}")
-                        if dpi_attempt < len(dpi_options) - 1:
-                            continue  # Try next DPI
-                        else:
-                            return ""  # All DPI options failed
-                
-                # Make copies of all images for each model configuration
-                # This prevents the "closed image" error when switching between models
-                image_copies = []
-                for img in images:
-                    img_copy = img.copy()
-                    image_copies.append(img_copy)
+                # Pages are rendered lazily; each model configuration re-renders them
+                # instead of holding a copy of every page per model (DocTR works
+                # better with color images)
+                try:
+                    if images is not None:
+                        images.close()
+                    images = self._rasterize(pdf_path, dpi=dpi, grayscale=False)
+                except Exception as e:
+                    logging.error(f"PDF rasterization failed at DPI {dpi}: {e}")
+                    if dpi_attempt < len(dpi_options) - 1:
+                        continue  # Try next DPI
+                    else:
+                        return ""  # All DPI options failed
                 
                 # Try multiple model configurations for detection
                 model_configs = [
@@ -4953,25 +7287,16 @@ class PDFExtractor:
                         logging.error(f"Failed to initialize DocTR predictor with custom config: {e}")
                         continue  # Try next configuration
                     
-                    # Make fresh copy of images for this model
-                    model_images = []
-                    if model_idx == 0:
-                        # For first model, use original copies
-                        model_images = image_copies
-                    else:
-                        # For subsequent models, make new copies to avoid closed image errors
-                        model_images = []
-                        for img in images:
-                            model_images.append(img.copy())
+                    model_images = images
                     
                     # Process each image with extensive error handling
                     with tqdm(total=len(model_images), desc="DocTR processing", unit="page") as pbar:
                         page_success_count = 0
                         
-                        for i, image in enumerate(model_images):
+                        for i, raster in enumerate(model_images):
                             try:
-                                # Convert PIL image to numpy array
-                                img_np = np.array(image)
+                                # Every variant starts from the shared page buffer
+                                img_np = raster.array('RGB')
                                 
                                 # Try different preprocessing techniques
                                 processed_images = [
@@ -5010,7 +7335,7 @@ class PDFExtractor:
                                                     break  # Success with this preprocessing technique
                                             else:
                                                 # Normal extraction if blocks are detected
-                                                current_page_text = self._extract_doctr_text_from_image(img_variant, i)
+                                                current_page_text = self._extract_doctr_text_from_image(page, i)
                                                 
                                                 if current_page_text and current_page_text.strip():
                                                     page_text = current_page_text
@@ -5033,7 +7358,7 @@ class PDFExtractor:
                                 logging.error(f"DocTR failed on page {i}: {e}")
                                 logging.debug(f"Traceback: {traceback.format_exc()}")
                             finally:
-                                pass  # Don't close images here - we'll clean them up later
+                                raster.close()
                     
                     logging.info(f"DocTR successful pages with {model_config['name']}: {page_success_count}/{len(model_images)}")
                     
@@ -5046,18 +7371,6 @@ class PDFExtractor:
                             'total_pages': len(model_images)
                         })
                 
-                # Clean up all image copies
-                for img in image_copies:
-                    try:
-                        img.close()
-                    except:
-                        pass
-                for img in model_images:
-                    try:
-                        img.close()
-                    except:
-                        pass
-                
                 # If we got text from any model with this DPI, stop trying more DPIs
                 if all_extracted_text:
                     break
@@ -5079,13 +7392,9 @@ class PDFExtractor:
             logging.debug(f"Traceback: {traceback.format_exc()}")
             return ""
         finally:
-            # Clean up resources
-            if 'images' in locals() and images:
-                for img in images:
-                    try:
-                        img.close()
-                    except:
-                        pass
+            # Clean up resources
+            if 'images' in locals() and images is not None:
+                images.close()
             
             # Clear GPU memory
             self._clear_gpu_memory()
@@ -5141,6 +7450,22 @@ class PDFExtractor:
             logging.debug(f"Binarization failed: {e}")
             return image_np
 
+    def _extract_doctr_text_from_image(self, page, page_idx):
+        """
+        Collect the recognized text of one DocTR result page, line by line
+        
+        Takes the result page the model already produced for the image variant,
+        not the image: the loops only call it when that page has blocks.
+        """
+        lines = []
+        for block in page.blocks:
+            for line in block.lines:
+                line_text = " ".join(word.value for word in line.words)
+                if line_text.strip():
+                    lines.append(line_text)
+        logging.debug(f"DocTR recognized {len(lines)} lines on page {page_idx}")
+        return "\n".join(lines)
+
     def _extract_text_with_forced_detection(self, image_np, page_idx):
         """
         Extract text by forcing block detection when DocTR fails to detect blocks.
@@ -5241,171 +7566,41 @@ class PDFExtractor:
             return ""
             
         try:
-            # Import required packages
-            pdf2image = self._import_cache.import_module('pdf2image')
-            from PIL import Image
-            import numpy as np
-            import io
-            
-            # Reference to PaddleOCR instance
-            paddle_ocr = self._paddleocr
             text_parts = []
             images = None
             
             try:
-                # Convert PDF to images with lower DPI for better compatibility
-                with tqdm(desc="Converting PDF to images for PaddleOCR", unit="page") as pbar:
-                    try:
-                        images = pdf2image.convert_from_path(
-                            pdf_path,
-                            dpi=200,  # Lower DPI for better compatibility
-                            thread_count=1,
-                            grayscale=False,
-                            fmt="jpeg"  # Use JPEG for better compatibility
-                        )
-                        pbar.update(len(images))
-                        logging.info(f"Successfully converted {len(images)} pages for PaddleOCR")
-                    except Exception as e:
-                        logging.error(f"PDF to image conversion failed: {e}")
-                        return ""
+                # Render pages lazily, with lower DPI for better compatibility
+                try:
+                    images = self._rasterize(pdf_path, dpi=200, grayscale=False)
+                except Exception as e:
+                    logging.error(f"PDF rasterization failed: {e}")
+                    return ""
                     
                 # Process each image with PaddleOCR
                 with tqdm(total=len(images), desc="PaddleOCR processing", unit="page") as pbar:
-                    for i, image in enumerate(images, 1):
+                    for i, raster in enumerate(images, 1):
                         try:
-                            # Save image to memory buffer to ensure proper format
-                            img_buffer = io.BytesIO()
-                            image.save(img_buffer, format="JPEG")
-                            img_buffer.seek(0)
-                            
-                            # Load from buffer to ensure clean image
-                            pil_img = Image.open(img_buffer)
-                            
                             # Debug info about image
-                            logging.debug(f"Processing image for page {i}: size={pil_img.size}, mode={pil_img.mode}")
+                            logging.debug(f"Processing image for page {i}: size={raster.size}, mode={raster.mode}")
                             
-                            # Process with PaddleOCR using the direct image object
+                            # Process with PaddleOCR (German model as fallback for empty pages)
                             try:
-                                # First try with direct PIL image
-                                result = paddle_ocr.ocr(pil_img, cls=True)
-                                logging.debug(f"PaddleOCR result type: {type(result)}")
-                                if result:
-                                    logging.debug(f"Result length: {len(result)}")
-                            except Exception as direct_error:
-                                logging.debug(f"Direct PIL processing failed: {direct_error}")
-                                # Fall back to numpy array
-                                try:
-                                    img_array = np.array(pil_img)
-                                    result = paddle_ocr.ocr(img_array, cls=True)
-                                except Exception as numpy_error:
-                                    logging.error(f"Numpy array processing also failed: {numpy_error}")
-                                    pbar.update(1)
-                                    if progress_callback:
-                                        progress_callback(1)
-                                    continue
-                            
-                            # Extract text with detailed debugging
-                            page_text = []
-                            
-                            # Handle the result with extensive error checking
-                            if result is not None:
-                                logging.debug(f"Result is not None, type: {type(result)}")
-                                
-                                # Check if result is list of pages
-                                if isinstance(result, list):
-                                    for idx, page_result in enumerate(result):
-                                        logging.debug(f"Processing page result {idx}, type: {type(page_result)}")
-                                        
-                                        if page_result is not None and isinstance(page_result, list):
-                                            for line_idx, line in enumerate(page_result):
-                                                logging.debug(f"Processing line {line_idx}, type: {type(line)}")
-                                                
-                                                # Try different formats
-                                                try:
-                                                    # Format: [[points], (text, confidence)]
-                                                    if (isinstance(line, list) and len(line) == 2 and 
-                                                        isinstance(line[1], tuple) and len(line[1]) == 2):
-                                                        
-                                                        text, confidence = line[1]
-                                                        logging.debug(f"Found text: '{text}', confidence: {confidence}")
-                                                        
-                                                        if confidence > 0.5:  # Use a lower threshold for better recall
-                                                            page_text.append(text)
-                                                            
-                                                    # Format: [points, [text, confidence]]
-                                                    elif (isinstance(line, list) and len(line) == 2 and 
-                                                        isinstance(line[1], list) and len(line[1]) == 2):
-                                                        
-                                                        text, confidence = line[1]
-                                                        logging.debug(f"Found text (alternate format): '{text}', confidence: {confidence}")
-                                                        
-                                                        if confidence > 0.5:
-                                                            page_text.append(text)
-                                                            
-                                                    # Legacy format: [text, confidence]
-                                                    elif (isinstance(line, list) and len(line) == 2 and 
-                                                        isinstance(line[0], str) and isinstance(line[1], float)):
-                                                        
-                                                        text, confidence = line
-                                                        logging.debug(f"Found text (legacy format): '{text}', confidence: {confidence}")
-                                                        
-                                                        if confidence > 0.5:
-                                                            page_text.append(text)
-                                                            
-                                                    else:
-                                                        logging.debug(f"Unknown result format: {line}")
-                                                        
-                                                except Exception as format_error:
-                                                    logging.debug(f"Error extracting text from line: {format_error}")
-                                                    continue
+                                page_text = self._ocr_image_with_paddleocr(raster)
+                            except Exception as ocr_error:
+                                logging.error(f"PaddleOCR processing failed on page {i}: {ocr_error}")
+                                page_text = ""
                             
-                            # Join text with newlines and add to overall result
                             if page_text:
-                                text_parts.append('\n'.join(page_text))
-                                logging.debug(f"Successfully extracted {len(page_text)} text lines from page {i}")
+                                text_parts.append(page_text)
+                                logging.debug(f"Successfully extracted text from page {i}")
                             else:
-                                logging.warning(f"No text extracted from page {i} with English model")
-                                
-                                # Try with German language model as fallback
-                                try:
-                                    # Lazy initialize German model
-                                    if not hasattr(self, '_paddleocr_german'):
-                                        try:
-                                            from paddleocr import PaddleOCR
-                                            self._paddleocr_german = PaddleOCR(
-                                                use_angle_cls=True,
-                                                lang='german',
-                                                use_gpu=False,
-                                                show_log=False,
-                                                ocr_version='PP-OCRv3'  # Use v3 for better German support
-                                            )
-                                            logging.info("German PaddleOCR model initialized")
-                                        except Exception as ge:
-                                            logging.warning(f"Failed to initialize German model: {ge}")
-                                    
-                                    # Use German model if available
-                                    if hasattr(self, '_paddleocr_german'):
-                                        try:
-                                            german_result = self._paddleocr_german.ocr(pil_img, cls=True)
-                                            german_text = self._extract_paddleocr_text(german_result, min_confidence=0.4)
-                                            
-                                            if german_text:
-                                                text_parts.append('\n'.join(german_text))
-                                                logging.debug(f"Extracted {len(german_text)} text lines with German model")
-                                            else:
-                                                logging.warning(f"No text extracted with German model either")
-                                        except Exception as ge2:
-                                            logging.error(f"German model processing failed: {ge2}")
-                                except Exception as ge3:
-                                    logging.error(f"Error in German fallback: {ge3}")
+                                logging.warning(f"No text extracted from page {i}")
                             
                             # Update progress
                             pbar.update(1)
                             if progress_callback:
                                 progress_callback(1)
-                            
-                            # Clean up resources
-                            img_buffer.close()
                                 
                         except Exception as e:
                             logging.error(f"PaddleOCR failed on page {i}: {e}")
@@ -5414,11 +7609,7 @@ class PDFExtractor:
                                 progress_callback(1)
                         finally:
                             # Clean up resources
-                            try:
-                                if image:
-                                    image.close()
-                            except:
-                                pass
+                            raster.close()
                                 
                 # Return combined text
                 if text_parts:
@@ -5430,6 +7621,10 @@ class PDFExtractor:
             except Exception as e:
                 logging.error(f"PaddleOCR processing error: {e}")
                 return ""
+            finally:
+                # Stop rendering and release prefetched pages
+                if images is not None:
+                    images.close()
                 
         except Exception as e:
             logging.error(f"PaddleOCR extraction failed: {e}")
@@ -5506,8 +7701,6 @@ class PDFExtractor:
             return ""
         
         try:
-            # Import pdf2image to convert PDF to images
-            pdf2image = self._import_cache.import_module('pdf2image')
             import tempfile
             import os
             import subprocess
@@ -5515,30 +7708,15 @@ class PDFExtractor:
             
             # Create a temporary directory to store images and results
             with tempfile.TemporaryDirectory() as temp_dir:
-                # Convert PDF to images
-                logging.info(f"Converting PDF to images for Kraken CLI processing")
-                with tqdm(desc="Converting PDF to images", unit="page") as pbar:
-                    try:
-                        images = pdf2image.convert_from_path(
-                            pdf_path,
-                            dpi=300,
-                            thread_count=1,
-                            grayscale=True,
-                            output_folder=temp_dir,
-                            fmt="png"
-                        )
-                        pbar.update(len(images))
-                        logging.info(f"Successfully converted {len(images)} pages to images")
-                    except Exception as e:
-                        logging.error(f"PDF to image conversion failed: {e}")
-                        return ""
-                
-                # Find all converted images in the temp directory
-                image_paths = sorted([os.path.join(temp_dir, f) for f in os.listdir(temp_dir) 
-                                if f.endswith('.png')])
+                # Render pages lazily; each page is written to a PNG just before OCR
+                try:
+                    images = self._rasterize(pdf_path, dpi=300, grayscale=True)
+                except Exception as e:
+                    logging.error(f"PDF rasterization failed: {e}")
+                    return ""
                 
-                if not image_paths:
-                    logging.error("No images were created from the PDF")
+                if not len(images):
+                    logging.error("The PDF has no pages to process")
                     return ""
                 
                 # Process each image with Kraken CLI
@@ -5547,9 +7725,16 @@ class PDFExtractor:
                 # Check if we're on Windows to handle command line differences
                 is_windows = platform.system() == 'Windows'
                 
-                with tqdm(total=len(image_paths), desc="Kraken CLI processing", unit="page") as pbar:
-                    for i, img_path in enumerate(image_paths, 1):
+                with images, tqdm(total=len(images), desc="Kraken CLI processing", unit="page") as pbar:
+                    for i, raster in enumerate(images, 1):
                         try:
+                            # Write the page image for the CLI
+                            img_path = os.path.join(temp_dir, f"page_{i}.png")
+                            try:
+                                raster.image().save(img_path, format="PNG")
+                            finally:
+                                raster.close()
+                            
                             # Create output file paths
                             txt_output = os.path.join(temp_dir, f"page_{i}.txt")
                             
@@ -5692,6 +7877,12 @@ class PDFExtractor:
                             else:
                                 logging.warning(f"Output file not created: {txt_output}")
                             
+                            # Only one page image needs to be on disk at a time
+                            try:
+                                os.unlink(img_path)
+                            except OSError:
+                                pass
+                            
                             # Update progress
                             pbar.update(1)
                             if progress_callback:
@@ -5732,22 +7923,12 @@ class PDFExtractor:
             logging.warning("Kraken initialization failed, skipping Kraken OCR")
             return ""
         
-        # Import minimal dependencies
-        pdf2image = self._import_cache.import_module('pdf2image')
-        
         text_parts = []
         images = None
             
         try:
-            # Convert PDF to images
-            with tqdm(desc="Converting PDF to images for Kraken", unit="page") as pbar:
-                images = pdf2image.convert_from_path(
-                    pdf_path,
-                    dpi=300,
-                    thread_count=1,
-                    grayscale=True
-                )
-                pbar.update(len(images))
+            # Render pages lazily
+            images = self._rasterize(pdf_path, dpi=300, grayscale=True)
             
             # Process images
             with tqdm(total=len(images), desc="Kraken processing", unit="page") as pbar:
@@ -5788,12 +7969,12 @@ class PDFExtractor:
                     logging.debug(f"Error in model loading: {e}")
                     
                 # Process each image
-                for i, image in enumerate(images, 1):
+                for i, raster in enumerate(images, 1):
                     try:
                         # Guard against TensorFlow errors
                         try:
                             # Step 1: Binarize the image - directly following the docs
-                            bw_im = binarization.nlbin(image)
+                            bw_im = binarization.nlbin(raster.image())
                             logging.debug(f"Binarization successful on page {i}")
                             
                             # Step 2: Segment the image - directly following the docs
@@ -5878,10 +8059,7 @@ class PDFExtractor:
                             progress_callback(1)
                     finally:
                         # Clean up
-                        try:
-                            image.close()
-                        except:
-                            pass
+                        raster.close()
             
             # Return joined text if any was extracted
             if text_parts:
@@ -5901,13 +8079,9 @@ class PDFExtractor:
             logging.error(f"Kraken extraction failed: {e}")
             return ""
         finally:
-            # Clean up
-            if 'images' in locals() and images:
-                for img in images:
-                    try:
-                        img.close()
-                    except:
-                        pass
+            # Stop rendering and release prefetched pages
+            if images is not None:
+                images.close()
 
     def extract_with_easyocr(self, pdf_path: str, progress_callback=None) -> str:
         """
@@ -5924,57 +8098,30 @@ class PDFExtractor:
             return ""
         
         try:
-            # Import required dependencies here to ensure they're available
-            pdf2image = self._import_cache.import_module('pdf2image')
-            import numpy as np
-            
             text_parts = []
             images = None
             
             try:
-                # Convert PDF to images
-                with tqdm(desc="Converting PDF to images for EasyOCR", unit="page") as pbar:
-                    images = pdf2image.convert_from_path(
-                        pdf_path,
-                        dpi=300,
-                        thread_count=1,  # Single thread for stability
-                        grayscale=False   # EasyOCR works better with color images
-                    )
-                    pbar.update(len(images))
-                
-                # Initialize reader if needed
-                easyocr = self._easyocr
-                reader = None
+                # Render pages lazily - EasyOCR works better with color images
+                images = self._rasterize(pdf_path, dpi=300, grayscale=False)
                 
                 # Initialize reader with English as default language
                 try:
-                    if not hasattr(self, '_reader') or self._reader is None:
-                        import torch
-                        reader = easyocr.Reader(['en'], gpu=torch.cuda.is_available())
-                        self._reader = reader
-                    else:
-                        reader = self._reader
+                    self._get_easyocr_reader()
                 except Exception as init_error:
                     logging.error(f"EasyOCR reader initialization failed: {init_error}")
                     return ""
                 
                 # Process pages
                 with tqdm(total=len(images), desc="EasyOCR processing", unit="page") as pbar:
-                    for i, image in enumerate(images, 1):
+                    for i, raster in enumerate(images, 1):
                         try:
-                            # Convert PIL image to numpy array (this is what EasyOCR expects)
-                            img_array = np.array(image)
-                            
                             # Process page using EasyOCR
-                            results = reader.readtext(
-                                img_array,
-                                detail=0,  # Just get the text
-                                paragraph=True  # Combine text into paragraphs
-                            )
+                            page_text = self._ocr_image_with_easyocr(raster)
                             
                             # Add extracted text
-                            if results:
-                                text_parts.append('\n'.join(results))
+                            if page_text:
+                                text_parts.append(page_text)
                             else:
                                 text_parts.append(f"[EasyOCR found no text on page {i}]")
                             
@@ -5985,20 +8132,13 @@ class PDFExtractor:
                         except Exception as e:
                             logging.error(f"EasyOCR failed on page {i}: {e}")
                         finally:
-                            # Make sure to close the image
-                            try:
-                                image.close()
-                            except:
-                                pass
+                            # Release the page buffer
+                            raster.close()
                             
             finally:
-                # Clean up resources
-                if images:
-                    for img in images:
-                        try:
-                            img.close()
-                        except:
-                            pass
+                # Stop rendering and release prefetched pages
+                if images is not None:
+                    images.close()
                 
                 # Clear GPU memory
                 self._clear_gpu_memory()
@@ -6010,6 +8150,65 @@ class PDFExtractor:
             return ""
 
 
+    def _ocr_page_image(self, method: str, raster: PageRaster) -> str:
+        """Recognize a single rendered page with one of PAGE_OCR_METHODS"""
+        return getattr(self, f'_ocr_image_with_{method}')(raster)
+
+    def _ocr_image_with_tesseract(self, raster: PageRaster) -> str:
+        """Recognize one page with Tesseract"""
+        return self._pytesseract.image_to_string(raster.image(), config='--oem 3 --psm 3 -l eng').strip()
+
+    def _get_easyocr_reader(self):
+        """Get the EasyOCR reader, creating it on first use"""
+        if not hasattr(self, '_reader') or self._reader is None:
+            import torch
+            self._reader = self._easyocr.Reader(['en'], gpu=torch.cuda.is_available())
+        return self._reader
+
+    def _ocr_image_with_easyocr(self, raster: PageRaster) -> str:
+        """Recognize one page with EasyOCR"""
+        # EasyOCR takes the page buffer as a numpy array directly
+        results = self._get_easyocr_reader().readtext(
+            raster.array(),
+            detail=0,  # Just get the text
+            paragraph=True  # Combine text into paragraphs
+        )
+        return '\n'.join(results) if results else ""
+
+    def _ocr_image_with_paddleocr(self, raster: PageRaster) -> str:
+        """Recognize one page with PaddleOCR, falling back to the German model"""
+        image = raster.array('RGB')
+        try:
+            result = self._paddleocr.ocr(image, cls=True)
+        except ValueError as view_error:
+            # Older releases modify their input in place and reject read-only views
+            logging.debug(f"PaddleOCR rejected the shared page buffer: {view_error}")
+            image = image.copy()
+            result = self._paddleocr.ocr(image, cls=True)
+        
+        lines = self._extract_paddleocr_text(result, min_confidence=0.5)
+        if lines:
+            return '\n'.join(lines)
+        
+        # Try with German language model as fallback
+        if not hasattr(self, '_paddleocr_german'):
+            try:
+                from paddleocr import PaddleOCR
+                self._paddleocr_german = PaddleOCR(
+                    use_angle_cls=True,
+                    lang='german',
+                    use_gpu=False,
+                    show_log=False,
+                    ocr_version='PP-OCRv3'  # Use v3 for better German support
+                )
+                logging.info("German PaddleOCR model initialized")
+            except Exception as ge:
+                logging.warning(f"Failed to initialize German model: {ge}")
+                return ""
+        
+        german_result = self._paddleocr_german.ocr(image, cls=True)
+        return '\n'.join(self._extract_paddleocr_text(german_result, min_confidence=0.4))
+
     def _init_ocr(self, method: str) -> bool:
         """
         Initialize OCR engine with correct dependency checks and API usage.
@@ -6331,6 +8530,20 @@ class PDFExtractor:
         # Return cached result
         return self._ocr_initialized.get(method, False)
 
+    def _rasterize(self, pdf_path: str, dpi: int = 300, grayscale: bool = False,
+                   pages: Optional[List[int]] = None, max_height: Optional[int] = None) -> PageRasterizer:
+        """Create a lazy page-image iterator for OCR (see PageRasterizer)"""
+        return PageRasterizer(
+            pdf_path,
+            dpi=dpi,
+            grayscale=grayscale,
+            pages=pages,
+            password=self._password,
+            prefetch=self.RASTER_PREFETCH,
+            max_height=max_height,
+            poppler_path=self._get_poppler_path()
+        )
+
     def _get_poppler_path(self):
         """
         Get the path to the poppler binaries directory
@@ -6352,7 +8565,6 @@ class PDFExtractor:
             
         # Use the stored module references
         pytesseract = self._pytesseract
-        pdf2image = self._pdf2image
         
         text_parts = []
         images = None
@@ -6394,67 +8606,17 @@ class PDFExtractor:
                 signal.signal(signal.SIGINT, custom_signal_handler)
                 signal.signal(signal.SIGTERM, custom_signal_handler)
 
-            # Get poppler path for pdf2image
-            poppler_path = self._get_poppler_path()
-            
-            # Convert PDF to images with progress bar
-            with tqdm(desc="Converting PDF to images for tesseract", unit="page") as pbar:
-                try:
-                    # Use thread_count=1 for better interrupt handling
-
-                    # Pass poppler_path if we found it
-                    conversion_args = {
-                        'dpi': 300,
-                        'thread_count': 1,  # Use single thread for stability and interrupt handling
-                        'grayscale': True,
-                        'size': (None, 2000),  # Limit height for memory
-                        'use_cropbox': True,   # Use cropbox for extraction
-                        'strict': False        # Continue even with errors
-                    }
-                    
-                    # Add poppler_path if available
-                    if poppler_path:
-                        conversion_args['poppler_path'] = poppler_path
-                        if self._debug:
-                            logging.debug(f"Using poppler path: {poppler_path}")
-                    
-                    # Add password if provided
-                    if self._password:
-                        conversion_args['userpw'] = self._password
-                    
-                    images = pdf2image.convert_from_path(
-                        pdf_path,
-                        **conversion_args
-                    )
-                    pbar.update(len(images))
-                except KeyboardInterrupt:
-                    logging.info("PDF conversion interrupted by user")
-                    raise
-                except Exception as e:
-                    logging.error(f"PDF to image conversion failed: {e}")
-                    # Try alternative conversion options
-                    try:
-                        logging.info("Trying alternative conversion method...")
-                        images = pdf2image.convert_from_path(
-                            pdf_path,
-                            dpi=150,  # Lower DPI
-                            thread_count=1,
-                            grayscale=True,
-                            first_page=1,
-                            last_page=None,
-                            strict=False
-                        )
-                        pbar.update(len(images))
-                    except KeyboardInterrupt:
-                        logging.info("Alternative conversion interrupted by user")
-                        raise
-                    except Exception as e2:
-                        logging.error(f"Alternative conversion also failed: {e2}")
-                        return ""
+            # Render pages lazily; only a few page images are in memory at once
+            try:
+                images = self._rasterize(pdf_path, dpi=300, grayscale=True,
+                                         max_height=2000)  # Limit height for memory
+            except Exception as e:
+                logging.error(f"PDF rasterization failed: {e}")
+                return ""
             
             # Process images with OCR
             with tqdm(total=len(images), desc="OCR Processing with tesseract", unit="page") as pbar:
-                for i, image in enumerate(images, 1):
+                for i, raster in enumerate(images, 1):
                     try:
                         # Get tesseract process info for better interrupt handling
                         # First check if we're using pytesseract.pytesseract.run_tesseract
@@ -6485,7 +8647,7 @@ class PDFExtractor:
                         # OCR with optimized settings
                         try:
                             text = pytesseract.image_to_string(
-                                image,
+                                raster.image(),
                                 config='--oem 3 --psm 3 -l eng',  # Specify language and PSM mode
                                 # try deu+eng instead
                             )
@@ -6508,11 +8670,7 @@ class PDFExtractor:
                         logging.error(f"OCR failed on page {i}: {e}")
                         continue
                     finally:
-                        if image:
-                            try:
-                                image.close()
-                            except:
-                                pass
+                        raster.close()
         except KeyboardInterrupt:
             logging.info("Tesseract OCR process interrupted by user")
             # Just let it propagate
@@ -6526,13 +8684,9 @@ class PDFExtractor:
                 signal.signal(signal.SIGINT, original_sigint_handler)
                 signal.signal(signal.SIGTERM, original_sigterm_handler)
             
-            # Clean up resources
-            if images:
-                for img in images:
-                    try:
-                        img.close()
-                    except:
-                        pass
+            # Stop rendering and release prefetched pages
+            if images is not None:
+                images.close()
             
             # Terminate any remaining processes
             for proc in processes:
@@ -6688,16 +8842,432 @@ def setup_logging(verbosity: int = 0):
         logging.getLogger('pypdf').setLevel(logging.ERROR)
 
 
+class ExtractionCache(SQLiteCache):
+    """
+    Persistent content-addressed cache of extracted text
+    
+    Entries are keyed by the SHA-256 of the file contents plus the extraction
+    method and options, so moved, renamed or duplicated files are not extracted
+    again. A (path, size, mtime) table remembers known digests, so an unchanged
+    file is not even re-hashed. Text is stored zlib-compressed.
+    """
+    
+    FILENAME = 'extraction_cache.sqlite3'
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            digest TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS texts (
+            digest TEXT NOT NULL,
+            options TEXT NOT NULL,
+            text BLOB NOT NULL,
+            created REAL NOT NULL,
+            PRIMARY KEY (digest, options)
+        );
+    '''
+    FORMAT_VERSION = 1
+    # Options that change how fast text is extracted, not what is extracted
+    NEUTRAL_OPTIONS = ('page_parallel_threshold', 'page_workers')
+    HASH_CHUNK_SIZE = 1024 * 1024
+    
+    def options_key(self, method: Optional[str], ocr_method: Optional[str],
+                    force_ocr: bool, options: Optional[Dict[str, Any]] = None) -> str:
+        """Canonical string for the settings that determine the extracted text"""
+        relevant = {k: v for k, v in (options or {}).items() if k not in self.NEUTRAL_OPTIONS}
+        return json.dumps({
+            'version': self.FORMAT_VERSION,
+            'method': method,
+            'ocr_method': ocr_method,
+            'force_ocr': bool(force_ocr),
+            'options': relevant
+        }, sort_keys=True, default=str)
+    
+    def file_digest(self, file_path: str) -> str:
+        """
+        SHA-256 of a file, reusing the stored digest when size and mtime are unchanged
+        
+        Raises:
+            OSError: If the file cannot be read
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT digest FROM files WHERE path = ? AND size = ? AND mtime_ns = ?',
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        if row:
+            return row[0]
+        
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(functools.partial(f.read, self.HASH_CHUNK_SIZE), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)',
+                (path, stat.st_size, stat.st_mtime_ns, digest)
+            )
+            conn.commit()
+        return digest
+    
+    def get(self, digest: str, options_key: str) -> Optional[str]:
+        """Return the cached text for a digest and options key, or None"""
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT text FROM texts WHERE digest = ? AND options = ?',
+                (digest, options_key)
+            ).fetchone()
+        if not row:
+            return None
+        try:
+            return zlib.decompress(row[0]).decode('utf-8')
+        except (zlib.error, UnicodeDecodeError) as e:
+            logging.warning(f"Discarding corrupt extraction cache entry {digest[:12]}: {e}")
+            return None
+    
+    def put(self, digest: str, options_key: str, text: str):
+        """Store extracted text for a digest and options key"""
+        blob = zlib.compress(text.encode('utf-8'), 6)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO texts (digest, options, text, created) VALUES (?, ?, ?, ?)',
+                (digest, options_key, blob, time.time())
+            )
+            conn.commit()
+
+def _compress_bytes(data: bytes, codec: str) -> bytes:
+    """Compress data with 'zstd' (zstandard package) or 'zlib'"""
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+def _decompress_bytes(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """
+    Write data to path so that it is either complete or not there at all
+    
+    The data goes to a temporary file in the same directory, is fsynced and
+    then renamed over path with os.replace; a crash leaves at most a stray
+    '.<name>.*.tmp' file, never a truncated path.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    # Persist the rename itself (not possible on Windows)
+    if hasattr(os, 'O_DIRECTORY'):
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+
+
+# Suffix added to '<stem>.txt' by each text file compression
+TEXT_COMPRESSION_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+class TextFileOutput:
+    """
+    Output backend writing each extracted text to its own '<stem>.txt' file
+    
+    With compression 'gzip' or 'zstd' the file is '<stem>.txt.gz' or
+    '<stem>.txt.zst'. Paths are always given as '<stem>.txt'; exists() and
+    read() accept any of the variants, so changing --compress between runs
+    does not re-extract anything. write() removes the other variants, so a
+    stale file of another compression never hides the new text.
+    """
+    
+    name = 'txt'
+    
+    def __init__(self, compression: str = 'none'):
+        if compression not in TEXT_COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown text compression: {compression}")
+        self.compression = compression
+    
+    @staticmethod
+    def locate(path: str, compression: Optional[str] = None) -> Optional[str]:
+        """Existing file holding the text of path, trying compression's variant first, or None"""
+        suffixes = list(TEXT_COMPRESSION_SUFFIXES.values())
+        if compression in TEXT_COMPRESSION_SUFFIXES:
+            suffixes.remove(TEXT_COMPRESSION_SUFFIXES[compression])
+            suffixes.insert(0, TEXT_COMPRESSION_SUFFIXES[compression])
+        for suffix in suffixes:
+            if os.path.exists(path + suffix):
+                return path + suffix
+        return None
+    
+    def exists(self, path: str) -> bool:
+        return self.locate(path, self.compression) is not None
+    
+    def read(self, path: str) -> str:
+        location = self.locate(path, self.compression) or path
+        with open(location, 'rb') as f:
+            if location.endswith('.gz'):
+                data = gzip.decompress(f.read())
+            elif location.endswith('.zst'):
+                import zstandard
+                # Streaming also reads frames without a content size (zstd command line tool)
+                data = zstandard.ZstdDecompressor().stream_reader(f).read()
+            else:
+                data = f.read()
+        return data.decode('utf-8')
+    
+    def write(self, path: str, text: str) -> str:
+        """Write text atomically; returns the file written"""
+        data = text.encode('utf-8')
+        if self.compression == 'gzip':
+            buffer = io.BytesIO()
+            # gzip.compress only takes mtime from Python 3.8; a fixed one keeps output reproducible
+            with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6, mtime=0) as f:
+                f.write(data)
+            data = buffer.getvalue()
+        elif self.compression == 'zstd':
+            data = _compress_bytes(data, 'zstd')
+        location = path + TEXT_COMPRESSION_SUFFIXES[self.compression]
+        atomic_write_bytes(location, data)
+        for suffix in TEXT_COMPRESSION_SUFFIXES.values():
+            if path + suffix != location:
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
+        return location
+
+
+class ShardedTextOutput(SQLiteCache):
+    """
+    Output backend storing extracted texts in size-bounded shard files
+    
+    Each text is compressed on its own (zstd when the zstandard package is
+    installed, zlib otherwise) and appended to the current shard-NNNNN.bin in
+    the output directory; a new shard is started once one reaches shard_size
+    bytes. The sidecar index (shards.sqlite3) maps every document to its shard,
+    offset and length, so any text is read back with one seek. Documents keep
+    their '<stem>.txt' path as name, so skip, --noskip and reuse work as with
+    text files. Data is fsynced before its index row is committed.
+    """
+    
+    name = 'shards'
+    FILENAME = 'shards.sqlite3'
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS documents (
+            name TEXT PRIMARY KEY,
+            shard TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            codec TEXT NOT NULL,
+            created REAL NOT NULL
+        );
+    '''
+    SHARD_SIZE = 256 * 1024 * 1024
+    SHARD_PATTERN = re.compile(r'^shard-(\d{5,})\.bin$')
+    
+    def __init__(self, output_dir: str, shard_size: int = SHARD_SIZE):
+        """
+        Args:
+            output_dir: Directory holding the shards and their index
+            shard_size: Size in bytes after which a new shard is started
+        """
+        super().__init__(output_dir)
+        self.shard_size = shard_size
+        self.codec = 'zstd' if ImportCache().is_available('zstandard') else 'zlib'
+        self._names = None
+        self._shard = None  # (path, file object) being appended to
+    
+    def _load_names(self) -> set:
+        """Names of all stored documents; callers hold self._lock"""
+        if self._names is None:
+            rows = self._connect().execute('SELECT name FROM documents').fetchall()
+            self._names = {row[0] for row in rows}
+        return self._names
+    
+    def exists(self, path: str) -> bool:
+        with self._lock:
+            return os.path.basename(path) in self._load_names()
+    
+    def read(self, path: str) -> str:
+        """Text stored under path's name; FileNotFoundError if there is none"""
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT shard, offset, length, codec FROM documents WHERE name = ?',
+                (os.path.basename(path),)
+            ).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"No document {os.path.basename(path)} in {self.cache_dir}")
+        shard, offset, length, codec = row
+        with open(os.path.join(self.cache_dir, shard), 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        return _decompress_bytes(data, codec).decode('utf-8')
+    
+    def write(self, path: str, text: str):
+        """Append text under path's name, replacing an earlier version in the index"""
+        data = _compress_bytes(text.encode('utf-8'), self.codec)
+        name = os.path.basename(path)
+        with self._lock:
+            shard_path, shard_file = self._current_shard(len(data))
+            offset = shard_file.tell()
+            shard_file.write(data)
+            shard_file.flush()
+            os.fsync(shard_file.fileno())
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO documents (name, shard, offset, length, codec, created) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (name, os.path.basename(shard_path), offset, len(data), self.codec, time.time())
+            )
+            conn.commit()
+            self._load_names().add(name)
+        return path
+    
+    def _current_shard(self, incoming: int):
+        """Shard to append incoming bytes to, starting a new one when full; callers hold self._lock"""
+        if self._shard is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            numbers = [int(m.group(1)) for m in map(self.SHARD_PATTERN.match, os.listdir(self.cache_dir)) if m]
+            path = os.path.join(self.cache_dir, f"shard-{max(numbers, default=0):05d}.bin")
+            self._shard = (path, open(path, 'ab'))
+        path, shard_file = self._shard
+        if shard_file.tell() and shard_file.tell() + incoming > self.shard_size:
+            shard_file.close()
+            number = int(self.SHARD_PATTERN.match(os.path.basename(path)).group(1)) + 1
+            path = os.path.join(self.cache_dir, f"shard-{number:05d}.bin")
+            self._shard = (path, open(path, 'ab'))
+        return self._shard
+    
+    def close(self):
+        with self._lock:
+            if self._shard is not None:
+                self._shard[1].close()
+                self._shard = None
+        super().close()
+
+
+OUTPUT_FORMATS = ('txt', 'shards')
+# Settings of new output backends, see configure_text_output
+text_output_shard_size = ShardedTextOutput.SHARD_SIZE
+text_output_compression = 'none'
+_text_outputs = {}
+_text_outputs_lock = threading.Lock()
+
+def configure_text_output(shard_size: int = ShardedTextOutput.SHARD_SIZE, compression: str = 'none'):
+    """
+    Set the size in bytes at which ShardedTextOutput starts a new shard and
+    the compression of TextFileOutput files ('none', 'gzip' or 'zstd')
+    """
+    global text_output_shard_size, text_output_compression
+    if compression == 'zstd' and not ImportCache().is_available('zstandard'):
+        logging.warning("zstandard is not installed (pip install zstandard), compressing text files with gzip")
+        compression = 'gzip'
+    text_output_shard_size = max(1, shard_size)
+    text_output_compression = compression
+
+def text_output_for(output_format: str, output_dir: str):
+    """
+    Shared output backend of output_format ('txt' or 'shards') for output_dir
+    
+    Instances are kept per process, so worker processes open their own
+    index connection instead of one inherited through fork.
+    """
+    key = (os.getpid(), output_format, os.path.abspath(output_dir))
+    with _text_outputs_lock:
+        backend = _text_outputs.get(key)
+        if backend is None:
+            if output_format == 'shards':
+                backend = ShardedTextOutput(output_dir, text_output_shard_size)
+            else:
+                backend = TextFileOutput(text_output_compression)
+            _text_outputs[key] = backend
+        return backend
+
+
+class JSONLResultWriter:
+    """
+    Streams results to a JSON Lines file, one compact line per finished file
+    
+    Lines are flushed as they are written, so a crash loses at most the
+    results still in progress. text_mode controls the extracted text:
+    'include' stores it in the line, 'path' only records the text file
+    (text_path) and 'none' leaves it out. Safe to call from several threads.
+    """
+    
+    TEXT_MODES = ('include', 'path', 'none')
+    
+    def __init__(self, path: str, text_mode: str = 'include'):
+        if text_mode not in self.TEXT_MODES:
+            raise ValueError(f"Unknown text mode: {text_mode}")
+        self.text_mode = text_mode
+        self._file = open(path, 'w', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.written = 0
+    
+    def write(self, result: Dict[str, Any]):
+        """Append one result"""
+        if self.text_mode != 'include':
+            result = {k: v for k, v in result.items() if k != 'text'}
+            if self.text_mode == 'path' and result.get('output_path') and not result.get('metadata_only'):
+                result['text_path'] = result['output_path']
+        line = json.dumps(result, ensure_ascii=False, separators=(',', ':'), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.written += 1
+    
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
 class DocumentProcessor:
     """Main document processing coordinator"""
     
-    def __init__(self, debug: bool = False):
+    def __init__(self, debug: bool = False, cache_dir: Optional[str] = None,
+                 embedded_metadata: bool = True, output_format: str = 'txt'):
         self.manager = ExtractionManager(debug=debug)
         self._debug = debug
+        # Output backend of extracted texts, see text_output_for
+        self.output_format = output_format
+        # Sort from trustworthy embedded metadata without asking the LLM
+        self.embedded_metadata = embedded_metadata
         # (Optional) Initialize table extractor once if needed
         self._table_extractor = TableExtractor(ImportCache())
-        
-    def process_files(self, input_files: List[str], 
+        # Content-addressed text cache, disabled when no directory is given
+        self.cache = ExtractionCache(cache_dir) if cache_dir else None
+        # Set by _run_pipeline while sorting with --llm-batch-size > 1
+        self._metadata_batcher = None
+        # Files left for a sorting-only pass because their LLM endpoint was down
+        self.deferred_sorts = 0
+        
+    def process_files(self, input_files: Iterable[str], 
                 output_dir: Optional[str] = None,
                 method: Optional[str] = None,
                 ocr_method: Optional[str] = None,
@@ -6711,84 +9281,75 @@ class DocumentProcessor:
                 llm_provider = None,  
                 temperature: float = 0.7,     
                 max_tokens: int = 250,        
+                executor: str = 'thread',
+                llm_workers: int = 2,
+                queue_size: Optional[int] = None,
+                llm_batch_size: int = 1,
+                llm_async: bool = False,
+                llm_in_flight: int = 64,
+                result_sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+                keep_text: bool = True,
                 **kwargs) -> Dict[str, Any]:
-        """Process multiple files with interrupt handling and optional sorting"""
-        results = {}
-        failed = []
-        skipped = []
+        """
+        Process multiple files with interrupt handling and optional sorting
+        
+        Extraction runs in a pool of max_workers threads (executor='thread') or
+        processes (executor='process'). Writing output and LLM sorting run in a
+        separate stage of llm_workers threads, fed through a bounded queue of
+        queue_size records (default: twice llm_workers). With llm_batch_size > 1,
+        metadata requests of up to that many documents share one LLM prompt.
+        With llm_async, sorting runs on the shared LLM event loop instead, with
+        up to llm_in_flight documents awaiting the LLM at once.
+        
+        input_files may be a lazy iterable such as iter_input_files(); files are
+        pulled from it only as extraction slots free up.
+        
+        Each finished result is passed to result_sink (e.g. JSONLResultWriter.write)
+        as soon as it is complete. With a result_sink, results are not kept at all
+        and only the counters in 'stats' are returned, so memory stays flat however
+        large the library is. Without one, keep_text=False drops text and tables
+        from the returned results.
+        """
         
         # Ensure output directory exists
         if output_dir:
             Path(output_dir).mkdir(parents=True, exist_ok=True)
         
-        # Determine number of workers - fewer workers when sorting to avoid Ollama overload
-        if sort:
-            # When sorting is enabled, use fewer workers to prevent Ollama API overload
-            max_workers = max_workers or min(4, os.cpu_count() or 1)  # Use at most 4 threads for sorting
-        else:
-            max_workers = max_workers or min(len(input_files), (os.cpu_count() or 1))
-        
-        # ProcessPoolExecutor doesn't work well with our thread_local OpenAI clients
-        # So we stick with ThreadPoolExecutor
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {}
-            
-            with tqdm(total=len(input_files), desc="Processing files", unit="file") as pbar:
-                for input_file in input_files:
-                    logging.debug(f"Processing {input_file}... with {llm_provider}")
-                    if shutdown_flag.is_set():
-                        logging.info("Shutdown flag detected. Not submitting more jobs.")
-                        break
-                        
-                    future = executor.submit(
-                        self._process_single_file,
-                        input_file,
-                        output_dir,
-                        method,
-                        ocr_method,  # note: we must be very specific about the correct position
-                        password,    # because there are no named parameters for future executions!
-                        extract_tables,
-                        force_ocr,
-                        noskip,
-                        sort,                     
-                        rename_script_path,       
-                        counters if 'counters' in locals() else None,
-                        llm_provider,
-                        temperature,
-                        max_tokens,
-                        **kwargs
-                    )
-                    futures[future] = input_file
-                
-                for future in as_completed(futures):
-                    input_file = futures[future]
-                    try:
-                        result = future.result()
-                        results[input_file] = result
-                        if result.get('skipped', False):
-                            skipped.append(input_file)
-                        elif not result['success']:
-                            failed.append((input_file, result.get('error', 'Unknown error')))
-                            if self._debug:
-                                logging.error(f"Failed to process {input_file}: {result.get('error')}")
-                    except Exception as e:
-                        failed.append((input_file, str(e)))
-                        if self._debug:
-                            logging.error(f"Failed to process {input_file}: {e}")
-                    finally:
-                        pbar.update(1)
-                        
-                    # Check shutdown flag periodically
-                    if shutdown_flag.is_set() and not future.done():
-                        future.cancel()
+        # Extraction scales with the core count; LLM concurrency is set separately
+        # by llm_workers, so sorting no longer caps the extraction stage
+        max_workers = max_workers or (os.cpu_count() or 1)
+        if hasattr(input_files, '__len__'):
+            max_workers = min(max_workers, len(input_files))
+        max_workers = max(1, max_workers)
+        
+        results, stats = self._run_pipeline(
+            input_files, output_dir, method, ocr_method, password,
+            extract_tables, force_ocr, max_workers, noskip, sort,
+            rename_script_path, llm_provider, temperature, max_tokens,
+            executor=executor, llm_workers=llm_workers, queue_size=queue_size,
+            llm_batch_size=llm_batch_size, llm_async=llm_async,
+            llm_in_flight=llm_in_flight, result_sink=result_sink, keep_text=keep_text, **kwargs
+        )
+        failed = stats['failed']
+        skipped = stats['skipped_files']
+        if self._debug:
+            for input_file, error in failed:
+                logging.error(f"Failed to process {input_file}: {error}")
+        
         
         # Print summary 
         if True: # or change to: self._debug
-            successful = len([r for r in results.values() if r['success']])
             logging.info(f"\nProcessing Summary:")
-            logging.info(f"Total files: {len(input_files)}")
-            logging.info(f"Successful: {successful}")
-            logging.info(f"Skipped: {len(skipped)}")
+            logging.info(f"Total files: {stats['total']}")
+            logging.info(f"Successful: {stats['successful']}")
+            if stats['cached']:
+                logging.info(f"From extraction cache: {stats['cached']}")
+            if stats['embedded']:
+                logging.info(f"Sorted from embedded metadata (no LLM): {stats['embedded']}")
+            if self.deferred_sorts:
+                logging.info(f"Sorting deferred, LLM unavailable: {self.deferred_sorts} "
+                             f"(listed in {DEFERRED_SORT_LIST}, rerun with --sort-deferred)")
+            logging.info(f"Skipped: {stats['skipped']}")
             logging.info(f"Failed: {len(failed)}")
             
             if skipped: # and self._debug:
@@ -6804,9 +9365,289 @@ class DocumentProcessor:
         return {
             'results': results,
             'failed': failed,
-            'skipped': skipped
+            'skipped': skipped,
+            'stats': stats
         }
     
+    def _run_pipeline(self, input_files: Iterable[str],
+                output_dir: Optional[str],
+                method: Optional[str],
+                ocr_method: Optional[str],
+                password: Optional[str],
+                extract_tables: bool,
+                force_ocr: bool,
+                max_workers: int,
+                noskip: bool,
+                sort: bool,
+                rename_script_path: str,
+                llm_provider,
+                temperature: float,
+                max_tokens: int,
+                executor: str = 'thread',
+                llm_workers: int = 2,
+                queue_size: Optional[int] = None,
+                llm_batch_size: int = 1,
+                llm_async: bool = False,
+                llm_in_flight: int = 64,
+                result_sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+                keep_text: bool = True,
+                **kwargs) -> Dict[str, Dict[str, Any]]:
+        """
+        Run the two-stage pipeline: extraction workers feeding an output/LLM stage
+        
+        Extraction runs in a thread or process pool with max_workers. Finished
+        records go into a bounded queue drained by llm_workers threads, which
+        write the text and do sorting. When the LLM stage falls behind, the queue
+        fills, the submit loop blocks on it and no new extractions are started,
+        so at most max_workers jobs plus queue_size records are held in memory.
+        
+        With llm_async the stage threads only write the text and submit sorting
+        to the shared LLM event loop; up to llm_in_flight documents may await
+        the LLM there, beyond that the stage threads block as before.
+        
+        Finished results are counted and go to result_sink; only without a sink
+        are they also kept, without text and tables if keep_text is False.
+        
+        Returns:
+            Tuple of the dict mapping input file to its result dict (empty with a
+            result_sink) and the run counters: total, successful, cached, embedded,
+            skipped, extensions (count per input extension), failed (list of
+            (input file, error)) and skipped_files (only without a result_sink)
+        """
+        results = {}
+        stats = {'total': 0, 'successful': 0, 'cached': 0, 'embedded': 0, 'skipped': 0,
+                 'extensions': {}, 'failed': [], 'skipped_files': []}
+        results_lock = threading.Lock()
+        
+        def store(result):
+            """Count a finished result, hand it to the sink or keep it"""
+            if result_sink is not None:
+                try:
+                    result_sink(result)
+                except Exception as e:
+                    logging.error(f"Could not write result of {result['input_file']}: {e}")
+            input_file = result['input_file']
+            ext = os.path.splitext(input_file)[1].lower()
+            with results_lock:
+                stats['total'] += 1
+                stats['extensions'][ext] = stats['extensions'].get(ext, 0) + 1
+                if result['success']:
+                    stats['successful'] += 1
+                if result.get('cached'):
+                    stats['cached'] += 1
+                if (result.get('metadata') or {}).get('metadata_source') == 'embedded':
+                    stats['embedded'] += 1
+                if result.get('skipped', False):
+                    stats['skipped'] += 1
+                    if result_sink is None:
+                        stats['skipped_files'].append(input_file)
+                elif not result['success']:
+                    stats['failed'].append((input_file, result.get('error', 'Unknown error')))
+                if result_sink is None:
+                    if not keep_text:
+                        result = {k: v for k, v in result.items() if k not in ('text', 'tables')}
+                    results[input_file] = result
+        
+        # Without sorting the second stage only writes files, one thread is enough
+        stage_workers = max(1, llm_workers) if sort else 1
+        
+        self._metadata_batcher = None
+        async_provider = None
+        if sort and llm_async:
+            # The default Ollama path uses a bare OpenAI client, which has no async interface
+            async_provider = llm_provider if llm_provider is not None else OllamaProvider(model_name=MODEL_NAME)
+            llm_loop = start_llm_loop(llm_in_flight)
+            sort_limit = max(1, llm_in_flight)
+            sort_slots = threading.BoundedSemaphore(sort_limit)
+            if llm_batch_size > 1:
+                logging.info("--llm-batch-size is ignored when sorting on the LLM event loop")
+        elif sort and llm_batch_size > 1:
+            # Each waiting document occupies a stage thread, so a batch can only
+            # fill up with at least llm_batch_size of them
+            stage_workers = max(stage_workers, llm_batch_size)
+            self._metadata_batcher = MetadataBatcher(
+                llm_provider if llm_provider is not None else get_openai_client(),
+                llm_batch_size
+            )
+        record_queue = queue.Queue(maxsize=max(1, queue_size or stage_workers * 2))
+        
+        if executor == 'process':
+            from concurrent.futures import ProcessPoolExecutor
+            # Each worker process builds its own DocumentProcessor once, so extractor
+            # pools and loaded OCR models are reused for every file it handles
+            extract_executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_extraction_worker,
+                initargs=(self._debug, logging.getLogger().level,
+                          self.cache.cache_dir if self.cache else None)
+            )
+            run_job = _run_extraction_worker
+        else:
+            extract_executor = ThreadPoolExecutor(max_workers=max_workers)
+            run_job = self._run_extraction_job
+            # Large PDFs of all extraction threads share one page pool, sized to
+            # the cores the other extraction threads leave free: the thread
+            # splitting a PDF only waits for its shards
+            configure_page_pool(kwargs.get('page_workers'), reserved=max_workers - 1)
+        
+        # Lazy inputs have no length; the bar then just counts files
+        total = len(input_files) if hasattr(input_files, '__len__') else None
+        with tqdm(total=total, desc="Processing files", unit="file") as pbar:
+            
+            def finish_sort(result, future):
+                """Done callback of an async sort: store the result and free its slot"""
+                try:
+                    sort_metadata = None if future.cancelled() else future.result()
+                except Exception as e:
+                    logging.error(f"Error sorting file {result['input_file']}: {e}")
+                    sort_metadata = None
+                if sort_metadata:
+                    result['metadata'] = {**sort_metadata, **result['metadata']}
+                store(result)
+                pbar.update(1)
+                sort_slots.release()
+            
+            def submit_sort(job, record):
+                """Write the text, then hand sorting to the LLM event loop"""
+                result = self._finish_file(job, record, False, rename_script_path,
+                                           None, llm_provider, temperature, max_tokens)
+                if not result['success'] or shutdown_flag.is_set():
+                    store(result)
+                    pbar.update(1)
+                    return
+                # Blocks while llm_in_flight documents await the LLM
+                sort_slots.acquire()
+                counters = {'sorted': 0, 'sort_failed': 0}
+                try:
+                    future = llm_loop.submit(self._sort_file_async(
+                        job['input_file'], result['text'], job['output_path'], rename_script_path,
+                        counters, async_provider, temperature, max_tokens,
+                        embedded=record.get('embedded')
+                    ))
+                except Exception:
+                    sort_slots.release()
+                    raise
+                future.add_done_callback(functools.partial(finish_sort, result))
+            
+            def output_stage():
+                """Drain extraction records: write output and sort"""
+                while True:
+                    item = record_queue.get()
+                    try:
+                        if item is None:
+                            return
+                        job, record = item
+                        try:
+                            if async_provider is not None:
+                                submit_sort(job, record)
+                                continue
+                            result = self._finish_file(
+                                job, record, sort, rename_script_path,
+                                None, llm_provider, temperature, max_tokens
+                            )
+                        except Exception as e:
+                            logging.error(f"Failed to finish {job['input_file']}: {e}")
+                            result = {'success': False, 'input_file': job['input_file'],
+                                      'skipped': False, 'error': str(e)}
+                        store(result)
+                        pbar.update(1)
+                    finally:
+                        record_queue.task_done()
+            
+            stage_threads = [
+                threading.Thread(target=output_stage, name=f"output-stage-{i}", daemon=True)
+                for i in range(stage_workers)
+            ]
+            for thread in stage_threads:
+                thread.start()
+            
+            # Keep a bounded number of extractions in flight so that backpressure
+            # from the queue reaches the submit loop, and pull input files lazily
+            # so memory stays proportional to the worker count, not the library size
+            max_in_flight = max_workers * 2
+            in_flight = {}
+            pending_files = iter(input_files)
+            submitting = True
+            
+            try:
+                with extract_executor:
+                    while True:
+                        while submitting and len(in_flight) < max_in_flight:
+                            if shutdown_flag.is_set():
+                                logging.info("Shutdown flag detected. Not submitting more jobs.")
+                                submitting = False
+                                break
+                            input_file = next(pending_files, None)
+                            if input_file is None:
+                                submitting = False
+                                break
+                            
+                            logging.debug(f"Processing {input_file}... with {llm_provider}")
+                            try:
+                                job, skipped = self._plan_file(
+                                    input_file, output_dir, method, ocr_method, password,
+                                    extract_tables, force_ocr, noskip, sort, rename_script_path, **kwargs
+                                )
+                            except Exception as e:
+                                logging.error(f"Processing failed: {e}")
+                                store({'success': False, 'input_file': input_file,
+                                       'skipped': False, 'error': f"Processing failed: {str(e)}"})
+                                pbar.update(1)
+                                continue
+                            
+                            if skipped:
+                                store(skipped)
+                                pbar.update(1)
+                                continue
+                            
+                            in_flight[extract_executor.submit(run_job, job)] = job
+                        
+                        if not in_flight:
+                            break
+                        
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            job = in_flight.pop(future)
+                            try:
+                                record = future.result()
+                            except Exception as e:
+                                # Worker crashed or the record could not be unpickled
+                                record = {'input_file': job['input_file'], 'success': False,
+                                          'error': f"Processing failed: {str(e)}"}
+                            # Blocks while the output/LLM stage is saturated
+                            record_queue.put((job, record))
+            finally:
+                for _ in stage_threads:
+                    record_queue.put(None)
+                for thread in stage_threads:
+                    thread.join()
+                if async_provider is not None:
+                    # Every slot is released once its sort result is stored
+                    for _ in range(sort_limit):
+                        sort_slots.acquire()
+                    stop_llm_loop()
+                shutdown_page_pool()
+        
+        if self._metadata_batcher is not None:
+            logging.info(f"Batched LLM requests: {self._metadata_batcher.batches}, "
+                         f"single-request fallbacks: {self._metadata_batcher.fallbacks}")
+            self._metadata_batcher = None
+        
+        if sort:
+            with llm_limiters_lock:
+                limiters = list(llm_limiters.values())
+            for limiter in limiters:
+                limiter_stats = limiter.stats()
+                logging.info(f"LLM endpoint {limiter_stats['endpoint']}: concurrency limit {limiter_stats['limit']}, "
+                             f"{limiter_stats['successes']} ok, {limiter_stats['overloads']} overloaded, "
+                             f"latency p50 {limiter_stats['p50']:.2f}s p90 {limiter_stats['p90']:.2f}s "
+                             f"p99 {limiter_stats['p99']:.2f}s")
+            if author_name_memo.hits:
+                logging.info(f"Author names reused from memo: {author_name_memo.hits}")
+        
+        return results, stats
+    
+
     def _extract_pdf_metadata(self, file_path: str) -> Dict[str, Any]:
         """Extract PDF metadata using PyPDF"""
         metadata = {}
@@ -6817,7 +9658,8 @@ class DocumentProcessor:
                 doc_info = reader.metadata
                 if doc_info:
                     for key, value in doc_info.items():
-                        metadata[key] = value
+                        # Plain strings keep the record picklable and JSON-serializable
+                        metadata[key] = str(value)
         except Exception as e:
             logging.warning(f"Failed to extract PDF metadata: {e}")
         return metadata
@@ -7082,7 +9924,7 @@ class DocumentProcessor:
                 'error': error_msg
             }
 
-    def _process_single_file(self, input_file: str,
+    def _plan_file(self, input_file: str,
                 output_dir: Optional[str] = None,
                 method: Optional[str] = None,
                 ocr_method: Optional[str] = None,
@@ -7092,44 +9934,245 @@ class DocumentProcessor:
                 noskip: bool = False,
                 sort: bool = False,
                 rename_script_path: str = None,
+                **kwargs) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Decide whether a file needs work and build its extraction job
+        
+        Runs in the parent before any extraction is scheduled. The job descriptor
+        only holds plain values, so it can be sent to a worker process.
+        
+        Returns:
+            (job, None) if the file should be processed, (None, result) if skipped
+        """
+        # Extract just the filename without path for output
+        input_basename = os.path.basename(input_file)
+        
+        input_stem = os.path.splitext(input_basename)[0]  # Filename without extension
+        
+        # Use base output directory, creating it if needed
+        base_output_dir = os.path.abspath(output_dir or '.')
+        os.makedirs(base_output_dir, exist_ok=True)
+        
+        # Generate the output text file path (a document name in the shards backend)
+        basic_output_path = os.path.join(base_output_dir, f"{input_stem}.txt")
+        output = text_output_for(self.output_format, base_output_dir)
+        output_exists = output.exists(basic_output_path)
+        
+        # Metadata mode extracts only a few pages and writes no text file
+        metadata_only = sort and bool(kwargs.get('metadata_pages'))
+        
+        # Check if we should skip this file
+        should_skip = False
+        if (output_exists or metadata_only) and not noskip:
+            # If not sorting, skip existing files
+            if not sort:
+                should_skip = True
+            elif processing_manifest is not None:
+                # When sorting, skip files that already have a rename command
+                state, detail = processing_manifest.get(input_file)
+                if state == 'renamed':
+                    should_skip = True
+                elif state == 'sorted' and detail and 'rename' in detail:
+                    should_skip = True
+                    # The rename script is rewritten each run, so queue the
+                    # recorded command again instead of asking the LLM
+                    if rename_script_path and not processing_manifest.emitted(input_file):
+                        add_rename_command(rename_script_path, input_file, **detail['rename'])
+                if should_skip:
+                    logging.debug(f"File {input_file} already {state}, skipping")
+            elif rename_script_path and is_file_in_rename_script(rename_script_path, input_file):
+                should_skip = True
+                logging.debug(f"File {input_file} already in rename script, skipping")
+        
+        if should_skip:
+            if self._debug:
+                logging.info(f"Skipping {input_file} - output file exists and already processed")
+            return None, {
+                'success': True,
+                'text': '',
+                'tables': [],
+                'metadata': {},
+                'input_file': input_file,
+                'skipped': True,
+                'output_path': basic_output_path
+            }
+        
+        # Create unique output path if needed (for noskip option)
+        output_path = basic_output_path
+        
+        if noskip and output_exists:
+            counter = 1
+            while True:
+                output_path = os.path.join(base_output_dir, f"{input_stem}_{counter}.txt")
+                
+                if not output.exists(output_path):
+                    break
+                counter += 1
+        
+        job = {
+            'input_file': input_file,
+            'output_path': output_path,
+            'output_format': self.output_format,
+            # When sorting, an existing text file is reused instead of re-extracting
+            'reuse_path': basic_output_path if sort and output_exists else None,
+            'method': method,
+            'ocr_method': ocr_method,
+            'password': password,
+            'extract_tables': extract_tables,
+            'force_ocr': force_ocr,
+            # Embedded metadata is read in the extraction stage, next to the file
+            'resolve_metadata': sort and self.embedded_metadata,
+            'metadata_only': metadata_only,
+            'options': kwargs
+        }
+        return job, None
+    
+    def _run_extraction_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extraction stage: get the text, tables and file metadata for one job
+        
+        Does not write output or talk to an LLM, so it is safe to run in a worker
+        process. The returned record only holds plain picklable values.
+        
+        Args:
+            job: Job descriptor from _plan_file
+            
+        Returns:
+            Dict with 'success', 'text', 'tables', 'metadata', 'reused_text', 'cached',
+            'embedded' (resolve_embedded_metadata result, when sorting) and 'error'
+        """
+        input_file = job['input_file']
+        record = {
+            'input_file': input_file,
+            'success': False,
+            'text': '',
+            'tables': [],
+            'metadata': {},
+            'reused_text': False,
+            'cached': False,
+            'embedded': None,
+            'error': None
+        }
+        
+        # Check for shutdown flag
+        if shutdown_flag.is_set():
+            logging.debug(f"Shutdown flag detected. Skipping {input_file}")
+            record['error'] = "Processing aborted due to shutdown signal"
+            return record
+        
+        try:
+            text = ""
+            
+            if job.get('reuse_path'):
+                # Reuse existing text file for sorting
+                try:
+                    text = text_output_for(job.get('output_format', 'txt'),
+                                           os.path.dirname(job['reuse_path'])).read(job['reuse_path'])
+                    record['reused_text'] = True
+                    logging.debug(f"Reusing existing text from {job['reuse_path']} for sorting")
+                except Exception as e:
+                    logging.error(f"Error reading existing text file: {e}")
+                    # Will fall back to extraction
+                    
+            # Look the file up by content hash, so moved or duplicated files
+            # cost a hash instead of another extraction
+            digest = cache_key = None
+            if not record['reused_text'] and self.cache is not None:
+                try:
+                    digest = self.cache.file_digest(input_file)
+                    cache_key = self.cache.options_key(job['method'], job['ocr_method'],
+                                                       job['force_ocr'], job.get('options'))
+                    text = self.cache.get(digest, cache_key) or ""
+                except (OSError, sqlite3.Error) as e:
+                    logging.warning(f"Extraction cache unavailable for {input_file}: {e}")
+                    digest = None
+                if text:
+                    record['cached'] = True
+                    logging.debug(f"Using cached text for {input_file} ({digest[:12]})")
+                    
+            # Extract text if we couldn't reuse existing
+            if not record['reused_text'] and not record['cached']:
+                logging.debug(f"Going to extract {input_file} -> {job['output_path']}")
+                    
+                text = self.manager.extract(
+                    input_file,
+                    output_path=None,  # We'll handle saving ourselves
+                    method=job['method'],
+                    ocr_method=job['ocr_method'],
+                    password=job['password'],
+                    extract_tables=job['extract_tables'],
+                    force_ocr=job['force_ocr'], 
+                    **job.get('options', {})
+                )
+                
+                if text and digest:
+                    try:
+                        self.cache.put(digest, cache_key, text)
+                    except sqlite3.Error as e:
+                        logging.warning(f"Could not cache text for {input_file}: {e}")
+            
+            if not text:
+                record['error'] = "No text extracted"
+                return record
+            
+            record['text'] = text
+            record['success'] = True
+            
+            # Extract tables if requested (only for PDFs)
+            if job['extract_tables'] and input_file.lower().endswith('.pdf'):
+                try:
+                    tables = self._table_extractor.extract_tables(input_file)
+                    record['tables'] = [table.df.to_dict() for table in tables]
+                    if self._debug:
+                        logging.info(f"Extracted {len(tables)} tables from {input_file}")
+                except Exception as te:
+                    logging.error(f"Table extraction failed for {input_file}: {te}")
+                    record['tables'] = []
+            
+            # Extract file metadata
+            record['metadata'] = self._extract_metadata(input_file) or {}
+            
+            if job.get('resolve_metadata'):
+                try:
+                    record['embedded'] = resolve_embedded_metadata(input_file, text[:5000])
+                except Exception as e:
+                    logging.debug(f"Embedded metadata resolution failed for {input_file}: {e}")
+            
+        except Exception as e:
+            record['success'] = False
+            record['error'] = f"Processing failed: {str(e)}"
+            logging.error(record['error'])
+            
+        return record
+    
+    def _finish_file(self, job: Dict[str, Any],
+                record: Dict[str, Any],
+                sort: bool = False,
+                rename_script_path: str = None,
                 counters: Dict[str, int] = None,
-                llm_provider = None,     
+                llm_provider = None,
                 temperature: float = 0.7,
-                max_tokens: int = 250,
-                **kwargs) -> Dict[str, Any]:
+                max_tokens: int = 250) -> Dict[str, Any]:
         """
-        Process a single document, with optimized skipping logic for sorting
+        Output stage: write the extracted text and run sorting for one file
+        
+        Always runs in the parent process, where the LLM clients live.
         
         Args:
-            input_file: Path to input file
-            output_dir: Optional output directory
-            method: Preferred extraction method
-            ocr_method: Optional OCR method
-            password: Password for encrypted documents
-            extract_tables: Whether to extract tables
-            noskip: Whether to process even if output exists
+            job: Job descriptor from _plan_file
+            record: Extraction record from _run_extraction_job
             sort: Whether to sort files based on content
             rename_script_path: Path to write rename commands
             counters: Dictionary for tracking statistics
             llm_provider: Provider for LLM communication
             temperature: Temperature setting for LLM
             max_tokens: Maximum tokens for LLM
-            **kwargs: Additional extraction options
             
         Returns:
             Dict with processing results
         """
-        logging.debug(f"Attempting processing of single file: {input_file} with {llm_provider}")
-        
-        # Initialize result dictionary
-        result = {
-            'success': False,
-            'text': '',
-            'tables': [],
-            'metadata': {},
-            'input_file': input_file,
-            'skipped': False
-        }
+        input_file = job['input_file']
+        output_path = job['output_path']
         
         # Initialize counters if not provided
         if counters is None:
@@ -7142,286 +10185,368 @@ class DocumentProcessor:
                 'failed': 0
             }
         
-        # Check for shutdown flag
-        if shutdown_flag.is_set():
-            logging.debug(f"Shutdown flag detected. Skipping {input_file}")
-            result['error'] = "Processing aborted due to shutdown signal"
+        result = {
+            'success': False,
+            'text': '',
+            'tables': [],
+            'metadata': {},
+            'input_file': input_file,
+            'skipped': False
+        }
+        
+        if not record.get('success'):
+            error = record.get('error') or "No text extracted"
+            if error == "No text extracted":
+                logging.error(f"Failed to extract text from {input_file}")
+                note = "No text extracted"
+            else:
+                note = f"Processing error: {error}"
+            result['error'] = error
+            counters['failed'] += 1
+            manifest_record(input_file, 'failed', {'error': error})
+            with file_lock:
+                with open("unparseables.lst", "a") as unparseable_file:
+                    unparseable_file.write(f"{input_file} - {note}\n")
+                    unparseable_file.flush()
             return result
         
+        text = record['text']
+        result['text'] = text
+        result['success'] = True
+        if record.get('cached'):
+            result['cached'] = True
+        counters['processed'] += 1
+        
+        # Only save the text to file if we extracted it (not if we reused existing).
+        # Partial metadata-mode text is not saved, so a later full run extracts the file
+        if job.get('metadata_only') and not record.get('reused_text'):
+            result['metadata_only'] = True
+        elif not record.get('reused_text'):
+            try:
+                # Write the text file, or append it to the current shard
+                result['output_path'] = text_output_for(
+                    job.get('output_format', 'txt'), os.path.dirname(output_path)
+                ).write(output_path, text)
+                
+                if self._debug:
+                    logging.info(f"Saved text to {output_path}")
+                else:
+                    logging.debug(f"Saved text to {output_path}")
+                    
+            except Exception as e:
+                logging.error(f"Failed to write output file {output_path}: {e}")
+                result['success'] = False
+                result['error'] = str(e)
+                counters['failed'] += 1
+                manifest_record(input_file, 'failed', {'error': str(e)})
+                return result
+        else:
+            result['output_path'] = job['reuse_path']
+        manifest_record(input_file, 'extracted', {'output_path': result.get('output_path')})
+        
+        if sort:
+            logging.debug(f"Working on {os.path.basename(input_file)} => {output_path}: {llm_provider}, {rename_script_path} ...")   
+            sort_metadata = self._sort_file(
+                input_file, text, output_path, rename_script_path,
+                counters, llm_provider, temperature, max_tokens,
+                embedded=record.get('embedded')
+            )
+            if sort_metadata:
+                result['metadata'] = sort_metadata
+        
+        result['tables'] = record.get('tables', [])
+        if record.get('metadata'):
+            result['metadata'].update(record['metadata'])
+            
+        return result
+    
+    def _sort_file(self, input_file: str, text: str, output_path: str,
+                rename_script_path: str, counters: Dict[str, int],
+                llm_provider = None, temperature: float = 0.7,
+                max_tokens: int = 250,
+                embedded: Optional[Dict[str, Any]] = None,
+                metadata_content: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Determine metadata and add a rename command for one file
+        
+        Trusted embedded metadata (see resolve_embedded_metadata) is used as is;
+        otherwise the LLM is asked, unless its response is passed in as
+        metadata_content (see _sort_file_async).
+        
+        Returns:
+            Parsed metadata dict if a rename command was written, else None
+        """
         try:
-            # Extract just the filename without path for output
-            input_basename = os.path.basename(input_file)
+            if embedded and embedded.get('trusted'):
+                logging.debug(f"Using embedded metadata for {input_file}: {embedded['confidence']}")
+                metadata = {
+                    'title': embedded['title'],
+                    'author': embedded['author'],
+                    'year': embedded['year'],
+                    'language': embedded['language'],
+                    'metadata_source': 'embedded'
+                }
+            else:
+                metadata = self._llm_metadata(input_file, text, counters, llm_provider,
+                                              temperature, max_tokens, metadata_content)
+                if metadata is None:
+                    self._sort_failed(input_file, "No usable metadata from LLM")
+                    return None
+                metadata['metadata_source'] = 'llm'
+            corrected_author = metadata['author']
+                
+            # Get file details
+            title = metadata['title']
+            year = metadata.get('year', 'Unknown')
             
-            input_stem = os.path.splitext(input_basename)[0]  # Filename without extension
+            # Validate and fix year with new helper function
+            year = validate_and_fix_year(year, os.path.basename(input_file), text[:5000])
             
-            # Use base output directory, creating it if needed
-            base_output_dir = os.path.abspath(output_dir or '.')
-            os.makedirs(base_output_dir, exist_ok=True)
+            # Get language if available
+            language = metadata.get('language', 'en')
             
-            # Generate the output text file path
-            basic_output_path = os.path.join(base_output_dir, f"{input_stem}.txt")
+            # Validate essential metadata
+            if not corrected_author or corrected_author == "UnknownAuthor" or not title:
+                logging.warning(f"Missing author or title for {input_file}. Skipping rename.")
+                with file_lock:
+                    with open("unparseables.lst", "a") as unparseable_file:
+                        unparseable_file.write(f"{input_file} - Missing metadata: Author='{corrected_author}', Title='{title}'\n")
+                        unparseable_file.flush()
+                counters['sort_failed'] += 1
+                self._sort_failed(input_file, "Missing author or title")
+                return None
             
-            # Check if we should skip this file
-            should_skip = False
-            if os.path.exists(basic_output_path) and not noskip:
-                # If not sorting, skip existing files
-                if not sort:
-                    should_skip = True
-                else:
-                    # When sorting, skip only if file is already in rename script
-                    if rename_script_path and os.path.exists(rename_script_path):
-                        try:
-                            # Check if input file path is in rename script
-                            with open(rename_script_path, 'r') as script_file:
-                                script_content = script_file.read()
-                                if input_file in script_content:
-                                    should_skip = True
-                                    logging.debug(f"File {input_file} already in rename script, skipping")
-                        except Exception as e:
-                            logging.error(f"Error checking rename script: {e}")
-                            # Continue processing if we can't check the rename script
+            # Create target paths with sanitized names
+            first_author = sanitize_filename(corrected_author)
+            sanitized_title = sanitize_filename(title)
+            # Simply use the author name as the target directory - add_rename_command will handle the full path
+            target_dir = first_author  # Just the author name, not a full path
+
+            logging.debug(f"Outputting to {target_dir}.")
+
+            file_extension = os.path.splitext(input_file)[1].lower()
             
+            # Create filename with appropriate formatting
+            # Handle non-English files with language code
+            if language and language.lower() not in ['en', 'eng', 'english', 'unknown']:
+                # Extract just the base extension without dot
+                base_ext = file_extension[1:] if file_extension.startswith('.') else file_extension
+                # Add language code before extension
+                new_filename = f"{year} {sanitized_title}_{language}.{base_ext}"
+            else:
+                new_filename = f"{year} {sanitized_title}{file_extension}"
             
-            if should_skip:
-                if self._debug:
-                    logging.info(f"Skipping {input_file} - output file exists and already processed")
-                result['success'] = True
-                result['skipped'] = True
-                result['output_path'] = basic_output_path
-                counters['skipped'] += 1
-                return result
+            logging.debug(f"New path/filename will be: {target_dir}/{new_filename}")
             
-            # Create unique output path if needed (for noskip option)
-            output_path = basic_output_path
+            # Add rename command with improved function
+            add_rename_command(
+                rename_script_path,
+                source_path=input_file,
+                target_dir=target_dir,
+                new_filename=new_filename,
+                output_dir=os.path.dirname(output_path) if output_path else None
+            )
             
-            if noskip and os.path.exists(basic_output_path):
-                counter = 1
-                while True:
-                    output_path = os.path.join(base_output_dir, f"{input_stem}_{counter}.txt")
-                    
-                    if not os.path.exists(output_path):
-                        break
-                    counter += 1
+            counters['sorted'] += 1
+            return metadata
             
-            # Determine if we need to extract text or can use existing file
-            text = ""
-            reused_text = False
+        except Exception as sort_e:
+            logging.error(f"Error sorting file {input_file}: {sort_e}")
+            with file_lock:
+                with open("unparseables.lst", "a") as unparseable_file:
+                    unparseable_file.write(f"{input_file} - Error during sorting: {str(sort_e)}\n")
+                    unparseable_file.flush()
+            counters['sort_failed'] += 1
+            self._sort_failed(input_file, str(sort_e))
+            return None
 
-            
-            
-            if sort and os.path.exists(basic_output_path):
-                # Reuse existing text file for sorting
-                try:
-                    with open(basic_output_path, 'r', encoding='utf-8') as f:
-                        text = f.read()
-                    reused_text = True
-                    logging.debug(f"Reusing existing text from {basic_output_path} for sorting")
-                except Exception as e:
-                    logging.error(f"Error reading existing text file: {e}")
-                    # Will fall back to extraction
-                    
-            # Extract text if we couldn't reuse existing
-            if not reused_text:
-                logging.debug(f"Going to extract {input_file} -> {output_path}")
-                    
-                text = self.manager.extract(
-                    input_file,
-                    output_path=None,  # We'll handle saving ourselves
-                    method=method,
-                    ocr_method=ocr_method,
-                    password=password,
-                    extract_tables=extract_tables,
-                    force_ocr=force_ocr, 
-                    **kwargs
-                )
+    def _sort_failed(self, input_file: str, error: str):
+        """Mark a file as failed in the manifest, unless it was deferred"""
+        if processing_manifest is not None and processing_manifest.state(input_file) != 'deferred':
+            manifest_record(input_file, 'failed', {'error': error})
 
-            
-            
-            if text:
-                result['text'] = text
-                result['success'] = True
-                counters['processed'] += 1
-                
-                # Only save the text to file if we extracted it (not if we reused existing)
-                if not reused_text:
-                    try:
-                        # Ensure the output directory exists
-                        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                        
-                        # Write the text file
-                        with open(output_path, 'w', encoding='utf-8') as f:
-                            f.write(text)
-                        result['output_path'] = output_path
-                        
-                        if self._debug:
-                            logging.info(f"Saved text to {output_path}")
-                        else:
-                            logging.debug(f"Saved text to {output_path}")
-                            
-                    except Exception as e:
-                        logging.error(f"Failed to write output file {output_path}: {e}")
-                        result['success'] = False
-                        result['error'] = str(e)
-                        counters['failed'] += 1
-                        return result
-                else:
-                    result['output_path'] = basic_output_path
-                
-                logging.debug(f"Working on {input_basename} => {output_path}: {sort}, {llm_provider}, {rename_script_path} ...")   
-                
-                # Handle sorting if enabled
-                try:
-                    # First, check what type of provider we have
-                    is_openai_client = False
-                    if llm_provider is None:
-                        # Fall back to local Ollama
-                        openai_client = get_openai_client()
-                        is_openai_client = True
-                        metadata_content = send_to_ollama_server(text, input_file, openai_client)
-                    else:
-                        # Use the provided LLM provider
-                        logging.debug(f"Sending to llm {llm_provider}.")
-                        metadata_content = send_to_llm(
-                            text=text, 
-                            filename=input_file, 
-                            provider=llm_provider
-                        )
-                    
-                    if metadata_content:
-                        # Parse metadata with improved parser
-                        metadata = parse_metadata(metadata_content)
-                        if metadata:
-                            # Process author names
-                            author = metadata['author']
-                            logging.debug(f"extracted author: {author}")
-                            
-                            # Use appropriate method for author name sorting
-                            if is_openai_client:
-                                corrected_author = sort_author_names(author, openai_client)
-                            else:
-                                corrected_author = corrected_author = sort_author_names(
-                                    author_names=author,
-                                    provider=llm_provider,
-                                    temperature=temperature,
-                                    max_tokens=max_tokens
-                                )
-                            
-                            logging.debug(f"corrected author: {corrected_author}")
-                            metadata['author'] = corrected_author
-                                
-                            # Get file details
-                            title = metadata['title']
-                            year = metadata.get('year', 'Unknown')
-                            
-                            # Validate and fix year with new helper function
-                            year = validate_and_fix_year(year, os.path.basename(input_file), text[:5000])
-                            
-                            # Get language if available
-                            language = metadata.get('language', 'en')
-                            
-                            # Validate essential metadata
-                            if not corrected_author or corrected_author == "UnknownAuthor" or not title:
-                                logging.warning(f"Missing author or title for {input_file}. Skipping rename.")
-                                with file_lock:
-                                    with open("unparseables.lst", "a") as unparseable_file:
-                                        unparseable_file.write(f"{input_file} - Missing metadata: Author='{corrected_author}', Title='{title}'\n")
-                                        unparseable_file.flush()
-                                counters['sort_failed'] += 1
-                            else:
-                                # Create target paths with sanitized names
-                                first_author = sanitize_filename(corrected_author)
-                                sanitized_title = sanitize_filename(title)
-                                # Simply use the author name as the target directory - add_rename_command will handle the full path
-                                target_dir = first_author  # Just the author name, not a full path
+    async def _sort_file_async(self, input_file: str, text: str, output_path: str,
+                rename_script_path: str, counters: Dict[str, int],
+                llm_provider: LLMProvider, temperature: float = 0.7,
+                max_tokens: int = 250,
+                embedded: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        _sort_file on the shared LLM event loop
+        
+        The metadata request is awaited on the loop; the rest of _sort_file
+        (author sorting, rename script) runs in a worker thread.
+        """
+        metadata_content = None
+        if not (embedded and embedded.get('trusted')):
+            try:
+                metadata_content = await send_to_llm_async(text, input_file, llm_provider)
+            except CircuitOpenError as e:
+                self._defer_sort(input_file, e)
+                return None
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+            self._sort_file, input_file, text, output_path, rename_script_path,
+            counters, llm_provider, temperature, max_tokens, embedded, metadata_content
+        ))
+
+    def _defer_sort(self, input_file: str, reason: Exception):
+        """Queue a file for the sorting-only pass of --sort-deferred"""
+        logging.warning(f"Deferring sorting of {input_file}: {reason}")
+        with file_lock:
+            with open(DEFERRED_SORT_LIST, "a", encoding="utf-8") as deferred_file:
+                deferred_file.write(f"{os.path.abspath(input_file)}\n")
+            self.deferred_sorts += 1
+        manifest_record(input_file, 'deferred', {'error': str(reason)})
 
-                                logging.debug(f"Outputting to {target_dir}.")
+    def _llm_metadata(self, input_file: str, text: str, counters: Dict[str, int],
+                llm_provider = None, temperature: float = 0.7,
+                max_tokens: int = 250,
+                metadata_content: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Ask the LLM for a file's metadata and put the author into 'Lastname Firstname' form
+        
+        Failures are logged to unparseables.lst and counted in counters['sort_failed'].
+        Files whose LLM endpoint is down are listed in DEFERRED_SORT_LIST instead.
+        
+        Args:
+            metadata_content: Response already fetched by the caller; None to ask here
+        
+        Returns:
+            Parsed metadata dict, or None
+        """
+        # First, check what type of provider we have
+        is_openai_client = llm_provider is None
+        if is_openai_client:
+            # Fall back to local Ollama
+            openai_client = get_openai_client()
+        
+        fetch = metadata_content is None
+        if fetch and self._metadata_batcher is not None:
+            metadata_content = self._metadata_batcher.submit(text, input_file)
+        
+        # Single request when not batching, or when the batch answer was unusable
+        if fetch and not metadata_content:
+            try:
+                if is_openai_client:
+                    metadata_content = send_to_ollama_server(text, input_file, openai_client)
+                else:
+                    # Use the provided LLM provider
+                    logging.debug(f"Sending to llm {llm_provider}.")
+                    metadata_content = send_to_llm(
+                        text=text, 
+                        filename=input_file, 
+                        provider=llm_provider
+                    )
+            except CircuitOpenError as e:
+                self._defer_sort(input_file, e)
+                return None
+        
+        if not metadata_content:
+            logging.warning(f"Failed to get metadata from Ollama server for {input_file}")
+            with file_lock:
+                with open("unparseables.lst", "a") as unparseable_file:
+                    unparseable_file.write(f"{input_file} - Failed to get metadata from Ollama server\n")
+                    unparseable_file.flush()
+            counters['sort_failed'] += 1
+            return None
+        
+        # Parse metadata with improved parser
+        metadata = parse_metadata(metadata_content)
+        if not metadata:
+            logging.warning(f"Failed to parse metadata for {input_file}")
+            with file_lock:
+                with open("unparseables.lst", "a") as unparseable_file:
+                    unparseable_file.write(f"{input_file} - Failed to parse metadata format: {metadata_content[:100]}...\n")
+                    unparseable_file.flush()
+            counters['sort_failed'] += 1
+            return None
+        
+        # Process author names
+        author = metadata['author']
+        logging.debug(f"extracted author: {author}")
+        
+        # Use appropriate method for author name sorting
+        if is_openai_client:
+            corrected_author = sort_author_names(author, openai_client)
+        else:
+            corrected_author = sort_author_names(
+                author_names=author,
+                provider=llm_provider,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        
+        logging.debug(f"corrected author: {corrected_author}")
+        metadata['author'] = corrected_author
+        return metadata
 
-                                file_extension = os.path.splitext(input_file)[1].lower()
-                                
-                                # Create filename with appropriate formatting
-                                # Handle non-English files with language code
-                                if language and language.lower() not in ['en', 'eng', 'english', 'unknown']:
-                                    # Extract just the base extension without dot
-                                    base_ext = file_extension[1:] if file_extension.startswith('.') else file_extension
-                                    # Add language code before extension
-                                    new_filename = f"{year} {sanitized_title}_{language}.{base_ext}"
-                                else:
-                                    new_filename = f"{year} {sanitized_title}.{file_extension}"
-                                
-                                logging.debug(f"New path/filename will be: {target_dir}/{new_filename}")
-                                
-                                # Add rename command with improved function
-                                add_rename_command(
-                                    rename_script_path,
-                                    source_path=input_file,
-                                    target_dir=target_dir,
-                                    new_filename=new_filename,
-                                    output_dir=os.path.dirname(output_path) if output_path else None
-                                )
-                                
-                                result['metadata'] = metadata
-                                counters['sorted'] += 1
-                        else:
-                            logging.warning(f"Failed to parse metadata for {input_file}")
-                            with file_lock:
-                                with open("unparseables.lst", "a") as unparseable_file:
-                                    unparseable_file.write(f"{input_file} - Failed to parse metadata format: {metadata_content[:100]}...\n")
-                                    unparseable_file.flush()
-                            counters['sort_failed'] += 1
-                    else:
-                        logging.warning(f"Failed to get metadata from Ollama server for {input_file}")
-                        with file_lock:
-                            with open("unparseables.lst", "a") as unparseable_file:
-                                unparseable_file.write(f"{input_file} - Failed to get metadata from Ollama server\n")
-                                unparseable_file.flush()
-                        counters['sort_failed'] += 1
-                except Exception as sort_e:
-                    logging.error(f"Error sorting file {input_file}: {sort_e}")
-                    with file_lock:
-                        with open("unparseables.lst", "a") as unparseable_file:
-                            unparseable_file.write(f"{input_file} - Error during sorting: {str(sort_e)}\n")
-                            unparseable_file.flush()
-                    counters['sort_failed'] += 1
-                
-                # Extract tables if requested (only for PDFs)
-                if extract_tables and input_file.lower().endswith('.pdf'):
-                    try:
-                        tables = self._table_extractor.extract_tables(input_file)
-                        result['tables'] = [table.df.to_dict() for table in tables]
-                        if self._debug:
-                            logging.info(f"Extracted {len(tables)} tables from {input_file}")
-                    except Exception as te:
-                        logging.error(f"Table extraction failed for {input_file}: {te}")
-                        result['tables'] = []
-                
-                # Extract file metadata
-                file_metadata = self._extract_metadata(input_file)
-                if file_metadata:
-                    result['metadata'].update(file_metadata)
-                    
-            else:
-                logging.error(f"Failed to extract text from {input_file}")
-                result['error'] = "No text extracted"
-                with file_lock:
-                    with open("unparseables.lst", "a") as unparseable_file:
-                        unparseable_file.write(f"{input_file} - No text extracted\n")
-                        unparseable_file.flush()
-                counters['failed'] += 1
-                
+    def _process_single_file(self, input_file: str,
+                output_dir: Optional[str] = None,
+                method: Optional[str] = None,
+                ocr_method: Optional[str] = None,
+                password: Optional[str] = None,
+                extract_tables: bool = False,
+                force_ocr: bool = False,
+                noskip: bool = False,
+                sort: bool = False,
+                rename_script_path: str = None,
+                counters: Dict[str, int] = None,
+                llm_provider = None,     
+                temperature: float = 0.7,
+                max_tokens: int = 250,
+                **kwargs) -> Dict[str, Any]:
+        """
+        Process a single document, with optimized skipping logic for sorting
+        
+        Runs all stages (plan, extract, write/sort) in the calling thread.
+        
+        Args:
+            input_file: Path to input file
+            output_dir: Optional output directory
+            method: Preferred extraction method
+            ocr_method: Optional OCR method
+            password: Password for encrypted documents
+            extract_tables: Whether to extract tables
+            noskip: Whether to process even if output exists
+            sort: Whether to sort files based on content
+            rename_script_path: Path to write rename commands
+            counters: Dictionary for tracking statistics
+            llm_provider: Provider for LLM communication
+            temperature: Temperature setting for LLM
+            max_tokens: Maximum tokens for LLM
+            **kwargs: Additional extraction options
+            
+        Returns:
+            Dict with processing results
+        """
+        logging.debug(f"Attempting processing of single file: {input_file} with {llm_provider}")
+        
+        try:
+            job, skipped = self._plan_file(
+                input_file, output_dir, method, ocr_method, password,
+                extract_tables, force_ocr, noskip, sort, rename_script_path, **kwargs
+            )
         except Exception as e:
             error_msg = f"Processing failed: {str(e)}"
             logging.error(error_msg)
-            result['error'] = error_msg
-            result['success'] = False
-            counters['failed'] += 1
-            
             with file_lock:
                 with open("unparseables.lst", "a") as unparseable_file:
                     unparseable_file.write(f"{input_file} - Processing error: {str(e)}\n")
                     unparseable_file.flush()
+            return {'success': False, 'text': '', 'tables': [], 'metadata': {},
+                    'input_file': input_file, 'skipped': False, 'error': error_msg}
         
-        return result
+        if skipped:
+            if counters is not None:
+                counters['skipped'] += 1
+            return skipped
+        
+        record = self._run_extraction_job(job)
+        return self._finish_file(
+            job, record, sort, rename_script_path, counters,
+            llm_provider, temperature, max_tokens
+        )
     
+
     def _extract_metadata(self, file_path: str) -> Dict[str, Any]:
         """Extract document metadata"""
         metadata = {}
@@ -7446,6 +10571,103 @@ class DocumentProcessor:
         return metadata
 
 
+# Per-process state for the process-pool extraction backend
+_worker_processor = None
+
+def _init_extraction_worker(debug: bool = False, log_level: int = logging.INFO,
+                            cache_dir: Optional[str] = None):
+    """Initializer for extraction worker processes"""
+    global _worker_processor, _page_splitting_disabled
+    # Workers already use the cores; nested page pools would oversubscribe them
+    _page_splitting_disabled = True
+    # Interrupts are handled by the parent, which stops submitting and drains the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=log_level, format='%(levelname)s: %(message)s')
+    _worker_processor = DocumentProcessor(debug=debug, cache_dir=cache_dir)
+
+def _run_extraction_worker(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one extraction job in a worker process"""
+    global _worker_processor
+    if _worker_processor is None:
+        _init_extraction_worker()
+    return _worker_processor._run_extraction_job(job)
+
+# Per-process state for page-range sharding of a single large PDF
+_page_worker_extractor = None
+
+# One page pool per process, shared by every large PDF extracted at the same
+# time, so that concurrent extractions cannot multiply the process count
+_page_pool = None
+_page_pool_workers = None
+_page_pool_lock = threading.Lock()
+# Set in extraction worker processes, which must not start pools of their own
+_page_splitting_disabled = False
+
+def configure_page_pool(workers: Optional[int] = None, reserved: int = 0):
+    """
+    Size the shared page pool
+    
+    Args:
+        workers: Requested number of page processes (default: all free cores)
+        reserved: Cores used by busy extraction workers; together with the page
+            processes they do not exceed the CPU count, except that the pool
+            keeps two processes on multi-core machines so that splitting stays
+            possible when every core runs an extraction thread
+    """
+    global _page_pool_workers
+    cpu_count = os.cpu_count() or 1
+    budget = max(min(2, cpu_count), cpu_count - reserved)
+    if workers and workers > budget:
+        logging.info(f"--page-workers {workers} capped at {budget}: {reserved} cores "
+                     f"are used by extraction workers")
+    with _page_pool_lock:
+        _page_pool_workers = min(workers or budget, budget)
+
+def page_pool_size() -> int:
+    """Number of processes of the shared page pool, 0 if page splitting is off"""
+    if _page_splitting_disabled:
+        return 0
+    return _page_pool_workers or (os.cpu_count() or 1)
+
+def get_page_pool(debug: bool = False, binary_paths: Optional[Dict[str, str]] = None):
+    """Return the shared page pool, starting it on first use"""
+    global _page_pool
+    from concurrent.futures import ProcessPoolExecutor
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(max_workers=page_pool_size(),
+                                             initializer=_init_page_worker,
+                                             initargs=(debug, binary_paths))
+        return _page_pool
+
+def shutdown_page_pool(wait: bool = True):
+    """Stop the shared page pool; the next large PDF starts a new one"""
+    global _page_pool
+    with _page_pool_lock:
+        pool, _page_pool = _page_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+def _init_page_worker(debug: bool = False, binary_paths: Optional[Dict[str, str]] = None):
+    """Initializer for page-range worker processes"""
+    global _page_worker_extractor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _page_worker_extractor = PDFExtractor(debug=False, binary_paths=binary_paths)
+
+def _extract_pdf_page_range(method: str, pdf_path: str, password: Optional[str],
+                            start: int, end: int) -> str:
+    """Extract pages [start, end) of a PDF with a page-wise method in a worker process"""
+    global _page_worker_extractor
+    if _page_worker_extractor is None:
+        _init_page_worker()
+    extractor = _page_worker_extractor
+    extractor.set_password(password)
+    try:
+        return getattr(extractor, f'extract_with_{method}')(pdf_path, None, page_range=(start, end))
+    finally:
+        extractor.set_password(None)
+
+
 # Signal handler to set the shutdown flag
 # Keep the global signal handler for setting the shutdown_flag
 # Keep track of any OCR subprocesses
@@ -7604,6 +10826,65 @@ def is_file_in_rename_script(rename_script_path, input_file):
     
     # If we get here, the file isn't in any script
     return False
+
+def import_rename_script(rename_script_path) -> int:
+    """
+    Record the commands of an existing bash rename script in the manifest
+    
+    Scripts are rewritten at the start of every sorting run, so without this
+    the files sorted by a run before the manifest existed would be sent to the
+    LLM again. Each 'mv' of a document, with the text file move in the 'if'
+    block after it, becomes a 'sorted' entry that later runs replay. Files the
+    manifest already knows are left alone.
+    
+    Returns:
+        int: Number of files imported
+    """
+    import shlex
+    
+    if processing_manifest is None or not os.path.exists(rename_script_path) \
+            or os.path.splitext(rename_script_path)[1].lower() not in ('', '.sh'):
+        return 0
+    commands = []
+    try:
+        with open(rename_script_path, 'r') as script_file:
+            for line in script_file:
+                try:
+                    words = shlex.split(line)
+                except ValueError:
+                    continue
+                if len(words) != 3 or words[0] != 'mv':
+                    continue
+                if line.startswith('mv '):
+                    commands.append([words[1:]])
+                elif commands:
+                    # Indented: the text file of the document moved before it
+                    commands[-1].append(words[1:])
+    except OSError as e:
+        logging.warning(f"Could not read rename script {rename_script_path}: {e}")
+        return 0
+    
+    imported = 0
+    for moves in commands:
+        source, target = moves[0]
+        if processing_manifest.state(source) is not None:
+            continue
+        target_dir = os.path.dirname(target)
+        try:
+            # Not emitted: the truncated script gets the command again when the file is planned
+            processing_manifest.record(source, 'sorted', {
+                'rename': {'target_dir': os.path.basename(target_dir),
+                           'new_filename': os.path.splitext(os.path.basename(target))[0],
+                           'output_dir': os.path.dirname(target_dir)},
+                'moves': [[source, target, False]] + [[src, dst, True] for src, dst in moves[1:]]
+            }, emitted=False)
+        except sqlite3.Error as e:
+            logging.warning(f"Could not import rename command of {source}: {e}")
+            continue
+        imported += 1
+    if imported:
+        logging.info(f"Imported {imported} rename commands of an earlier run from {rename_script_path}")
+    return imported
     
 def sanitize_filename(name):
     """Sanitize a filename to ensure safe filesystem operations"""
@@ -7779,22 +11060,265 @@ def execute_rename_commands(script_path):
     except Exception as e:
         logging.error(f"Unexpected error during rename command execution: {e}")
 
+class RenameExecutor:
+    """
+    Applies the planned renames in-process, with a write-ahead journal
+    
+    Moves are grouped by target directory. Each group gets one os.makedirs,
+    then its intents are appended to the journal and fsynced together before
+    the os.replace calls, and their completion is logged after. Every entry
+    carries the id of its execute() run, and runs append to the same journal.
+    After a crash recover() settles the interrupted group by looking at the
+    file system. undo() moves the most recent run not yet undone back, newest
+    move first, and removes the directories that run created if they are
+    empty; calling it again undoes the run before that.
+    """
+    
+    def __init__(self, journal_path: str):
+        """
+        Args:
+            journal_path: Journal file (JSON lines), shared by all runs
+        """
+        self.journal_path = journal_path
+        self.moved = 0
+        self.skipped = 0
+        self.failed = 0
+    
+    @staticmethod
+    def _append(journal, entries: List[Dict[str, Any]]):
+        for entry in entries:
+            journal.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        journal.flush()
+        os.fsync(journal.fileno())
+    
+    def read_journal(self) -> List[Dict[str, Any]]:
+        """Journal entries; a torn last line from a crash is ignored"""
+        entries = []
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as journal:
+                for line in journal:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+    
+    def _drop_torn_tail(self):
+        """Cut a line a crash left half-written, so appended entries start on their own line"""
+        try:
+            with open(self.journal_path, 'rb+') as journal:
+                data = journal.read()
+                if data and not data.endswith(b'\n'):
+                    journal.truncate(data.rfind(b'\n') + 1)
+        except FileNotFoundError:
+            pass
+    
+    @staticmethod
+    def _move(source: str, target: str):
+        try:
+            os.replace(source, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Across file systems os.replace cannot rename; copy and delete
+            shutil.move(source, target)
+    
+    def execute(self, plan: Iterable[Tuple[str, List[List[Any]]]]) -> Dict[str, List[List[str]]]:
+        """
+        Apply the moves of plan
+        
+        Args:
+            plan: (input file, moves) pairs; each move is [source, target, optional].
+                Optional moves (the text files) are skipped when their source is missing.
+                Existing targets are never overwritten.
+            
+        Returns:
+            Dict of input file to the [source, target] moves done for it
+        """
+        self.recover()
+        groups = collections.defaultdict(list)
+        for input_file, moves in plan:
+            for source, target, optional in moves:
+                groups[os.path.dirname(target)].append((input_file, source, target, optional))
+        
+        run = uuid.uuid4().hex
+        done = collections.defaultdict(list)
+        journal = None
+        try:
+            for directory, moves in groups.items():
+                if shutdown_flag.is_set():
+                    break
+                ready = []
+                for input_file, source, target, optional in moves:
+                    if not os.path.exists(source):
+                        if not optional:
+                            logging.warning(f"Cannot rename {source}: file not found")
+                            self.failed += 1
+                        continue
+                    if os.path.exists(target):
+                        logging.warning(f"Not renaming {source}: {target} already exists")
+                        self.skipped += 1
+                        continue
+                    ready.append((input_file, source, target))
+                if not ready:
+                    continue
+                
+                if journal is None:
+                    # Opened on the first move, so a run with nothing to do leaves no trace
+                    journal = open(self.journal_path, 'a', encoding='utf-8')
+                    self._append(journal, [{'op': 'run', 'run': run, 'started': time.time()}])
+                intents = [] if os.path.isdir(directory) else [{'op': 'mkdir', 'run': run, 'path': directory}]
+                intents += [{'op': 'move', 'run': run, 'input': input_file, 'src': source, 'dst': target}
+                            for input_file, source, target in ready]
+                self._append(journal, intents)
+                
+                completed = []
+                try:
+                    os.makedirs(directory, exist_ok=True)
+                except OSError as e:
+                    logging.error(f"Cannot create {directory}: {e}")
+                    self.failed += len(ready)
+                    continue
+                for input_file, source, target in ready:
+                    try:
+                        self._move(source, target)
+                    except OSError as e:
+                        logging.error(f"Failed to rename {source} to {target}: {e}")
+                        self.failed += 1
+                        continue
+                    completed.append({'op': 'done', 'run': run, 'src': source, 'dst': target})
+                    done[input_file].append([source, target])
+                    self.moved += 1
+                self._append(journal, completed)
+        finally:
+            if journal is not None:
+                journal.close()
+        
+        self._mark_renamed(done)
+        return done
+    
+    def recover(self) -> int:
+        """
+        Settle moves an interrupted execute() left without a completion entry
+        
+        A move whose target exists and whose source is gone did happen; it gets
+        its completion entry and its input is marked renamed in the manifest.
+        
+        Returns:
+            Number of moves found completed
+        """
+        self._drop_torn_tail()
+        entries = self.read_journal()
+        finished = {(e['src'], e['dst']) for e in entries if e['op'] == 'done'}
+        recovered = [e for e in entries if e['op'] == 'move' and (e['src'], e['dst']) not in finished
+                     and os.path.exists(e['dst']) and not os.path.exists(e['src'])]
+        if not recovered:
+            return 0
+        with open(self.journal_path, 'a', encoding='utf-8') as journal:
+            self._append(journal, [{'op': 'done', 'run': e.get('run'), 'src': e['src'], 'dst': e['dst']}
+                                   for e in recovered])
+        done = collections.defaultdict(list)
+        for entry in recovered:
+            done[entry['input']].append([entry['src'], entry['dst']])
+        self._mark_renamed(done)
+        logging.info(f"Recovered {len(recovered)} renames of an interrupted run from {self.journal_path}")
+        return len(recovered)
+    
+    def undo(self) -> int:
+        """
+        Move back the most recent run with moves that is not undone yet, newest first
+        
+        Returns:
+            Number of moves undone
+        """
+        self.recover()
+        entries = self.read_journal()
+        undone_runs = {e.get('run') for e in entries if e['op'] == 'undone'}
+        runs = [e.get('run') for e in entries if e['op'] == 'done' and e.get('run') not in undone_runs]
+        if not runs:
+            logging.info(f"Nothing left to undo in {self.journal_path}")
+            return 0
+        run = runs[-1]
+        entries = [e for e in entries if e.get('run') == run]
+        inputs = {(e['src'], e['dst']): e['input'] for e in entries if e['op'] == 'move'}
+        undone = 0
+        restored = set()
+        for entry in reversed(entries):
+            if entry['op'] == 'done':
+                source, target = entry['src'], entry['dst']
+                if not os.path.exists(target) or os.path.exists(source):
+                    logging.warning(f"Cannot undo rename of {source}: {target} missing or {source} taken")
+                    continue
+                try:
+                    os.makedirs(os.path.dirname(source), exist_ok=True)
+                    self._move(target, source)
+                except OSError as e:
+                    logging.error(f"Failed to undo rename of {source}: {e}")
+                    continue
+                undone += 1
+                restored.add(inputs.get((source, target)))
+            elif entry['op'] == 'mkdir':
+                try:
+                    os.rmdir(entry['path'])
+                except OSError:
+                    pass  # Not empty or already gone
+        
+        if processing_manifest is not None:
+            for input_file in restored - {None}:
+                state, detail = processing_manifest.get(input_file)
+                if state == 'renamed' and detail and 'rename' in detail:
+                    manifest_record(input_file, 'sorted', {k: v for k, v in detail.items() if k != 'done'})
+        with open(self.journal_path, 'a', encoding='utf-8') as journal:
+            self._append(journal, [{'op': 'undone', 'run': run, 'at': time.time()}])
+        return undone
+    
+    @staticmethod
+    def _mark_renamed(done: Dict[str, List[List[str]]]):
+        if processing_manifest is None:
+            return
+        for input_file, moves in done.items():
+            detail = dict(processing_manifest.get(input_file)[1] or {})
+            detail['done'] = moves
+            manifest_record(input_file, 'renamed', detail)
+
+def rename_journal_path(rename_script_path: str) -> str:
+    """Journal of RenameExecutor runs for a rename script"""
+    return os.path.splitext(rename_script_path)[0] + '.journal'
+
+def execute_planned_renames(rename_script_path: str):
+    """Apply the renames sorted during this run in-process (see RenameExecutor)"""
+    executor = RenameExecutor(rename_journal_path(rename_script_path))
+    plan = [(path, detail['moves'])
+            for path, detail in processing_manifest.entries('sorted', emitted_only=True)
+            if detail and detail.get('moves')]
+    done = executor.execute(plan)
+    logging.info(f"Renamed {len(done)} files ({executor.moved} moves, {executor.skipped} targets "
+                 f"already existing, {executor.failed} failed); undo with --undo-rename")
+
 def parse_metadata(content, verbose=False):
     """
     Parse metadata content returned by the Ollama server supporting multiple formats.
     Properly handles author names with commas.
     
+    JSON answers from structured output modes go to the strict parse_metadata_json.
+    
     Returns:
         dict or None: Dictionary containing author, year, title, and language
     """
     logging.debug("parsing metadata...")
     
+    if content.lstrip().startswith(('{', '```')):
+        return parse_metadata_json(content)
+    
     # Remove XML declarations which might interfere with parsing
     content = re.sub(r'<\?xml[^>]+\?>', '', content)
     
-    # Fix common tag issues
-    content = content.replace("<TITLE", "<TITLE>").replace("<AUTHOR", "<AUTHOR>")
-    content = content.replace("<YEAR", "<YEAR>").replace("<LANGUAGE", "<LANGUAGE>")
+    # Fix common tag issues: complete opening tags missing their '>' ("<TITLE The Book").
+    # Well-formed tags are left alone; a plain replace would turn "<YEAR>1999" into
+    # "<YEAR>>1999", which the year pattern no longer matches
+    content = re.sub(r'<(TITLE|AUTHOR|YEAR|LANGUAGE)(?![>\w])', r'<\1>', content)
     
     # Try multiple tag formats for each field
     title_patterns = [
@@ -7858,6 +11382,48 @@ def parse_metadata(content, verbose=False):
             if language:
                 break
     
+    return _clean_metadata_fields(title, author, year, language)
+
+def parse_metadata_json(content):
+    """
+    Strictly parse a JSON metadata answer from a structured output mode
+    
+    Expects one object with string fields title, author, year and language
+    (year may also be a number or null); a Markdown code fence around it is the
+    only tolerated deviation. There is no guessing: anything else is rejected.
+    
+    Returns:
+        dict or None: Dictionary containing author, year, title, and language
+    """
+    content = content.strip()
+    fence = re.fullmatch(r'```(?:json)?\s*(.*?)\s*```', content, re.DOTALL | re.IGNORECASE)
+    if fence:
+        content = fence.group(1)
+    try:
+        data = json.loads(content)
+    except ValueError as e:
+        logging.warning(f"Invalid JSON metadata: {e}")
+        return None
+    if not isinstance(data, dict):
+        logging.warning("JSON metadata is not an object")
+        return None
+    
+    fields = {}
+    for key in ('title', 'author', 'year', 'language'):
+        value = data.get(key, data.get(key.upper()))
+        if isinstance(value, int) and not isinstance(value, bool) and key == 'year':
+            value = str(value)
+        if value is not None and not isinstance(value, str):
+            logging.warning(f"JSON metadata field {key} is not a string: {value!r}")
+            return None
+        fields[key] = value.strip() if value else None
+    
+    year = fields['year'] if fields['year'] and re.fullmatch(r'\d{4}', fields['year']) else "Unknown"
+    language = (fields['language'] or "en").lower()
+    return _clean_metadata_fields(fields['title'], fields['author'], year, language)
+
+def _clean_metadata_fields(title, author, year, language):
+    """Shared validation and cleanup of parsed metadata fields"""
     # Don't split on commas in author names - they're likely "Lastname, Firstname" format
     # Instead, handle multiple authors separated by semicolons
     if author and ';' in author:
@@ -7904,13 +11470,17 @@ def send_to_ollama_server(text, filename, openai_client, max_attempts=5, verbose
     
     Returns:
         str: The formatted metadata response
+        
+    Raises:
+        CircuitOpenError: The Ollama server is down; no retries are made
     """
     logging.debug("preparing sending to ollama...")
     base_retry_wait = 2  # Base wait time in seconds
     attempt = 1
+    sample = sample_metadata_text(text)
     
     # Prepare different prompt templates to try if earlier ones fail
-    prompt_templates = [
+    tag_templates = [
         # First attempt - simple structured format
         (
             f"Extract the main author name (Lastname Surname), "
@@ -7935,6 +11505,8 @@ def send_to_ollama_server(text, filename, openai_client, max_attempts=5, verbose
             f"<TITLE>The title</TITLE>\n<YEAR>2023</YEAR>\n<AUTHOR>Smith John</AUTHOR>\n<LANGUAGE>en</LANGUAGE>\n\n"
         )
     ]
+    response_format = metadata_response_format(openai_client)
+    prompt_templates = metadata_prompt_templates(filename, True) if response_format else tag_templates
     
     # Try different prompt templates if we encounter format issues
     while attempt <= max_attempts and not shutdown_flag.is_set():
@@ -7945,55 +11517,64 @@ def send_to_ollama_server(text, filename, openai_client, max_attempts=5, verbose
         logging.debug(f"Consulting Ollama server on file: {filename} (Attempt: {attempt}, Template: {template_index + 1})")
         
         # Build the final prompt with text sample
-        prompt = prompt_template + f"Here is the document text:\n{text[:3000]}"  # Limit text to avoid token limits
+        prompt = prompt_template + f"Here is the document text:\n{sample}"
         messages = [{"role": "user", "content": prompt}]
         
-        with ollama_semaphore:
-            try:
-                response = openai_client.chat.completions.create(
-                    model=MODEL_NAME,
-                    temperature=0.5,  # Reduced temperature for more consistent formatting
-                    max_tokens=250,
-                    messages=messages,
-                    timeout=120  # 2 minute timeout
-                )
-                
-                output = response.choices[0].message.content.strip()
-                logging.debug(f"Metadata content received from server: {output}")
-                
-                # Use the new more flexible parser
-                metadata = parse_metadata(output, verbose=verbose)
-                if metadata:
-                    return output
-                else:
-                    logging.warning(f"Unexpected response format from Ollama server: {output}")
-                    # Less aggressive backoff for format issues - might not be server's fault
-                    if attempt < max_attempts:
-                        wait_time = base_retry_wait * (1.5 ** (attempt - 1))  # Gentler exponential backoff
-                        logging.info(f"Retrying with different prompt in {wait_time:.2f} seconds...")
-                        time.sleep(wait_time)
-                        attempt += 1
-                        continue
-                    return output
-                
-            except Exception as e:
-                if "rate_limit" in str(e).lower() or "timeout" in str(e).lower():
-                    # Use exponential backoff for rate limiting/timeouts
-                    wait_time = base_retry_wait * (2 ** (attempt - 1))  # Exponential backoff
-                    logging.info(f"Rate limit or timeout encountered. Retrying in {wait_time:.2f} seconds...")
+        try:
+            output = llm_chat_completion(
+                openai_client,
+                messages,
+                temperature=0.5,  # Reduced temperature for more consistent formatting
+                max_tokens=250,
+                timeout=120,  # 2 minute timeout
+                validate=lambda content: bool(parse_metadata(content)),
+                response_format=response_format
+            )
+            logging.debug(f"Metadata content received from server: {output}")
+            
+            # Use the new more flexible parser
+            metadata = parse_metadata(output, verbose=verbose)
+            if metadata:
+                return output
+            else:
+                logging.warning(f"Unexpected response format from Ollama server: {output}")
+                # Less aggressive backoff for format issues - might not be server's fault
+                if attempt < max_attempts:
+                    wait_time = base_retry_wait * (1.5 ** (attempt - 1))  # Gentler exponential backoff
+                    logging.info(f"Retrying with different prompt in {wait_time:.2f} seconds...")
                     time.sleep(wait_time)
                     attempt += 1
                     continue
-                else:
-                    logging.error(f"Error communicating with Ollama server for {filename}: {e}")
-                    if attempt < max_attempts:
-                        wait_time = base_retry_wait * (1.5 ** (attempt - 1))  # Gentler exponential backoff
-                        logging.info(f"Retrying in {wait_time:.2f} seconds...")
-                        time.sleep(wait_time)
-                        attempt += 1
-                        continue
-                return ""
-                
+                return output
+            
+        except CircuitOpenError:
+            # The endpoint is down; retrying only stalls this file
+            raise
+        except Exception as e:
+            if is_transient_llm_error(e):
+                # Use exponential backoff for rate limiting/timeouts
+                wait_time = base_retry_wait * (2 ** (attempt - 1))  # Exponential backoff
+                logging.info(f"Rate limit or timeout encountered. Retrying in {wait_time:.2f} seconds...")
+                time.sleep(wait_time)
+                attempt += 1
+                continue
+            elif response_format is not None:
+                # Model or server without structured output; use the tag format
+                logging.warning(f"Structured output request failed for {filename}, falling back to tags: {e}")
+                response_format = None
+                prompt_templates = tag_templates
+                attempt += 1
+                continue
+            else:
+                logging.error(f"Error communicating with Ollama server for {filename}: {e}")
+                if attempt < max_attempts:
+                    wait_time = base_retry_wait * (1.5 ** (attempt - 1))  # Gentler exponential backoff
+                    logging.info(f"Retrying in {wait_time:.2f} seconds...")
+                    time.sleep(wait_time)
+                    attempt += 1
+                    continue
+            return ""
+            
     logging.error(f"Maximum retry attempts reached for sending to Ollama server.")
     return ""
 
@@ -8013,6 +11594,8 @@ def initialize_rename_scripts(rename_script_path):
     
     # Initialize bash script
     if create_bash:
+        # Keep the commands of an earlier run without a manifest before truncating
+        import_rename_script(rename_script_path)
         with open(rename_script_path, "w") as bash_file:
             bash_file.write("#!/bin/bash\n")
             #bash_file.write('set -e\n\n')
@@ -8037,67 +11620,92 @@ def initialize_rename_scripts(rename_script_path):
         'batch_script': batch_script_path if create_batch else None
     }
 
-def sort_author_names(author_names, provider, temperature: float = 0.3, 
-                    max_tokens: int = 100, max_attempts: int = 5, 
-                    verbose: bool = False):
+def canonical_author_name(author_names: str) -> Tuple[str, bool]:
     """
-    Format author names into 'Lastname Firstname' format using LLM with backoff.
+    Rule-based 'Lastname Firstname' form of an author name from LLM metadata
     
-    Args:
-        author_names: Author names to format
-        provider: LLM provider instance or OpenAI client
-        temperature: Temperature setting for generation
-        max_tokens: Maximum tokens to generate
-        max_attempts: Maximum retry attempts
-        verbose: Whether to print debug info
-    """
-    if provider is None or isinstance(provider, (int, float)):
-        logging.warning(f"Invalid provider passed to sort_author_names: {provider}")
-        return author_names
+    The metadata prompt already asks for 'Lastname Firstname', so plain
+    multi-word names are kept in their order. "Lastname, Firstname" only loses
+    its commas, as it always has, so suffixes like "Jr." and the folder names of
+    existing libraries stay as they were. Leading initials ("J. R. R. Tolkien")
+    and a surname particle after the given name ("Vincent van Gogh") are
+    rearranged with reorder_author_name. A single word cannot be placed by rules.
     
+    Returns:
+        (name, settled): settled is False when only the LLM can decide
+    """
     if not author_names or author_names.strip() in ["Unknown", "UnknownAuthor", "n a", ""]:
-        return "UnknownAuthor"
+        return "UnknownAuthor", True
     
     # First clean the input and handle commas properly
     author_names = author_names.replace('</AUTHOR>', '').replace('<AUTHOR>', '')
     
     # Check for comma format (likely "Lastname, Firstname")
     if ',' in author_names:
-        # This is already likely in "Lastname, Firstname" format
         # Just remove the comma to get "Lastname Firstname"
-        formatted_name = author_names.replace(',', ' ').strip()
-        # Clean up extra spaces
-        formatted_name = re.sub(r'\s+', ' ', formatted_name)
-        
-        # Validate the name has at least two parts
+        formatted_name = re.sub(r'\s+', ' ', author_names.replace(',', ' ')).strip()
         if ' ' in formatted_name:
             logging.debug(f"Processed comma-formatted name: {author_names} -> {formatted_name}")
-            return formatted_name
+            return formatted_name, True
     
     # Remove placeholder text that might appear in responses
     formatted_author_names = re.sub(r'\b(Lastname|Firstname|Surname)\b', '', author_names, flags=re.IGNORECASE)
     formatted_author_names = re.sub(r'\s+', ' ', formatted_author_names).strip()
     
     # Handle multiple authors separated by different delimiters (but not commas)
-    if any(delimiter in formatted_author_names for delimiter in [';', '&', ' and ']):
-        # Split on these delimiters and keep only the first author
-        for delimiter in [';', '&', ' and ']:
-            if delimiter in formatted_author_names:
-                formatted_author_names = formatted_author_names.split(delimiter)[0].strip()
-                break
+    for delimiter in [';', '&', ' and ']:
+        if delimiter in formatted_author_names:
+            formatted_author_names = formatted_author_names.split(delimiter)[0].strip()
+            break
+    formatted_author_names = re.sub(r'\s+', ' ', formatted_author_names).strip()
+    
+    # If after cleaning we have nothing, return unknown
+    if len(formatted_author_names) < 3:
+        return "UnknownAuthor", True
+    
+    parts = formatted_author_names.split()
+    if len(parts) < 2:
+        return formatted_author_names, False
+    
+    # Given names first: initials before the surname, or a particle after a given name
+    leading_initials = all(re.fullmatch(r'(\w\.)+|\w', part) for part in parts[:-1])
+    inner_particle = len(parts) >= 3 and parts[0].lower() not in _NAME_PARTICLES \
+        and parts[-1].lower() not in _NAME_PARTICLES \
+        and any(part in _NAME_PARTICLES for part in parts[1:-1])
+    if leading_initials or inner_particle:
+        return reorder_author_name(formatted_author_names), True
+    return formatted_author_names, True
+
+def sort_author_names(author_names, provider, temperature: float = 0.3, 
+                    max_tokens: int = 100, max_attempts: int = 5, 
+                    verbose: bool = False):
+    """
+    Format author names into 'Lastname Firstname' format using LLM with backoff.
+    
+    Results are memoized in author_name_memo; canonical_author_name settles the
+    common shapes, so the LLM only sees new names it cannot order (single words).
     
-    # If after cleaning we have nothing, return unknown
-    if not formatted_author_names or len(formatted_author_names.strip()) < 3:
-        return "UnknownAuthor"
+    Args:
+        author_names: Author names to format
+        provider: LLM provider instance or OpenAI client
+        temperature: Temperature setting for generation
+        max_tokens: Maximum tokens to generate
+        max_attempts: Maximum retry attempts
+        verbose: Whether to print debug info
+    """
+    if provider is None or isinstance(provider, (int, float)):
+        logging.warning(f"Invalid provider passed to sort_author_names: {provider}")
+        return author_names
     
-    # Check if name is already in "Lastname Firstname" format after basic processing
-    parts = formatted_author_names.split()
-    if len(parts) >= 2:
-        # We have at least two parts, might be good enough
-        return formatted_author_names
+    raw_name = (author_names or "").strip()
+    memoized = author_name_memo.get(raw_name)
+    if memoized is not None:
+        return memoized
     
-    # Determine if we're using OpenAI client for Ollama or an LLM provider
-    is_openai_client = hasattr(provider, 'chat') and hasattr(provider.chat, 'completions')
+    formatted_author_names, settled = canonical_author_name(raw_name)
+    if settled:
+        author_name_memo.put(raw_name, formatted_author_names)
+        return formatted_author_names
     
     # Use LLM to get the correct format with retries
     base_retry_wait = 2  # Base wait time in seconds
@@ -8130,74 +11738,67 @@ def sort_author_names(author_names, provider, temperature: float = 0.3,
             
         messages = [{"role": "user", "content": prompt}]
         
-        # Use the semaphore to limit concurrent requests
-        with llm_semaphore:
-            try:
-                if not hasattr(provider, 'chat_completion'):
-                    logging.warning(f"Provider {provider} missing chat_completion method")
-                    return author_names
-                
-                if is_openai_client:
-                    # Using OpenAI client for Ollama
-                    response = provider.chat.completions.create(
-                        model=MODEL_NAME,
-                        temperature=temperature,
-                        max_tokens=max_tokens,
-                        messages=messages
-                    )
-                    reformatted_name = response.choices[0].message.content.strip()
-                else:
-                    # Using an LLM provider instance
-                    response = provider.chat_completion(
-                        messages=messages,
-                        temperature=temperature,
-                        max_tokens=max_tokens
-                    )
-                    reformatted_name = response["content"]
-                
-                # Check for tag issues and fix them
-                if "<AUTHOR>" not in reformatted_name:
-                    reformatted_name = f"<AUTHOR>{reformatted_name}</AUTHOR>"
-                if "</AUTHOR>" not in reformatted_name and not reformatted_name.endswith("</AUTHOR>"):
-                    reformatted_name = reformatted_name.replace("<AUTHOR>", "<AUTHOR>") + "</AUTHOR>"
-                
-                name_match = re.search(r'<AUTHOR>(.*?)</AUTHOR>', reformatted_name)
-                if name_match:
-                    ordered_name = name_match.group(1).strip()
-                    # Final cleanup - remove any placeholder text that might appear
-                    ordered_name = re.sub(r'\b(Lastname|Firstname|Surname)\b', '', ordered_name, flags=re.IGNORECASE)
-                    ordered_name = clean_author_name(ordered_name)
-                    logging.debug(f"Ordered name after cleaning: '{ordered_name}'")
-                    
-                    # Return it even if it's a single word - we won't add "Unknown"
+        try:
+            if not hasattr(provider, 'chat_completion') and not hasattr(provider, 'chat'):
+                logging.warning(f"Provider {provider} missing chat_completion method")
+                return author_names
+            
+            # Works with both LLMProvider instances and the OpenAI client for Ollama
+            reformatted_name = llm_chat_completion(
+                provider,
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            
+            # Check for tag issues and fix them
+            if "<AUTHOR>" not in reformatted_name:
+                reformatted_name = f"<AUTHOR>{reformatted_name}</AUTHOR>"
+            if "</AUTHOR>" not in reformatted_name and not reformatted_name.endswith("</AUTHOR>"):
+                reformatted_name = reformatted_name.replace("<AUTHOR>", "<AUTHOR>") + "</AUTHOR>"
+            
+            name_match = re.search(r'<AUTHOR>(.*?)</AUTHOR>', reformatted_name)
+            if name_match:
+                ordered_name = name_match.group(1).strip()
+                # Final cleanup - remove any placeholder text that might appear
+                ordered_name = re.sub(r'\b(Lastname|Firstname|Surname)\b', '', ordered_name, flags=re.IGNORECASE)
+                ordered_name = clean_author_name(ordered_name)
+                logging.debug(f"Ordered name after cleaning: '{ordered_name}'")
+                
+                # Return it even if it's a single word - we won't add "Unknown"
+                if ordered_name and len(ordered_name) >= 2:
+                    author_name_memo.put(raw_name, ordered_name, persist=True)
+                    return ordered_name
+            else:
+                # Try to extract the name without tags if tags are malformed
+                cleaned_response = reformatted_name.replace("</AUTHOR>", "").replace("<AUTHOR>", "").strip()
+                if cleaned_response and cleaned_response not in ['Lastname Firstname', 'Unknown']:
+                    ordered_name = clean_author_name(cleaned_response)
                     if ordered_name and len(ordered_name) >= 2:
+                        author_name_memo.put(raw_name, ordered_name, persist=True)
                         return ordered_name
-                else:
-                    # Try to extract the name without tags if tags are malformed
-                    cleaned_response = reformatted_name.replace("</AUTHOR>", "").replace("<AUTHOR>", "").strip()
-                    if cleaned_response and cleaned_response not in ['Lastname Firstname', 'Unknown']:
-                        ordered_name = clean_author_name(cleaned_response)
-                        if ordered_name and len(ordered_name) >= 2:
-                            return ordered_name
-                            
-                    logging.warning(f"Failed to extract a valid name from: '{reformatted_name}', retrying...")
-                
-            except Exception as e:
-                if "rate_limit" in str(e).lower() or "timeout" in str(e).lower():
-                    wait_time = base_retry_wait * (2 ** (attempt - 1))
-                    logging.info(f"Rate limit or timeout encountered. Retrying in {wait_time:.2f} seconds...")
-                else:
-                    logging.error(f"Error querying LLM for author names: {e}")
-                    wait_time = base_retry_wait * (1.5 ** (attempt - 1))
-                    logging.info(f"Retrying in {wait_time:.2f} seconds...")
-                
-                if attempt < max_attempts:
-                    time.sleep(wait_time)
-                    continue
-                
-                # Last resort - just return the original name, even if it's a single word
-                return formatted_author_names
-        
+                        
+                logging.warning(f"Failed to extract a valid name from: '{reformatted_name}', retrying...")
+            
+        except CircuitOpenError:
+            # The endpoint is down; keep the name as it is
+            return formatted_author_names
+        except Exception as e:
+            if is_transient_llm_error(e):
+                wait_time = base_retry_wait * (2 ** (attempt - 1))
+                logging.info(f"Rate limit or timeout encountered. Retrying in {wait_time:.2f} seconds...")
+            else:
+                logging.error(f"Error querying LLM for author names: {e}")
+                wait_time = base_retry_wait * (1.5 ** (attempt - 1))
+                logging.info(f"Retrying in {wait_time:.2f} seconds...")
+            
+            if attempt < max_attempts:
+                time.sleep(wait_time)
+                continue
+            
+            # Last resort - just return the original name, even if it's a single word
+            return formatted_author_names
+    
         # Wait a little between attempts even if no error occurred
         if attempt < max_attempts:
             time.sleep(1)  # Small pause between attempts
@@ -8252,6 +11853,369 @@ def extract_year_from_filename(filename):
     
     return None
 
+# Embedded metadata resolution (runs before the LLM when sorting)
+
+# Prior confidence of each metadata source. PDF Info fields are often filled in
+# by authoring software ("Microsoft Word - draft.doc", "Administrator"), and a
+# PDF CreationDate is usually the scan or conversion date, not the publication year.
+METADATA_SOURCE_CONFIDENCE = {
+    'opf': 0.85,       # EPUB package document (Dublin Core)
+    'exth': 0.85,      # MOBI/AZW EXTH header
+    'xmp': 0.75,       # PDF XMP packet (Dublin Core)
+    'pdfinfo': 0.6,    # PDF Info dictionary
+    'pdfdate': 0.3,    # PDF CreationDate
+    'filename': 0.5,   # Year in the filename
+}
+# Confidence added (noisy-OR) when a value also appears in the first pages of text
+METADATA_TEXT_EVIDENCE = {'title': 0.5, 'author': 0.5, 'year': 0.4}
+# Title, author and year must all reach this to skip the LLM
+METADATA_TRUST_THRESHOLD = 0.7
+
+_JUNK_TITLE_PATTERN = re.compile(
+    r'^(untitled|unknown|title|document\d*|layout \d+|microsoft word\b.*|\W*)$'
+    r'|\.(docx?|pdf|indd|qxd|qxp|tex|dvi|rtf|odt|ps|p65|pm\d)\b',
+    re.IGNORECASE
+)
+_JUNK_AUTHOR_WORDS = {'admin', 'administrator', 'user', 'owner', 'unknown', 'adobe', 'microsoft',
+                      'scanner', 'calibre', 'acrobat', 'distiller', 'pdf', 'publisher', 'editor'}
+_NAME_PARTICLES = {'van', 'von', 'de', 'der', 'den', 'del', 'della', 'di', 'da', 'du',
+                   'la', 'le', 'ten', 'ter', 'dos', 'das', 'zu', 'af', 'av'}
+
+def reorder_author_name(name):
+    """
+    Put a single author name into 'Lastname Firstname' form without an LLM.
+    
+    Handles "Lastname, Firstname", "Firstname Lastname" and surname particles
+    ("Vincent van Gogh" -> "van Gogh Vincent"). Only the first of several
+    authors is kept.
+    
+    Args:
+        name: Author name as found in metadata
+        
+    Returns:
+        str: Reordered name, or "" if nothing usable is left
+    """
+    if not name:
+        return ""
+    name = re.sub(r'^\s*by\s+', '', name.strip(), flags=re.IGNORECASE)
+    for delimiter in [';', '&', ' and ', ' und ', ' et ', '/']:
+        if delimiter in name:
+            name = name.split(delimiter)[0]
+    name = re.sub(r'\s+', ' ', name).strip(' .,')
+    
+    if ',' in name:
+        last, _, first = name.partition(',')
+        # "Smith, John, Jr." keeps the given name only
+        first = first.split(',')[0].strip()
+        return f"{last.strip()} {first}".strip()
+    
+    parts = name.split()
+    if len(parts) < 2:
+        return name
+    
+    # The surname starts at the last token, extended back over lowercase particles
+    start = len(parts) - 1
+    while start > 1 and parts[start - 1].lower() in _NAME_PARTICLES:
+        start -= 1
+    return " ".join(parts[start:] + parts[:start])
+
+def _metadata_candidate(field, value, source):
+    return {'field': field, 'value': value, 'source': source,
+            'confidence': METADATA_SOURCE_CONFIDENCE[source]}
+
+def _year_from_date(value):
+    """First plausible 4-digit year in a date value (PDF 'D:2005...', ISO dates, datetime)"""
+    if not value:
+        return None
+    if hasattr(value, 'year'):
+        return str(value.year)
+    match = re.search(r'(1[5-9]\d\d|20\d\d)', str(value))
+    return match.group(1) if match else None
+
+def _parse_xmp_dublin_core(xml):
+    """Get Dublin Core title, creators, date and language from an XMP packet"""
+    import xml.etree.ElementTree as ET
+    
+    dc = '{http://purl.org/dc/elements/1.1/}'
+    rdf_li = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}li'
+    fields = {}
+    try:
+        root = ET.fromstring(xml.strip().encode('utf-8') if isinstance(xml, str) else xml)
+    except ET.ParseError:
+        return fields
+    for name in ('title', 'creator', 'date', 'language'):
+        element = root.find(f'.//{dc}{name}')
+        if element is None:
+            continue
+        values = [li.text.strip() for li in element.iter(rdf_li) if li.text and li.text.strip()]
+        if not values and element.text and element.text.strip():
+            values = [element.text.strip()]
+        if values:
+            fields[name] = values
+    return fields
+
+def _pdf_metadata_candidates(file_path):
+    """Read PDF Info and XMP metadata, with PyMuPDF if available, else pypdf"""
+    import_cache = ImportCache()
+    info = {}
+    xmp = {}
+    if import_cache.is_available('fitz'):
+        fitz = import_cache.import_module('fitz')
+        with fitz.open(file_path) as doc:
+            meta = doc.metadata or {}
+            info = {'title': meta.get('title'), 'author': meta.get('author'),
+                    'date': meta.get('creationDate')}
+            xml = doc.get_xml_metadata()
+            if xml:
+                xmp = _parse_xmp_dublin_core(xml)
+    else:
+        from pypdf import PdfReader
+        reader = PdfReader(file_path)
+        meta = reader.metadata or {}
+        info = {'title': meta.get('/Title'), 'author': meta.get('/Author'),
+                'date': meta.get('/CreationDate')}
+        xmp_info = reader.xmp_metadata
+        if xmp_info is not None:
+            title = xmp_info.dc_title or {}
+            xmp = {
+                'title': list(title.values()) if isinstance(title, dict) else [],
+                'creator': list(xmp_info.dc_creator or []),
+                'date': list(xmp_info.dc_date or []),
+                'language': list(xmp_info.dc_language or [])
+            }
+    
+    candidates = []
+    for name, field in (('title', 'title'), ('creator', 'author'), ('language', 'language')):
+        if xmp.get(name):
+            candidates.append(_metadata_candidate(field, str(xmp[name][0]), 'xmp'))
+    if xmp.get('date'):
+        year = _year_from_date(xmp['date'][0])
+        if year:
+            candidates.append(_metadata_candidate('year', year, 'xmp'))
+    if info.get('title'):
+        candidates.append(_metadata_candidate('title', str(info['title']), 'pdfinfo'))
+    if info.get('author'):
+        candidates.append(_metadata_candidate('author', str(info['author']), 'pdfinfo'))
+    year = _year_from_date(info.get('date'))
+    if year:
+        candidates.append(_metadata_candidate('year', year, 'pdfdate'))
+    return candidates
+
+def _epub_metadata_candidates(file_path):
+    """Read Dublin Core metadata from the EPUB package (OPF) document"""
+    import zipfile
+    import xml.etree.ElementTree as ET
+    
+    container_ns = '{urn:oasis:names:tc:opendocument:xmlns:container}'
+    dc = '{http://purl.org/dc/elements/1.1/}'
+    opf_ns = '{http://www.idpf.org/2007/opf}'
+    
+    with zipfile.ZipFile(file_path) as zf:
+        container = ET.fromstring(zf.read('META-INF/container.xml'))
+        rootfile = container.find(f'.//{container_ns}rootfile')
+        if rootfile is None:
+            return []
+        package = ET.fromstring(zf.read(rootfile.get('full-path')))
+    
+    candidates = []
+    title = package.find(f'.//{dc}title')
+    if title is not None and title.text:
+        candidates.append(_metadata_candidate('title', title.text.strip(), 'opf'))
+    
+    # Prefer creators marked as authors over editors, illustrators etc.
+    creators = [c for c in package.iter(f'{dc}creator') if c.text and c.text.strip()]
+    authors = [c for c in creators if c.get(f'{opf_ns}role', 'aut') == 'aut'] or creators
+    if authors:
+        # EPUB 2 may carry the sortable form ("Lastname, Firstname") in file-as
+        author = authors[0].get(f'{opf_ns}file-as') or authors[0].text
+        candidates.append(_metadata_candidate('author', author.strip(), 'opf'))
+    
+    dates = [d for d in package.iter(f'{dc}date') if d.text]
+    dates.sort(key=lambda d: d.get(f'{opf_ns}event') != 'publication')
+    for date in dates:
+        year = _year_from_date(date.text)
+        if year:
+            candidates.append(_metadata_candidate('year', year, 'opf'))
+            break
+    
+    language = package.find(f'.//{dc}language')
+    if language is not None and language.text:
+        candidates.append(_metadata_candidate('language', language.text.strip(), 'opf'))
+    return candidates
+
+def _mobi_metadata_candidates(file_path):
+    """Read author, title, publishing date and language from a MOBI/AZW EXTH header"""
+    import struct
+    
+    with open(file_path, 'rb') as f:
+        header = f.read(78 + 8)
+        if len(header) < 86 or header[60:68] not in (b'BOOKMOBI', b'TEXtREAd'):
+            return []
+        record0 = struct.unpack('>I', header[78:82])[0]
+        f.seek(record0)
+        data = f.read(64 * 1024)
+    
+    if data[16:20] != b'MOBI':
+        return []
+    mobi_length, _, text_encoding = struct.unpack('>III', data[20:32])
+    encoding = 'utf-8' if text_encoding == 65001 else 'cp1252'
+    
+    def decode(raw):
+        return raw.decode(encoding, errors='replace').strip('\x00 ').strip()
+    
+    fields = {}
+    name_offset, name_length = struct.unpack('>II', data[84:92])
+    if name_length:
+        fields['title'] = decode(data[name_offset:name_offset + name_length])
+    
+    exth_flags = struct.unpack('>I', data[128:132])[0]
+    exth = 16 + mobi_length
+    if exth_flags & 0x40 and data[exth:exth + 4] == b'EXTH':
+        count = struct.unpack('>I', data[exth + 8:exth + 12])[0]
+        pos = exth + 12
+        exth_fields = {100: 'author', 106: 'date', 503: 'title', 524: 'language'}
+        for _ in range(count):
+            if pos + 8 > len(data):
+                break
+            record_type, record_length = struct.unpack('>II', data[pos:pos + 8])
+            if record_length < 8:
+                break
+            name = exth_fields.get(record_type)
+            # The first author wins; updated title (503) overrides the full name
+            if name and (name == 'title' or name not in fields):
+                fields[name] = decode(data[pos + 8:pos + record_length])
+            pos += record_length
+    
+    candidates = []
+    for name in ('title', 'author', 'language'):
+        if fields.get(name):
+            candidates.append(_metadata_candidate(name, fields[name], 'exth'))
+    year = _year_from_date(fields.get('date'))
+    if year:
+        candidates.append(_metadata_candidate('year', year, 'exth'))
+    return candidates
+
+def read_embedded_metadata(file_path):
+    """
+    Collect metadata candidates embedded in a document, plus a year from its filename.
+    
+    Args:
+        file_path: Path to the document
+        
+    Returns:
+        list: Dicts with 'field' (title/author/year/language), 'value', 'source', 'confidence'
+    """
+    readers = {
+        '.pdf': _pdf_metadata_candidates,
+        '.epub': _epub_metadata_candidates,
+        '.mobi': _mobi_metadata_candidates,
+        '.azw': _mobi_metadata_candidates,
+        '.azw3': _mobi_metadata_candidates,
+    }
+    candidates = []
+    reader = readers.get(os.path.splitext(file_path)[1].lower())
+    if reader:
+        try:
+            candidates = reader(file_path)
+        except Exception as e:
+            logging.debug(f"Could not read embedded metadata from {file_path}: {e}")
+    
+    year = extract_year_from_filename(os.path.basename(file_path))
+    if year:
+        candidates.append(_metadata_candidate('year', year, 'filename'))
+    return candidates
+
+def _normalize_metadata_value(field, value):
+    """Clean a candidate value; returns None if it fails validation"""
+    value = re.sub(r'\s+', ' ', str(value)).strip()
+    if field == 'title':
+        if len(value) < 2 or _JUNK_TITLE_PATTERN.search(value):
+            return None
+        return value
+    if field == 'author':
+        author = clean_author_name(reorder_author_name(value))
+        words = {w.lower().strip('.') for w in author.split()}
+        if words & _JUNK_AUTHOR_WORDS or not valid_author_name(author):
+            return None
+        return author
+    if field == 'year':
+        return value if validate_and_fix_year(value) == value else None
+    if field == 'language':
+        code = value.lower().replace('_', '-').split('-')[0]
+        return code if re.match(r'^[a-z]{2,3}$', code) else None
+    return value
+
+def _found_in_text(field, value, text):
+    if not text:
+        return False
+    if field == 'title':
+        # Compare the main title only; subtitles are often set differently
+        main = re.split(r'[:\-–—]\s', value)[0].strip().lower()
+        return len(main) >= 3 and main[:60] in text
+    if field == 'author':
+        surname = next((w for w in value.split() if w.lower() not in _NAME_PARTICLES), value.split()[0])
+        return re.search(rf"\b{re.escape(surname.lower())}\b", text) is not None
+    if field == 'year':
+        return re.search(rf"\b{value}\b", text) is not None
+    return False
+
+def resolve_embedded_metadata(file_path, text_sample='', candidates=None):
+    """
+    Choose title, author, year and language from embedded metadata with confidence scores.
+    
+    Candidates with the same normalized value are combined (noisy-OR of their
+    source confidences), and a value that also appears in the text sample counts
+    as one more independent source. The result is trusted, i.e. good enough to
+    skip the LLM, when title, author and year all reach METADATA_TRUST_THRESHOLD.
+    
+    Args:
+        file_path: Path to the document
+        text_sample: Beginning of the extracted text, used as corroborating evidence
+        candidates: Pre-read candidates (default: read_embedded_metadata(file_path))
+        
+    Returns:
+        Dict with 'title', 'author' (Lastname Firstname), 'year', 'language',
+        'confidence' and 'sources' per field, and 'trusted'
+    """
+    if candidates is None:
+        candidates = read_embedded_metadata(file_path)
+    text = re.sub(r'\s+', ' ', text_sample or '').lower()
+    
+    resolved = {'title': None, 'author': None, 'year': None, 'language': None,
+                'confidence': {}, 'sources': {}, 'trusted': False}
+    for field in ('title', 'author', 'year', 'language'):
+        groups = {}
+        for candidate in candidates:
+            if candidate['field'] != field:
+                continue
+            value = _normalize_metadata_value(field, candidate['value'])
+            if value is None:
+                continue
+            group = groups.setdefault(value.lower(), {'value': value, 'doubt': 1.0, 'sources': []})
+            group['doubt'] *= 1 - candidate['confidence']
+            group['sources'].append(candidate['source'])
+        
+        best = None
+        for group in groups.values():
+            if field in METADATA_TEXT_EVIDENCE and _found_in_text(field, group['value'], text):
+                group['doubt'] *= 1 - METADATA_TEXT_EVIDENCE[field]
+                group['sources'].append('text')
+            if best is None or group['doubt'] < best['doubt']:
+                best = group
+        if best:
+            resolved[field] = best['value']
+            resolved['confidence'][field] = round(1 - best['doubt'], 3)
+            resolved['sources'][field] = best['sources']
+    
+    if not resolved['language']:
+        resolved['language'] = detect_language(text_sample) or 'en'
+    
+    resolved['trusted'] = all(
+        resolved['confidence'].get(field, 0) >= METADATA_TRUST_THRESHOLD
+        for field in ('title', 'author', 'year')
+    )
+    return resolved
+
 def add_rename_command(rename_script_path, source_path, target_dir, new_filename, output_dir=None, debug=False):
     """
     Add mkdir and mv commands to the rename script.
@@ -8274,6 +12238,9 @@ def add_rename_command(rename_script_path, source_path, target_dir, new_filename
     import platform
     import logging
 
+    # Arguments as given, so the manifest can replay the command in a later run
+    replay = {'target_dir': target_dir, 'new_filename': new_filename, 'output_dir': output_dir}
+
     # Sanitize both the target directory and filename
     target_dir = sanitize_filename(target_dir.replace(',', ''))  # remove also commas
     
@@ -8360,8 +12327,8 @@ def add_rename_command(rename_script_path, source_path, target_dir, new_filename
     # Prepare paths for Windows batch script
     # Convert forward slashes to backslashes for Windows paths
     win_source = source_path.replace('/', '\\')
-    win_target_dir_path = target_dir.replace('/', '\\')
-    win_target_full = os.path.join(target_dir, new_filename).replace('/', '\\')
+    win_target_dir_path = full_target_dir.replace('/', '\\')
+    win_target_full = os.path.join(full_target_dir, new_filename).replace('/', '\\')
     
     # Add quotes for Windows paths
     win_source_path = '"' + win_source + '"'
@@ -8375,18 +12342,24 @@ def add_rename_command(rename_script_path, source_path, target_dir, new_filename
     else:
         # Otherwise, text files are in the same directory as the source files
         txt_source_path = os.path.splitext(source_path)[0] + ".txt"
+    # Compressed text files keep their .gz/.zst suffix, whichever --compress wrote them
+    located = TextFileOutput.locate(txt_source_path, text_output_compression)
+    txt_suffix = ".txt" + (located[len(txt_source_path):] if located
+                           else TEXT_COMPRESSION_SUFFIXES.get(text_output_compression, ''))
+    txt_source_path = os.path.splitext(txt_source_path)[0] + txt_suffix
         
     # Target text file will be in the target directory with related name
-    txt_new_filename = os.path.splitext(new_filename)[0] + ".txt"
+    txt_new_filename = os.path.splitext(new_filename)[0] + txt_suffix
     
     # Make sure no double dots in text filename
     txt_new_filename = re.sub(r'\.{2,}', '.', txt_new_filename)
     
-    txt_target_path = os.path.join(target_dir, txt_new_filename)
+    # Next to the renamed document, not relative to the current directory
+    txt_target_path = os.path.join(full_target_dir, txt_new_filename)
     
     # Escape for bash - make sure we use proper absolute paths
     escaped_txt_source_path = escape_special_chars(os.path.abspath(txt_source_path))
-    escaped_txt_target_path = escape_special_chars(os.path.join(os.path.abspath(target_dir), txt_new_filename))
+    escaped_txt_target_path = escape_special_chars(txt_target_path)
     
     # Prepare for Windows batch
     win_txt_source = txt_source_path.replace('/', '\\')
@@ -8400,7 +12373,7 @@ def add_rename_command(rename_script_path, source_path, target_dir, new_filename
         logging.debug(f"Source path: {source_path}")
         logging.debug(f"Target directory: {target_dir}")
         logging.debug(f"New filename: {new_filename}")
-        logging.debug(f"Full target path: {os.path.join(target_dir, new_filename)}")
+        logging.debug(f"Full target path: {os.path.join(full_target_dir, new_filename)}")
         if txt_source_path:
             logging.debug(f"Text source path: {txt_source_path}")
             logging.debug(f"Text target path: {txt_target_path}")
@@ -8446,6 +12419,14 @@ def add_rename_command(rename_script_path, source_path, target_dir, new_filename
             logging.debug(f"Added commands to batch script: {batch_script_path}")
     
     logging.debug(f"Added rename command: {source_path} -> {os.path.join(target_dir, new_filename)}")
+    # The same moves as the scripts, for RenameExecutor: [source, target, optional]
+    manifest_record(source_path, 'sorted', {
+        'rename': replay,
+        'moves': [
+            [os.path.abspath(source_path), os.path.join(full_target_dir, new_filename), False],
+            [os.path.abspath(txt_source_path), txt_target_path, True]
+        ]
+    })
     if os.path.exists(txt_source_path):
         logging.debug(f"Will also move text file: {txt_source_path} -> {txt_target_path}")
     
@@ -8625,8 +12606,109 @@ def get_openai_client():
             raise
     return thread_local.client
 
-def main():
+def _scan_directory(directory: str, recursive: bool = False) -> Iterator[str]:
+    """Yield regular file paths under a directory using os.scandir"""
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                subdirs = []
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            yield entry.path
+                        elif recursive and entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logging.warning(f"Cannot scan directory {current}: {e}")
+            continue
+        # Depth-first, in the order entries were listed
+        pending.extend(reversed(subdirs))
+
+def iter_input_files(patterns: List[str], recursive: bool = False,
+                     extensions: Optional[List[str]] = None) -> Iterator[str]:
+    """
+    Lazily discover input files from command-line patterns
+    
+    Files are yielded as soon as they are found, so processing can start
+    before discovery is finished. Wildcards in the file name part are matched
+    case-insensitively against os.scandir entries of the pattern's directory,
+    which replaces globbing once per case variant. Patterns with wildcards in
+    their directory part fall back to glob.iglob.
+    
+    Args:
+        patterns: Files, directories or wildcard patterns; each entry may hold
+            several space-separated patterns
+        recursive: Descend into subdirectories
+        extensions: Lowercase extensions to accept (default: all supported)
+        
+    Yields:
+        Paths of supported input files
+    """
     import glob
+    import fnmatch
+    
+    extensions = set(extensions or (ext.lower() for ext in ExtractionManager.SUPPORTED_EXTENSIONS))
+    
+    def accepted(path):
+        return os.path.splitext(path)[1].lower() in extensions
+    
+    def expand(pattern):
+        if os.path.isfile(pattern):
+            # Handles spaces in filenames and shell-expanded globs
+            if accepted(pattern):
+                yield pattern
+            return
+        if os.path.isdir(pattern):
+            if recursive:
+                yield from (path for path in _scan_directory(pattern, recursive=True) if accepted(path))
+            return
+        if not glob.has_magic(pattern):
+            return
+        
+        directory, name_pattern = os.path.split(pattern)
+        if glob.has_magic(directory):
+            for path in glob.iglob(pattern, recursive=recursive):
+                if os.path.isfile(path) and accepted(path):
+                    yield path
+            return
+        
+        # Match on the lowercased name so '*.pdf' also finds 'BOOK.PDF'
+        name_pattern = name_pattern.lower()
+        for path in _scan_directory(directory or '.', recursive=recursive):
+            if fnmatch.fnmatchcase(os.path.basename(path).lower(), name_pattern) and accepted(path):
+                yield path[2:] if not directory and path.startswith('./') else path
+    
+    if not patterns:
+        logging.info("No files specified, processing all supported file types in current directory")
+        sources = ['*']
+    else:
+        sources = []
+        for pattern_group in patterns:
+            logging.debug(f"Processing pattern group: {pattern_group}")
+            # A whole entry that exists is taken as-is, otherwise split "*.pdf *.epub"
+            if os.path.exists(pattern_group):
+                sources.append(pattern_group)
+            else:
+                sources.extend(pattern_group.split())
+    
+    # A single scandir cannot yield duplicates; only overlapping sources need tracking
+    seen = set() if len(sources) > 1 else None
+    for source in sources:
+        for path in expand(source):
+            if seen is not None:
+                key = os.path.normpath(path)
+                if key in seen:
+                    continue
+                seen.add(key)
+            yield path
+
+
+def main():
+    import itertools
     
     """Command-line interface entry point"""
     parser = argparse.ArgumentParser(
@@ -8653,6 +12735,33 @@ def main():
         help="Sort and rename files based on content analysis from LLM"
     )
 
+    parser.add_argument(
+        '--sort-deferred',
+        action='store_true',
+        help=f"Sorting-only pass over the files listed in {DEFERRED_SORT_LIST} because their "
+             "LLM was unavailable; reuses their text in --output-dir (implies --sort)"
+    )
+
+    parser.add_argument(
+        '--metadata-only',
+        action='store_true',
+        help="Fast sorting: extract or OCR only the first --metadata-pages pages of PDF and DJVU "
+             "files and write no text files, leaving full extraction to a later run (implies --sort)"
+    )
+
+    parser.add_argument(
+        '--metadata-pages',
+        type=int,
+        default=3,
+        help="Leading pages read with --metadata-only (default: 3)"
+    )
+
+    parser.add_argument(
+        '--metadata-last-page',
+        action='store_true',
+        help="With --metadata-only, also read the last page (colophon)"
+    )
+
     parser.add_argument(
         '--force-ocr',
         action='store_true',
@@ -8663,7 +12772,15 @@ def main():
     parser.add_argument(
         '--execute-rename',
         action='store_true',
-        help="Automatically execute the generated rename commands"
+        help="Automatically execute the generated rename commands: in-process with an undo "
+             "journal next to the rename script, or by running the script with --no-manifest"
+    )
+    
+    parser.add_argument(
+        '--undo-rename',
+        action='store_true',
+        help="Move the files of the last --execute-rename run back, using its journal, and exit; "
+             "repeat to undo earlier runs"
     )
 
     parser.add_argument(
@@ -8718,13 +12835,144 @@ def main():
     
     parser.add_argument(
         '-j', '--json',
-        help="Save results to JSON file"
+        help="Stream results to a JSON Lines file, one line per file as it finishes"
+    )
+    
+    parser.add_argument(
+        '--json-text',
+        choices=list(JSONLResultWriter.TEXT_MODES),
+        default='include',
+        help="Extracted text in --json lines: 'include' it, give its 'path' (text_path) "
+             "or leave it out with 'none' (default: include)"
     )
     
     parser.add_argument(
         '-w', '--workers',
         type=int,
-        help="Maximum number of worker threads"
+        help="Maximum number of extraction workers (threads or processes, see --executor)"
+    )
+    
+    parser.add_argument(
+        '--executor',
+        choices=['thread', 'process'],
+        default='thread',
+        help="Run extraction in worker threads or worker processes (default: thread). "
+             "'process' scales pure-Python parsers across cores; sorting stays in the main process"
+    )
+    
+    parser.add_argument(
+        '--no-hybrid-ocr',
+        action='store_true',
+        help="Disable per-page hybrid OCR; by default PDFs mixing text and scanned pages "
+             "only OCR the scanned pages"
+    )
+    
+    parser.add_argument(
+        '--page-parallel-threshold',
+        type=int,
+        default=PDFExtractor.PAGE_PARALLEL_THRESHOLD,
+        help="Split PDFs with more pages than this across processes for pymupdf/pdfplumber/pypdf "
+             f"(default: {PDFExtractor.PAGE_PARALLEL_THRESHOLD}, 0 disables)"
+    )
+    
+    parser.add_argument(
+        '--page-workers',
+        type=int,
+        help="Number of processes shared by page-split PDFs; capped at the cores the other "
+             "--workers leave free, but at least 2 (default: that cap)"
+    )
+    
+    parser.add_argument(
+        '--llm-workers',
+        type=int,
+        default=2,
+        help="Number of concurrent LLM/sorting workers, independent of --workers (default: 2). "
+             "Requests per LLM endpoint start at 2 and adapt up to this number"
+    )
+    
+    parser.add_argument(
+        '--llm-batch-size',
+        type=int,
+        default=1,
+        help="Documents packed into one LLM metadata request when sorting (default: 1, no batching)"
+    )
+    
+    parser.add_argument(
+        '--llm-async',
+        action='store_true',
+        help="Sort on one asyncio event loop with pooled keep-alive connections per LLM endpoint "
+             "instead of one blocking request per --llm-workers thread"
+    )
+    
+    parser.add_argument(
+        '--llm-in-flight',
+        type=int,
+        default=64,
+        help="Documents that may await the LLM at once with --llm-async, and the cap of the "
+             "adaptive per-endpoint concurrency in that mode (default: 64)"
+    )
+    
+    parser.add_argument(
+        '--llm-breaker-threshold',
+        type=int,
+        default=5,
+        help="Consecutive failed requests after which an LLM endpoint is considered down and "
+             "files are deferred instead of retried (default: 5, 0 disables)"
+    )
+    
+    parser.add_argument(
+        '--llm-breaker-cooldown',
+        type=float,
+        default=30.0,
+        help="Seconds before a down LLM endpoint is probed again (default: 30)"
+    )
+    
+    parser.add_argument(
+        '--llm-output',
+        choices=['auto', 'schema', 'tags'],
+        default='auto',
+        help="How metadata answers are requested: 'auto' uses JSON mode where the provider "
+             "supports it (OpenAI, Groq, Ollama), 'schema' constrains the answer to a JSON Schema "
+             "where supported, 'tags' always uses the tag format (default: auto)"
+    )
+    
+    parser.add_argument(
+        '--llm-queue-size',
+        type=int,
+        help="Extracted documents that may wait for the LLM stage before extraction pauses "
+             "(default: twice --llm-workers)"
+    )
+    
+    parser.add_argument(
+        '--no-embedded-metadata',
+        action='store_true',
+        help="Always ask the LLM when sorting, even if the file's own metadata "
+             "(PDF Info/XMP, EPUB OPF, MOBI EXTH) is trustworthy"
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        help="Directory of the extraction, LLM response and author name caches "
+             f"(default: {SQLiteCache.default_dir()})"
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="Do not read or write the extraction cache"
+    )
+    
+    parser.add_argument(
+        '--no-llm-cache',
+        action='store_true',
+        help="Always query the LLM instead of reusing cached responses and author names from earlier runs"
+    )
+    
+    parser.add_argument(
+        '--llm-cache-ttl',
+        type=float,
+        default=LLMResponseCache.DEFAULT_TTL / 86400,
+        help="Days a cached LLM response stays valid (default: %(default)g, 0 keeps them forever)"
     )
     
     parser.add_argument(
@@ -8738,6 +12986,36 @@ def main():
         action='store_true',
         help="Process files even if output text file already exists"
     )
+    
+    parser.add_argument(
+        '--output-format',
+        choices=list(OUTPUT_FORMATS),
+        default='txt',
+        help="Where extracted text goes: one .txt file per document, or 'shards', "
+             "compressed shard files with an offset index in the output directory (default: txt)"
+    )
+    
+    parser.add_argument(
+        '--shard-size',
+        type=int,
+        default=ShardedTextOutput.SHARD_SIZE // (1024 * 1024),
+        help="Size in MiB after which --output-format=shards starts a new shard (default: 256)"
+    )
+    
+    parser.add_argument(
+        '--compress',
+        choices=list(TEXT_COMPRESSION_SUFFIXES),
+        default='none',
+        help="Compress text files with gzip (.txt.gz) or zstd (.txt.zst, needs the zstandard "
+             "package); skipping and --sort read either kind (default: none)"
+    )
+    
+    parser.add_argument(
+        '--no-manifest',
+        action='store_true',
+        help="Do not keep the per-file processing state in the output directory "
+             "(biblioforge_manifest.sqlite3); sorting then skips only files already in the rename script"
+    )
 
     # Add to the argument parser in main()
     parser.add_argument(
@@ -8802,123 +13080,51 @@ def main():
                 logging.info(f"Supported file types: {', '.join(ext.lstrip('.') for ext in supported_extensions)}")
                 return 1
         
-        # Expand file patterns
-        input_files = []
+        if args.metadata_only:
+            args.sort = True
         
-        # Handle case when no files provided - process all supported types in current directory
-        if not args.files:
-            logging.info("No files specified, processing all supported file types in current directory")
-            for ext in filtered_extensions or supported_extensions:
-                pattern = f"*{ext}"
-                matched = glob.glob(pattern)
-                if matched:
-                    input_files.extend(matched)
-            
-            if not input_files:
-                logging.error("No supported files found in current directory")
+        if args.undo_rename:
+            configure_manifest(None if args.no_manifest else (args.output_dir or '.'))
+            journal_path = rename_journal_path(args.rename_script)
+            if not os.path.exists(journal_path):
+                logging.error(f"No rename journal found at {journal_path}")
                 return 1
-        else:
-            # Process each pattern which might include multiple space-separated patterns
-            for pattern_group in args.files:
-                # Debug which pattern we're processing
-                logging.debug(f"Processing pattern group: {pattern_group}")
-                
-                # Handle the case where the shell has already expanded the glob pattern
-                if os.path.isfile(pattern_group):
-                    file_ext = os.path.splitext(pattern_group)[1].lower()
-                    if file_ext in supported_extensions:
-                        input_files.append(pattern_group)
-                        if args.debug:
-                            logging.debug(f"Direct file match: {pattern_group}")
-                    continue
-                
-                # Split by space to handle multiple patterns like "*.pdf *.epub"
-                for pattern in pattern_group.split():
-                    if args.debug:
-                        logging.debug(f"Processing pattern: {pattern}")
-                    
-                    # Use case-insensitive pattern matching for extensions
-                    if '*.' in pattern:
-                        base_pattern = pattern.split('*.')[0]
-                        ext = pattern.split('*.')[1].lower()
-                        
-                        # Create case-insensitive patterns for common extension variants
-                        variants = [ext, ext.upper(), ext.capitalize()]
-                        for variant in variants:
-                            case_pattern = f"{base_pattern}*.{variant}"
-                            if args.debug:
-                                logging.debug(f"Trying case variant: {case_pattern}")
-                            matched = glob.glob(case_pattern)
-                            for matched_file in matched:
-                                if os.path.isfile(matched_file):
-                                    file_ext = os.path.splitext(matched_file)[1].lower()
-                                    if file_ext in supported_extensions:
-                                        input_files.append(matched_file)
-                                        if args.debug:
-                                            logging.debug(f"Matched file: {matched_file}")
-                            
-                    if args.recursive:
-                        # If the pattern is an existing directory, walk it recursively
-                        if os.path.isdir(pattern):
-                            for root, _, files in os.walk(pattern):
-                                for file in files:
-                                    file_path = os.path.join(root, file)
-                                    file_ext = os.path.splitext(file_path)[1].lower()
-                                    # Only add supported file types
-                                    if filtered_extensions is None and file_ext in supported_extensions:
-                                        input_files.append(file_path)
-                                    elif filtered_extensions is not None and file_ext in filtered_extensions:
-                                        input_files.append(file_path)
-                        # Check if the pattern is an existing file (handles spaces in filenames)
-                        elif os.path.isfile(pattern):
-                            file_ext = os.path.splitext(pattern)[1].lower()
-                            if filtered_extensions is None and file_ext in supported_extensions:
-                                input_files.append(pattern)
-                            elif filtered_extensions is not None and file_ext in filtered_extensions:
-                                input_files.append(pattern)
-                        else:
-                            # Pattern globbing for wildcards with recursive option
-                            matched_files = glob.glob(pattern, recursive=True)
-                            for matched_file in matched_files:
-                                if os.path.isfile(matched_file):
-                                    file_ext = os.path.splitext(matched_file)[1].lower()
-                                    if filtered_extensions is None and file_ext in supported_extensions:
-                                        input_files.append(matched_file)
-                                    elif filtered_extensions is not None and file_ext in filtered_extensions:
-                                        input_files.append(matched_file)
-                    else:
-                        # Non-recursive mode
-                        # Check if the pattern is an existing file (handles spaces in filenames)
-                        if os.path.isfile(pattern):
-                            file_ext = os.path.splitext(pattern)[1].lower()
-                            if filtered_extensions is None and file_ext in supported_extensions:
-                                input_files.append(pattern)
-                            elif filtered_extensions is not None and file_ext in filtered_extensions:
-                                input_files.append(pattern)
-                        else:
-                            matched_files = glob.glob(pattern)
-                            for matched_file in matched_files:
-                                if os.path.isfile(matched_file):
-                                    file_ext = os.path.splitext(matched_file)[1].lower()
-                                    if filtered_extensions is None and file_ext in supported_extensions:
-                                        input_files.append(matched_file)
-                                    elif filtered_extensions is not None and file_ext in filtered_extensions:
-                                        input_files.append(matched_file)
-        
-        # Remove duplicates while preserving order
-        input_files = list(dict.fromkeys(input_files))
-        
-        if args.debug:
-            logging.debug(f"Files found after filtering: {len(input_files)}")
-            for file in input_files:
-                logging.debug(f"  {file}")
+            undone = RenameExecutor(journal_path).undo()
+            logging.info(f"Undid {undone} renames from {journal_path}")
+            return 0
+        
+        if args.sort_deferred:
+            # Their text is already in --output-dir, so this pass only sorts
+            args.sort = True
+            args.files = take_deferred_sorts()
+            if not args.files:
+                logging.info(f"No files in {DEFERRED_SORT_LIST}, nothing to sort")
+                return 0
+        
+        # Discover input files lazily, so the first extraction starts as soon as
+        # the first match is found instead of after the whole library is listed
+        input_files = iter_input_files(
+            args.files,
+            recursive=args.recursive,
+            extensions=filtered_extensions
+        )
         
-        if not input_files:
-            logging.error("No supported input files found")
+        first_file = next(input_files, None)
+        if first_file is None:
+            if not args.files:
+                logging.error("No supported files found in current directory")
+            else:
+                logging.error("No supported input files found")
             return 1
+        input_files = itertools.chain([first_file], input_files)
             
         # Initialize processor
-        processor = DocumentProcessor(debug=args.debug)
+        cache_dir = None if args.no_cache else (args.cache_dir or SQLiteCache.default_dir())
+        processor = DocumentProcessor(debug=args.debug, cache_dir=cache_dir,
+                                      embedded_metadata=not args.no_embedded_metadata,
+                                      output_format=args.output_format)
+        configure_text_output(args.shard_size * 1024 * 1024, args.compress)
+        configure_manifest(None if args.no_manifest else (args.output_dir or '.'))
         
         # Initialize LLM provider and rename script if sorting is enabled
         llm_provider = None
@@ -8975,47 +13181,78 @@ def main():
                 script_paths = initialize_rename_scripts(rename_script_path)
         
         try:
-            # Display summary of files to process
-            logging.info(f"Processing {len(input_files)} files")
-            
-            # Group files by extension for stats
-            extension_counts = {}
-            for file in input_files:
-                ext = os.path.splitext(file)[1].lower()
-                extension_counts[ext] = extension_counts.get(ext, 0) + 1
-                
-            for ext, count in sorted(extension_counts.items()):
-                logging.info(f"  {ext} files: {count}")
+            logging.info("Processing files as they are discovered")
 
             logging.debug(f"initiating process files for {llm_provider}")
+            
+            # Only set in metadata mode, so full runs keep their extraction cache keys
+            metadata_options = {}
+            if args.metadata_only:
+                metadata_options = {'metadata_pages': max(1, args.metadata_pages),
+                                    'metadata_last_page': args.metadata_last_page}
+            
+            if args.sort:
+                # Upper bound for the adaptive limiters: more requests than
+                # this can never be waiting anyway
+                configure_llm_concurrency(args.llm_in_flight if args.llm_async else args.llm_workers)
+                configure_llm_breakers(args.llm_breaker_threshold, args.llm_breaker_cooldown)
+                configure_llm_output(args.llm_output)
+                if not args.no_llm_cache:
+                    configure_llm_cache(args.cache_dir or SQLiteCache.default_dir(),
+                                        ttl=args.llm_cache_ttl * 86400)
+                    configure_author_memo(args.cache_dir or SQLiteCache.default_dir())
 
             
+            result_writer = JSONLResultWriter(args.json, args.json_text) if args.json else None
+            
             # Process files with periodic shutdown checks
-            results = processor.process_files(
-                input_files,
-                output_dir=args.output_dir,
-                method=args.method,
-                ocr_method=args.ocr_method,
-                password=args.password,
-                extract_tables=args.tables,
-                force_ocr=args.force_ocr,
-                max_workers=args.workers,
-                noskip=args.noskip,
-                sort=args.sort,
-                rename_script_path=rename_script_path,
-                llm_provider=llm_provider,
-                temperature=args.temperature,
-                max_tokens=args.max_tokens,
-            )
+            try:
+                results = processor.process_files(
+                    input_files,
+                    output_dir=args.output_dir,
+                    method=args.method,
+                    ocr_method=args.ocr_method,
+                    password=args.password,
+                    extract_tables=args.tables,
+                    force_ocr=args.force_ocr,
+                    max_workers=args.workers,
+                    noskip=args.noskip,
+                    sort=args.sort,
+                    rename_script_path=rename_script_path,
+                    llm_provider=llm_provider,
+                    temperature=args.temperature,
+                    max_tokens=args.max_tokens,
+                    executor=args.executor,
+                    llm_workers=args.llm_workers,
+                    queue_size=args.llm_queue_size,
+                    llm_batch_size=args.llm_batch_size,
+                    llm_async=args.llm_async,
+                    llm_in_flight=args.llm_in_flight,
+                    page_parallel_threshold=args.page_parallel_threshold,
+                    page_workers=args.page_workers,
+                    hybrid_ocr=not args.no_hybrid_ocr,
+                    # Only counters are kept; without --json the results are dropped
+                    result_sink=result_writer.write if result_writer else (lambda result: None),
+                    keep_text=False,
+                    **metadata_options
+                )
+            finally:
+                if result_writer is not None:
+                    result_writer.close()
+            
+            # Files by extension, counted while processing
+            stats = results['stats']
+            for ext, count in sorted(stats['extensions'].items()):
+                logging.info(f"  {ext} files: {count}")
             
-            # Handle results
-            if args.json:
-                import json
-                with open(args.json, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, indent=2, ensure_ascii=False)
+            if result_writer is not None:
+                logging.info(f"Results of {result_writer.written} files written to {args.json}")
             
             # Handle rename script if sorting was enabled
-            if args.sort and args.execute_rename:
+            if args.sort and args.execute_rename and processing_manifest is not None:
+                logging.info("Executing rename commands...")
+                execute_planned_renames(rename_script_path)
+            elif args.sort and args.execute_rename:
                 is_windows = platform.system() == 'Windows'
                 
                 if is_windows:
@@ -9045,8 +13282,8 @@ def main():
                     logging.info(f"Review and execute manually with: bash {rename_script_path}")
             
             # Update return code logic to include skipped files in the summary
-            successful = len(results.get('results', {})) - len(results.get('failed', []))
-            skipped = len(results.get('skipped', []))
+            successful = stats['total'] - len(results.get('failed', []))
+            skipped = stats['skipped']
             
             logging.info(f"Summary: {successful} succeeded, {skipped} skipped, {len(results.get('failed', []))} failed")
             
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import BiblioForge
+
+
+def fill(limiter):
+    """Acquire every free slot of limiter; returns the start time to release them with"""
+    for _ in range(limiter.limit - limiter.stats()['in_flight']):
+        limiter.acquire()
+    return time.monotonic()
+
+
+def test_slow_start_grows_by_one_per_success():
+    limiter = BiblioForge.AdaptiveLimiter('test', initial=2, max_limit=8)
+    started = fill(limiter)
+    limiter.release(started)
+    assert limiter.limit == 3
+
+
+def test_growth_needs_the_limit_to_be_used():
+    limiter = BiblioForge.AdaptiveLimiter('test', initial=2, max_limit=8)
+    limiter.acquire()
+    limiter.release(time.monotonic())
+    assert limiter.limit == 2
+
+
+def test_overload_halves_once_per_burst():
+    limiter = BiblioForge.AdaptiveLimiter('test', initial=8, max_limit=8)
+    started = fill(limiter)
+    limiter.release(started, 'overload')
+    assert limiter.limit == 4
+    # Requests started before that decrease do not halve it again
+    limiter.release(started, 'overload')
+    assert limiter.limit == 4
+    assert limiter.overloads == 2
+
+
+def test_additive_increase_after_overload():
+    limiter = BiblioForge.AdaptiveLimiter('test', initial=4, max_limit=8)
+    started = fill(limiter)
+    limiter.release(started, 'overload')
+    assert limiter.limit == 2
+    for _ in range(3):
+        limiter.release(started, 'error')
+    for _ in range(2):
+        started = fill(limiter)
+        limiter.release(started)
+        limiter.release(started)
+    # 1/limit per success while the limit is used, instead of one per success
+    assert limiter.limit == 2
+    started = fill(limiter)
+    limiter.release(started)
+    limiter.release(started)
+    assert limiter.limit == 3
+
+
+def test_limits_are_respected():
+    limiter = BiblioForge.AdaptiveLimiter('test', initial=8, max_limit=4, min_limit=2)
+    assert limiter.limit == 4
+    for _ in range(5):
+        held = limiter.limit
+        started = fill(limiter)
+        limiter.release(started, 'overload')
+        # Release every held slot, so the next fill() does not block
+        for _ in range(held - 1):
+            limiter.release(started, 'error')
+    assert limiter.limit == 2
+    assert limiter.stats()['in_flight'] == 0
+
+
+def test_slot_released_on_base_exception():
+    limiter = BiblioForge.AdaptiveLimiter('test', initial=1, max_limit=1)
+    with pytest.raises(KeyboardInterrupt):
+        with limiter.slot():
+            raise KeyboardInterrupt
+    assert limiter.stats()['in_flight'] == 0
+    assert limiter.errors == 1
+
+
+def test_blocked_thread_woken_by_release():
+    limiter = BiblioForge.AdaptiveLimiter('test', initial=1, max_limit=1)
+    limiter.acquire()
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.05)
+    limiter.release(time.monotonic(), 'error')
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_cancelled_async_waiter_does_not_take_the_wakeup():
+    limiter = BiblioForge.AdaptiveLimiter('test', initial=1, max_limit=1)
+
+    async def run():
+        await limiter.acquire_async()
+        cancelled = asyncio.ensure_future(limiter.acquire_async())
+        waiting = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.sleep(0.01)
+        limiter.release(time.monotonic())
+        await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(run())
+    assert limiter.stats()['in_flight'] == 1
+
+
+def test_woken_then_cancelled_waiter_passes_the_wakeup_on():
+    limiter = BiblioForge.AdaptiveLimiter('test', initial=1, max_limit=1)
+
+    async def run():
+        await limiter.acquire_async()
+        first = asyncio.ensure_future(limiter.acquire_async())
+        second = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        limiter.release(time.monotonic())
+        first.cancel()
+        await asyncio.wait_for(second, 1)
+
+    asyncio.run(run())
+    assert limiter.stats()['in_flight'] == 1
@@ -0,0 +1,41 @@
+import pytest
+
+import BiblioForge
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Smith, John", "Smith John"),
+    ("Smith, John, Jr.", "Smith John Jr."),
+    ("Müller, Hans und Meier, Anna", "Müller Hans und Meier Anna"),
+    ("<AUTHOR>Doe, Jane</AUTHOR>", "Doe Jane"),
+])
+def test_comma_names_only_lose_commas(name, expected):
+    assert BiblioForge.canonical_author_name(name) == (expected, True)
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("J. R. R. Tolkien", "Tolkien J. R. R."),
+    ("Vincent van Gogh", "van Gogh Vincent"),
+    ("Tolkien John", "Tolkien John"),
+    ("Smith John & Doe Jane", "Smith John"),
+])
+def test_ordered_by_rules(name, expected):
+    assert BiblioForge.canonical_author_name(name) == (expected, True)
+
+
+def test_single_word_left_to_llm():
+    assert BiblioForge.canonical_author_name("Plato") == ("Plato", False)
+
+
+@pytest.mark.parametrize("name", ["", "Unknown", "n a", "Lastname Firstname"])
+def test_unknown(name):
+    assert BiblioForge.canonical_author_name(name) == ("UnknownAuthor", True)
+
+
+def test_memo_persists_llm_results(tmp_path):
+    memo = BiblioForge.AuthorNameMemo(str(tmp_path))
+    memo.put("Plato", "Plato", persist=True)
+    memo.put("Smith, John", "Smith John")
+    reopened = BiblioForge.AuthorNameMemo(str(tmp_path))
+    assert reopened.get("Plato") == "Plato"
+    assert reopened.get("Smith, John") is None
@@ -0,0 +1,82 @@
+import pytest
+
+import BiblioForge
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(BiblioForge.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = BiblioForge.CircuitBreaker('test', failure_threshold=3, cool_down=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    with pytest.raises(BiblioForge.CircuitOpenError):
+        breaker.before_request()
+
+
+def test_single_probe_after_cool_down(clock):
+    breaker = BiblioForge.CircuitBreaker('test', failure_threshold=1, cool_down=10)
+    breaker.record_failure()
+    clock[0] += 10
+    breaker.before_request()
+    assert breaker.state == breaker.HALF_OPEN
+    with pytest.raises(BiblioForge.CircuitOpenError):
+        breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
+    breaker.before_request()
+
+
+def test_failed_probe_opens_for_another_cool_down(clock):
+    breaker = BiblioForge.CircuitBreaker('test', failure_threshold=1, cool_down=10)
+    breaker.record_failure()
+    clock[0] += 10
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    clock[0] += 5
+    with pytest.raises(BiblioForge.CircuitOpenError):
+        breaker.before_request()
+
+
+def test_abandoned_probe_is_freed(clock):
+    breaker = BiblioForge.CircuitBreaker('test', failure_threshold=1, cool_down=10)
+    breaker.record_failure()
+    clock[0] += 10
+    breaker.before_request()
+    breaker.record_abandoned()
+    # The cool-down already passed, so the next request probes again
+    breaker.before_request()
+    assert breaker.state == breaker.HALF_OPEN
+
+
+def test_zero_threshold_disables(clock):
+    breaker = BiblioForge.CircuitBreaker('test', failure_threshold=0)
+    for _ in range(100):
+        breaker.record_failure()
+    breaker.before_request()
+    assert breaker.state == breaker.CLOSED
+
+
+@pytest.mark.parametrize("status, outage", [(503, True), (429, True), (408, True), (400, False), (404, False)])
+def test_outage_by_status(status, outage):
+    error = Exception()
+    error.status_code = status
+    assert BiblioForge.is_llm_outage_error(error) == outage
+
+
+def test_outage_by_connection_error_name():
+    APIConnectionError = type('APIConnectionError', (Exception,), {})
+    assert BiblioForge.is_llm_outage_error(APIConnectionError())
+    assert BiblioForge.is_llm_outage_error(ConnectionRefusedError())
+    assert not BiblioForge.is_llm_outage_error(ValueError('bad json'))
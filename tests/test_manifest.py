@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import BiblioForge
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    manifest = BiblioForge.ProcessingManifest(str(tmp_path))
+    monkeypatch.setattr(BiblioForge, 'processing_manifest', manifest)
+    yield manifest
+    manifest.close()
+
+
+def test_states_persist(manifest, tmp_path):
+    manifest.record('book.pdf', 'sorted', {'rename': {'target_dir': 'Smith'}})
+    manifest.record('other.pdf', 'failed')
+    assert manifest.emitted('book.pdf')
+
+    reopened = BiblioForge.ProcessingManifest(str(tmp_path))
+    try:
+        assert reopened.get(os.path.abspath('book.pdf')) == ('sorted', {'rename': {'target_dir': 'Smith'}})
+        assert reopened.state('other.pdf') == 'failed'
+        assert reopened.state('missing.pdf') is None
+        assert not reopened.emitted('book.pdf')
+        assert [path for path, _ in reopened.entries('sorted')] == [os.path.abspath('book.pdf')]
+    finally:
+        reopened.close()
+
+
+def test_unknown_state_rejected(manifest):
+    with pytest.raises(ValueError):
+        manifest.record('book.pdf', 'done')
+
+
+def test_import_rename_script_replays_identically(manifest, tmp_path):
+    (tmp_path / 'lib').mkdir()
+    (tmp_path / 'out').mkdir()
+    source = tmp_path / 'lib' / 'a book.pdf'
+    source.write_text('x')
+    (tmp_path / 'out' / 'a book.txt').write_text('text')
+    script = str(tmp_path / 'rename_commands.sh')
+
+    # A script written by a run without a manifest
+    BiblioForge.processing_manifest = None
+    BiblioForge.add_rename_command(script, str(source), 'Smith', 'Smith 2000 Title', str(tmp_path / 'out'))
+    BiblioForge.processing_manifest = manifest
+    with open(script) as f:
+        commands = f.read()
+
+    assert BiblioForge.import_rename_script(script) == 1
+    assert BiblioForge.import_rename_script(script) == 0
+    state, detail = manifest.get(str(source))
+    assert state == 'sorted'
+    assert not manifest.emitted(str(source))
+    assert detail['moves'][1][1] == str(tmp_path / 'out' / 'Smith' / 'Smith 2000 Title.txt')
+
+    replayed = str(tmp_path / 'replayed.sh')
+    BiblioForge.add_rename_command(replayed, str(source), **detail['rename'])
+    with open(replayed) as f:
+        assert f.read() == commands
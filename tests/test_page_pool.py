@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+import BiblioForge
+
+
+@pytest.fixture
+def cpus(monkeypatch):
+    monkeypatch.setattr(BiblioForge, '_page_pool_workers', None)
+    monkeypatch.setattr(BiblioForge, '_page_splitting_disabled', False)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+
+
+def test_default_run_splits_large_documents(cpus, tmp_path, monkeypatch):
+    monkeypatch.setattr(BiblioForge, 'processing_manifest', None)
+    source = tmp_path / 'a.md'
+    source.write_text("# A\n\nText.\n")
+    processor = BiblioForge.DocumentProcessor(cache_dir=None, embedded_metadata=False)
+    # Default options on a lazy input: as many extraction threads as cores
+    processor.process_files(iter([str(source)]), output_dir=str(tmp_path / 'out'))
+
+    threshold = BiblioForge.PDFExtractor.PAGE_PARALLEL_THRESHOLD
+    assert BiblioForge.page_pool_size() == 2
+    assert BiblioForge.PDFExtractor._splits_pages('pymupdf', threshold + 1, threshold)
+    assert not BiblioForge.PDFExtractor._splits_pages('pymupdf', threshold, threshold)
+    assert not BiblioForge.PDFExtractor._splits_pages('tesseract', threshold + 1, threshold)
+    assert not BiblioForge.PDFExtractor._splits_pages('pymupdf', threshold + 1, 0)
+
+
+def test_page_workers_capped_by_busy_extraction_threads(cpus):
+    BiblioForge.configure_page_pool(8, reserved=3)
+    assert BiblioForge.page_pool_size() == 5
+    BiblioForge.configure_page_pool(None, reserved=0)
+    assert BiblioForge.page_pool_size() == 8
+
+
+def test_no_splitting_in_extraction_worker_processes(cpus, monkeypatch):
+    monkeypatch.setattr(BiblioForge, '_page_splitting_disabled', True)
+    assert BiblioForge.page_pool_size() == 0
+    assert not BiblioForge.PDFExtractor._splits_pages('pymupdf', 10000, 500)
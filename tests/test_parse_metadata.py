@@ -0,0 +1,59 @@
+import BiblioForge
+
+
+WELL_FORMED = (
+    "<TITLE>The Book</TITLE>\n"
+    "<AUTHOR>Smith, John</AUTHOR>\n"
+    "<YEAR>1999</YEAR>\n"
+    "<LANGUAGE>en</LANGUAGE>"
+)
+
+
+def test_tags_well_formed():
+    assert BiblioForge.parse_metadata(WELL_FORMED) == {
+        'author': 'Smith, John', 'year': '1999', 'title': 'The Book', 'language': 'en'
+    }
+
+
+def test_tags_missing_closing_bracket():
+    content = "<TITLE The Book</TITLE>\n<AUTHOR>Smith John</AUTHOR>\n<LANGUAGE de</LANGUAGE>"
+    metadata = BiblioForge.parse_metadata(content)
+    assert metadata['title'] == 'The Book'
+    assert metadata['language'] == 'de'
+    assert metadata['year'] == 'Unknown'
+
+
+def test_tags_first_of_several_authors():
+    content = WELL_FORMED.replace("Smith, John", "Smith, John; Doe, Jane")
+    assert BiblioForge.parse_metadata(content)['author'] == 'Smith, John'
+
+
+def test_tags_placeholder_author_rejected():
+    content = WELL_FORMED.replace("Smith, John", "Lastname Firstname")
+    assert BiblioForge.parse_metadata(content) is None
+
+
+def test_json_object():
+    content = '{"title": "The Book", "author": "Smith, John", "year": 1999, "language": "EN"}'
+    assert BiblioForge.parse_metadata_json(content) == {
+        'author': 'Smith, John', 'year': '1999', 'title': 'The Book', 'language': 'en'
+    }
+
+
+def test_json_in_code_fence_dispatched_from_parse_metadata():
+    content = '```json\n{"title": "The Book", "author": "Smith", "year": null, "language": "en"}\n```'
+    metadata = BiblioForge.parse_metadata(content)
+    assert metadata['title'] == 'The Book'
+    assert metadata['year'] == 'Unknown'
+
+
+def test_json_rejects_invalid_answers():
+    assert BiblioForge.parse_metadata_json('{"title": "The Book", "author": ') is None
+    assert BiblioForge.parse_metadata_json('["The Book", "Smith"]') is None
+    assert BiblioForge.parse_metadata_json('{"title": ["The Book"], "author": "Smith"}') is None
+    assert BiblioForge.parse_metadata_json('{"title": "The Book", "author": null}') is None
+
+
+def test_json_year_must_be_four_digits():
+    content = '{"title": "The Book", "author": "Smith", "year": "ca. 1999", "language": "en"}'
+    assert BiblioForge.parse_metadata_json(content)['year'] == 'Unknown'
@@ -0,0 +1,58 @@
+import pytest
+
+import BiblioForge
+
+
+class StubProvider(BiblioForge.LLMProvider):
+    """Answers every metadata request with the same tags, through the endpoint slot"""
+
+    endpoint = 'stub://metadata'
+
+    def __init__(self):
+        super().__init__('stub')
+        self.requests = 0
+
+    def chat_completion(self, messages, temperature=0.7, max_tokens=500, timeout=120,
+                        response_format=None):
+        with BiblioForge.llm_endpoint_slot(self.endpoint):
+            self.requests += 1
+            return {'content': "<TITLE>The Book</TITLE>\n<AUTHOR>Smith, John</AUTHOR>\n"
+                               "<YEAR>1999</YEAR>\n<LANGUAGE>en</LANGUAGE>"}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(BiblioForge, 'processing_manifest', None)
+    monkeypatch.setattr(BiblioForge, 'llm_response_cache', None)
+    monkeypatch.setattr(BiblioForge, 'llm_output_mode', 'tags')
+    (tmp_path / 'in').mkdir()
+    for name in ('a', 'b'):
+        (tmp_path / 'in' / f'{name}.md').write_text(f"# Document {name}\n\nSome text of {name}.\n")
+    return tmp_path
+
+
+def test_sort_run_returns_counters(workdir):
+    provider = StubProvider()
+    script = str(workdir / 'rename_commands.sh')
+    BiblioForge.initialize_rename_scripts(script)
+    processor = BiblioForge.DocumentProcessor(cache_dir=None, embedded_metadata=False)
+
+    streamed = []
+    results = processor.process_files(
+        [str(workdir / 'in' / 'a.md'), str(workdir / 'in' / 'b.md')],
+        output_dir=str(workdir / 'out'), max_workers=2, sort=True,
+        rename_script_path=script, llm_provider=provider,
+        result_sink=streamed.append, keep_text=False
+    )
+
+    assert provider.requests == 2
+    assert len(streamed) == 2
+    assert results['results'] == {}
+    stats = results['stats']
+    assert stats['total'] == 2
+    assert stats['successful'] == 2
+    assert stats['failed'] == []
+    assert stats['extensions'] == {'.md': 2}
+    with open(script) as f:
+        assert f.read().count("/Smith John/1999 The Book.md") == 2
@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+
+import BiblioForge
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(BiblioForge, 'processing_manifest', None)
+    (tmp_path / 'lib').mkdir()
+    for name in ('a.pdf', 'b.pdf', 'c.pdf'):
+        (tmp_path / 'lib' / name).write_text(name)
+    return tmp_path
+
+
+def move(tmp_path, name, target, optional=False):
+    return [str(tmp_path / 'lib' / name), str(tmp_path / target), optional]
+
+
+def test_execute_moves_and_skips(library):
+    (library / 'Taken').mkdir()
+    (library / 'Taken' / 'c.pdf').write_text('other')
+    executor = BiblioForge.RenameExecutor(str(library / 'renames.journal'))
+    done = executor.execute([
+        ('a.pdf', [move(library, 'a.pdf', 'Smith/a.pdf'), move(library, 'a.txt', 'Smith/a.txt', True)]),
+        ('b.pdf', [move(library, 'b.pdf', 'Doe/b.pdf')]),
+        ('c.pdf', [move(library, 'c.pdf', 'Taken/c.pdf')]),
+        ('d.pdf', [move(library, 'd.pdf', 'Doe/d.pdf')]),
+    ])
+    assert set(done) == {'a.pdf', 'b.pdf'}
+    assert (executor.moved, executor.skipped, executor.failed) == (2, 1, 1)
+    assert (library / 'Smith' / 'a.pdf').read_text() == 'a.pdf'
+    assert (library / 'lib' / 'c.pdf').exists()
+    assert (library / 'Taken' / 'c.pdf').read_text() == 'other'
+
+
+def test_undo_goes_back_one_run_at_a_time(library):
+    executor = BiblioForge.RenameExecutor(str(library / 'renames.journal'))
+    executor.execute([('a.pdf', [move(library, 'a.pdf', 'Smith/a.pdf')])])
+    executor.execute([('b.pdf', [move(library, 'b.pdf', 'Doe/b.pdf')])])
+
+    assert executor.undo() == 1
+    assert (library / 'lib' / 'b.pdf').exists()
+    assert not (library / 'Doe').exists()
+    assert (library / 'Smith' / 'a.pdf').exists()
+
+    assert executor.undo() == 1
+    assert (library / 'lib' / 'a.pdf').exists()
+    assert not (library / 'Smith').exists()
+    assert executor.undo() == 0
+
+
+def test_recover_settles_interrupted_run(library):
+    journal_path = library / 'renames.journal'
+    source, target = str(library / 'lib' / 'a.pdf'), str(library / 'Smith' / 'a.pdf')
+    pending = str(library / 'lib' / 'b.pdf'), str(library / 'Smith' / 'b.pdf')
+    entries = [{'op': 'run', 'run': 'r1', 'started': 0},
+               {'op': 'mkdir', 'run': 'r1', 'path': str(library / 'Smith')},
+               {'op': 'move', 'run': 'r1', 'input': 'a.pdf', 'src': source, 'dst': target},
+               {'op': 'move', 'run': 'r1', 'input': 'b.pdf', 'src': pending[0], 'dst': pending[1]}]
+    # Crash after the first move, in the middle of writing its completion entry
+    journal_path.write_text(''.join(json.dumps(e) + '\n' for e in entries) + '{"op": "do')
+    os.makedirs(library / 'Smith')
+    os.replace(source, target)
+
+    executor = BiblioForge.RenameExecutor(str(journal_path))
+    assert executor.recover() == 1
+    assert executor.recover() == 0
+    done = [e for e in executor.read_journal() if e['op'] == 'done']
+    assert [(e['run'], e['src'], e['dst']) for e in done] == [('r1', source, target)]
+
+    # The recovered move belongs to its run and is undone with it
+    assert executor.undo() == 1
+    assert (library / 'lib' / 'a.pdf').exists()
+    assert not (library / 'Smith').exists()
+
+
+def test_undo_restores_manifest_state(library, monkeypatch):
+    manifest = BiblioForge.ProcessingManifest(str(library))
+    monkeypatch.setattr(BiblioForge, 'processing_manifest', manifest)
+    try:
+        moves = [move(library, 'a.pdf', 'Smith/a.pdf')]
+        detail = {'rename': {'target_dir': 'Smith'}, 'moves': moves}
+        manifest.record('a.pdf', 'sorted', detail)
+        executor = BiblioForge.RenameExecutor(str(library / 'renames.journal'))
+        executor.execute([('a.pdf', moves)])
+        assert manifest.state('a.pdf') == 'renamed'
+        executor.undo()
+        assert manifest.get('a.pdf') == ('sorted', detail)
+    finally:
+        manifest.close()
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+import BiblioForge
+
+
+def test_atomic_write_replaces_whole_file(tmp_path):
+    path = str(tmp_path / 'sub' / 'a.txt')
+    BiblioForge.atomic_write_bytes(path, b'first version')
+    BiblioForge.atomic_write_bytes(path, b'second')
+    with open(path, 'rb') as f:
+        assert f.read() == b'second'
+    assert os.listdir(tmp_path / 'sub') == ['a.txt']
+
+
+def test_atomic_write_leaves_no_temp_file_on_failure(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    with pytest.raises(TypeError):
+        BiblioForge.atomic_write_bytes(path, 'not bytes')
+    assert os.listdir(tmp_path) == []
+
+
+def test_gzip_round_trip_replaces_plain_variant(tmp_path):
+    path = str(tmp_path / 'book.txt')
+    BiblioForge.TextFileOutput().write(path, 'plain')
+    output = BiblioForge.TextFileOutput('gzip')
+    assert output.write(path, 'Grüße') == path + '.gz'
+    assert not os.path.exists(path)
+    assert output.exists(path)
+    assert output.read(path) == 'Grüße'
+    # Reading with another configured compression still finds the text
+    assert BiblioForge.TextFileOutput().read(path) == 'Grüße'
+
+
+def test_gzip_output_is_reproducible(tmp_path):
+    output = BiblioForge.TextFileOutput('gzip')
+    with open(output.write(str(tmp_path / 'a.txt'), 'same'), 'rb') as f:
+        first = f.read()
+    with open(output.write(str(tmp_path / 'b.txt'), 'same'), 'rb') as f:
+        assert f.read() == first
+
+
+def test_unknown_compression_rejected():
+    with pytest.raises(ValueError):
+        BiblioForge.TextFileOutput('bz2')
+
+
+def test_shards_round_trip_and_rollover(tmp_path):
+    output = BiblioForge.ShardedTextOutput(str(tmp_path), shard_size=64)
+    # Random text does not compress below the shard size
+    texts = {f'doc{i}.txt': os.urandom(60).hex() for i in range(3)}
+    for name, text in texts.items():
+        output.write(str(tmp_path / 'elsewhere' / name), text)
+    output.write('doc0.txt', 'replaced')
+    output.close()
+
+    shards = sorted(name for name in os.listdir(tmp_path) if name.endswith('.bin'))
+    assert len(shards) == 4
+
+    reopened = BiblioForge.ShardedTextOutput(str(tmp_path), shard_size=64)
+    try:
+        assert reopened.exists('doc1.txt')
+        assert not reopened.exists('missing.txt')
+        assert reopened.read('doc0.txt') == 'replaced'
+        assert reopened.read('doc2.txt') == texts['doc2.txt']
+        with pytest.raises(FileNotFoundError):
+            reopened.read('missing.txt')
+        # Appending continues in the last shard instead of overwriting the first
+        reopened.write('doc3.txt', 'more')
+        assert reopened.read('doc1.txt') == texts['doc1.txt']
+    finally:
+        reopened.close()